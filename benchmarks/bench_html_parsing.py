@@ -0,0 +1,168 @@
+"""
+Benchmark: page parsing, legacy vs lxml single pass.
+
+Search pages
+    legacy: one WebDriver ``find_elements`` for the tiles, then per tile four
+            ``find_element(...).text`` lookups plus ``find_element(...)`` and
+            ``get_attribute("href")`` for the link. Every call is a round trip to
+            chromedriver; the selectors are resolved here with BeautifulSoup so the
+            extracted values can be checked, and each round trip is charged
+            ``--rtt-ms`` (measure yours with a local driver; 2-5 ms is typical).
+    lxml:   one ``page_source`` round trip, then ``parse_search_results`` over a
+            single lxml parse.
+
+Product pages
+    legacy: ``BeautifulSoup(page_source, "html.parser")`` + ``soup.select`` with
+            the three review selectors.
+    lxml:   ``parse_reviews`` (precompiled XPath) over an lxml parse.
+
+Pages are built from the fixtures in test/fixtures, replicated to the requested
+number of tiles / reviews.
+
+Usage:
+    python benchmarks/bench_html_parsing.py --tiles 40 --reviews 30 --repeat 50 --rtt-ms 3
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from prod_assistant.etl.parsers import parse_document, parse_reviews, parse_search_results  # noqa: E402
+
+FIXTURES = PROJECT_ROOT / "test" / "fixtures"
+REVIEW_SELECTOR = "div._27M-vq, div.col.EPCmJX, div._6K-7Co"
+
+
+def _replicate(html: str, block_pattern: str, n: int) -> str:
+    """Repeat the matched blocks until there are ``n`` of them, each with a unique product id / review title."""
+    blocks = re.findall(block_pattern, html, flags=re.S)
+    start = html.index(blocks[0])
+    end = html.index(blocks[-1]) + len(blocks[-1])
+    out = []
+    for i in range(n):
+        block = blocks[i % len(blocks)]
+        block = re.sub(r"/p/itm([0-9a-f]+)", lambda m: f"/p/itm{m.group(1)}{i:04d}", block)
+        out.append(block.replace("</p>", f" #{i}</p>"))
+    return html[:start] + "\n".join(out) + html[end:]
+
+
+def build_pages(tiles: int, reviews: int):
+    search = (FIXTURES / "flipkart_search.html").read_text(encoding="utf-8")
+    product = (FIXTURES / "flipkart_product.html").read_text(encoding="utf-8")
+    search = _replicate(search, r'<div data-id="[^"]+".*?\n      </div>\n', tiles)
+    product = _replicate(product, r'<div class="_8-rIO3">.*?\n  </div>\n', reviews)
+    return search, product
+
+
+class _RoundTrips:
+    def __init__(self):
+        self.count = 0
+
+
+class _FakeElement:
+    """WebDriver-like element over a BeautifulSoup tag; every call is one round trip."""
+
+    def __init__(self, tag, trips: _RoundTrips):
+        self.tag = tag
+        self.trips = trips
+
+    def find_element(self, css):
+        self.trips.count += 1
+        found = self.tag.select_one(css)
+        if found is None:
+            raise LookupError(css)
+        return _FakeElement(found, self.trips)
+
+    @property
+    def text(self):
+        self.trips.count += 1
+        return self.tag.get_text(" ", strip=True)
+
+    def get_attribute(self, name):
+        self.trips.count += 1
+        return self.tag.get(name)
+
+
+def legacy_search(page_html: str, max_products: int, trips: _RoundTrips):
+    soup = BeautifulSoup(page_html, "html.parser")
+    trips.count += 1
+    items = [_FakeElement(tag, trips) for tag in soup.select("div[data-id]")][:max_products]
+    tiles = []
+    for item in items:
+        try:
+            title = item.find_element("div.KzDlHZ").text.strip()
+            price = item.find_element("div.Nx9bqj").text.strip()
+            rating = item.find_element("div.XQDdHH").text.strip()
+            reviews_text = item.find_element("span.Wphh3N").text.strip()
+            match = re.search(r"\d+(,\d+)?(?=\s+Reviews)", reviews_text)
+            total_reviews = match.group(0) if match else "N/A"
+            href = item.find_element("a[href*='/p/']").get_attribute("href")
+            product_link = href if href.startswith("http") else "https://www.flipkart.com" + href
+            match = re.findall(r"/p/(itm[0-9A-Za-z]+)", href)
+            product_id = match[0] if match else "N/A"
+        except LookupError:
+            continue
+        tiles.append([product_id, title, rating, total_reviews, price, product_link])
+    return tiles
+
+
+def legacy_reviews(page_html: str, count: int):
+    soup = BeautifulSoup(page_html, "html.parser")
+    seen, reviews = set(), []
+    for block in soup.select(REVIEW_SELECTOR):
+        text = block.get_text(separator=" ", strip=True)
+        if text and text not in seen:
+            reviews.append(text)
+            seen.add(text)
+        if len(reviews) >= count:
+            break
+    return reviews
+
+
+def _time(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=40)
+    parser.add_argument("--reviews", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=3.0, help="Cost charged per WebDriver round trip")
+    args = parser.parse_args()
+
+    search_html, product_html = build_pages(args.tiles, args.reviews)
+    rtt = args.rtt_ms / 1000
+
+    trips = _RoundTrips()
+    legacy_cpu, legacy_tiles = _time(lambda: legacy_search(search_html, args.tiles, trips), args.repeat)
+    trips_per_page = trips.count / args.repeat
+    lxml_cpu, lxml_tiles = _time(lambda: parse_search_results(parse_document(search_html), args.tiles), args.repeat)
+    assert legacy_tiles == lxml_tiles, "parsers disagree on search tiles"
+    # In the browser the legacy lookups run in Chrome; only their round trips are charged
+    legacy_search_s = trips_per_page * rtt
+    lxml_search_s = rtt + lxml_cpu
+
+    legacy_review_s, legacy_out = _time(lambda: legacy_reviews(product_html, args.reviews), args.repeat)
+    lxml_review_s, lxml_out = _time(lambda: parse_reviews(parse_document(product_html), args.reviews), args.repeat)
+    assert legacy_out == lxml_out, "parsers disagree on reviews"
+
+    print(f"search page: {len(lxml_tiles)} tiles, {len(search_html) / 1024:.0f} KiB; "
+          f"product page: {len(lxml_out)} unique reviews, {len(product_html) / 1024:.0f} KiB; rtt {args.rtt_ms} ms")
+    print(f"{'':<22}{'legacy':>12}{'lxml':>12}{'speedup':>10}")
+    print(f"{'search (per page)':<22}{legacy_search_s * 1000:>10.2f}ms{lxml_search_s * 1000:>10.2f}ms"
+          f"{legacy_search_s / lxml_search_s:>9.1f}x   ({trips_per_page:.0f} vs 1 round trips)")
+    print(f"{'reviews (per page)':<22}{legacy_review_s * 1000:>10.2f}ms{lxml_review_s * 1000:>10.2f}ms"
+          f"{legacy_review_s / lxml_review_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
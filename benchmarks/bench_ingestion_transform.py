@@ -0,0 +1,140 @@
+"""
+Benchmark: CSV -> Document transform, legacy vs streaming.
+
+Compares the original ingestion path (read the whole CSV, ``iterrows`` into a
+list of dicts, then a second list of Documents) with the streaming path in
+``prod_assistant.etl.data_ingestion`` (chunked ``read_csv`` + column-wise
+metadata, yielding Document batches).
+
+Each mode runs in its own subprocess so peak RSS is measured in isolation.
+
+Usage:
+    python benchmarks/bench_ingestion_transform.py --rows 200000 --batch-size 1000
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# data_ingestion -> model_loader uses both import styles (prod_assistant.* and utils.*)
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "prod_assistant"))
+
+SAMPLE_CSV = PROJECT_ROOT / "data" / "product_reviews.csv"
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def make_synthetic_csv(path: str, rows: int):
+    """Replicate the sample catalog rows (with unique product ids) up to ``rows`` rows."""
+    with open(SAMPLE_CSV, newline="", encoding="utf-8") as f:
+        sample = list(csv.DictReader(f))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(sample[0].keys()))
+        writer.writeheader()
+        for i in range(rows):
+            row = dict(sample[i % len(sample)])
+            row["product_id"] = f"{row['product_id']}-{i}"
+            writer.writerow(row)
+
+
+def legacy_transform(csv_path: str) -> int:
+    """The pre-streaming implementation of DataIngestion.transform_data."""
+    import pandas as pd
+    from langchain_core.documents import Document
+
+    product_data = pd.read_csv(csv_path)
+    product_list = []
+    for _, row in product_data.iterrows():
+        product_list.append({
+            "product_id": row["product_id"],
+            "product_title": row["product_title"],
+            "rating": row["rating"],
+            "total_reviews": row["total_reviews"],
+            "price": row["price"],
+            "top_reviews": row["top_reviews"],
+        })
+    documents = []
+    for entry in product_list:
+        metadata = {key: entry[key] for key in ("product_id", "product_title", "rating", "total_reviews", "price")}
+        documents.append(Document(page_content=entry["top_reviews"], metadata=metadata))
+    return len(documents)
+
+
+def streaming_transform(csv_path: str, batch_size: int) -> int:
+    from prod_assistant.etl.data_ingestion import iter_product_documents
+
+    count = 0
+    for batch in iter_product_documents(csv_path, batch_size=batch_size):
+        # A real run hands each batch to the vector store and drops it
+        count += len(batch)
+    return count
+
+
+def run_mode(mode: str, csv_path: str, batch_size: int) -> dict:
+    # Import the same modules in both modes so the RSS baseline is comparable
+    import prod_assistant.etl.data_ingestion  # noqa: F401
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "legacy":
+        rows = legacy_transform(csv_path)
+    else:
+        rows = streaming_transform(csv_path, batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_growth_mb": round(_peak_rss_mb() - baseline_rss, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--csv", help="Existing catalog CSV to use instead of a synthetic one")
+    parser.add_argument("--mode", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single mode and print its JSON result
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.csv, args.batch_size)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = os.path.join(tmp, "catalog.csv")
+            make_synthetic_csv(csv_path, args.rows)
+        size_mb = os.path.getsize(csv_path) / (1024 * 1024)
+        print(f"Catalog: {csv_path} ({size_mb:.1f} MB)")
+
+        results = []
+        for mode in ("legacy", "streaming"):
+            output = subprocess.check_output(
+                [sys.executable, __file__, "--mode", mode, "--csv", csv_path, "--batch-size", str(args.batch_size)],
+                text=True,
+            )
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'mode':<10} {'rows':>10} {'seconds':>9} {'rows/sec':>12} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['rows']:>10} {r['seconds']:>9} {r['rows_per_sec']:>12} "
+              f"{r['peak_rss_mb']:>12} {r['rss_growth_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
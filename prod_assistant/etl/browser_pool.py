@@ -0,0 +1,197 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import undetected_chromedriver as uc
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    WebDriverException,
+)
+from prod_assistant.etl.waits import NETWORK_TRACKER_JS
+
+# Substrings of WebDriverException messages that mean the browser itself is gone
+_DEAD_BROWSER_MARKERS = (
+    "chrome not reachable",
+    "disconnected",
+    "invalid session id",
+    "no such window",
+    "session deleted",
+    "target window already closed",
+    "connection refused",
+    "max retries exceeded",
+)
+
+
+def is_dead_browser_error(error: Exception) -> bool:
+    """True when the error means the driver must be restarted, not just the page retried."""
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    if isinstance(error, WebDriverException):
+        message = str(error).lower()
+        return any(marker in message for marker in _DEAD_BROWSER_MARKERS)
+    return isinstance(error, (ConnectionError, OSError))
+
+
+def default_chrome_options():
+    """Options for a scraper browser (uc needs a fresh options object per driver)."""
+    options = uc.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    return options
+
+
+# undetected_chromedriver patches a shared chromedriver binary on start; concurrent starts race on it
+_START_LOCK = threading.Lock()
+
+
+class BrowserSession:
+    """
+    One long-lived Chrome driver that is reused for many page loads.
+
+    - The driver starts lazily on first use and is kept open between pages and
+      queries instead of being launched per product.
+    - Tab recycling: after ``pages_per_tab`` loads the working tab is replaced
+      by a fresh one, releasing the memory the old tab accumulated, and any
+      stray tabs/popups are closed.
+    - After ``pages_per_driver`` loads the whole browser is restarted, since
+      long-running Chrome processes keep growing.
+    - Crash recovery: if the browser dies (crashed renderer, lost session)
+      the driver is restarted and the load retried once.
+    """
+
+    def __init__(self, options_factory=default_chrome_options, pages_per_tab: int = 10,
+                 pages_per_driver: int = 200, name: str = "browser"):
+        self.options_factory = options_factory
+        self.pages_per_tab = pages_per_tab
+        self.pages_per_driver = pages_per_driver
+        self.name = name
+        self._driver = None
+        self._tab_pages = 0
+        self._driver_pages = 0
+        self.stats = {"drivers_started": 0, "pages": 0, "tabs_recycled": 0, "crash_restarts": 0}
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._start()
+        return self._driver
+
+    def _start(self):
+        start = time.perf_counter()
+        with _START_LOCK:
+            self._driver = uc.Chrome(options=self.options_factory(), use_subprocess=True)
+        self._track_network()
+        self._tab_pages = 0
+        self._driver_pages = 0
+        self.stats["drivers_started"] += 1
+        print(f"[{self.name}] started Chrome in {time.perf_counter() - start:.1f}s")
+
+    def restart(self):
+        self.quit()
+        self._start()
+
+    def quit(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                # Already dead; nothing left to clean up
+                pass
+            self._driver = None
+
+    def _track_network(self):
+        """Run the request tracker of ``wait_for_network_idle`` before any script of each page in the working tab."""
+        try:
+            self._driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_JS})
+        except Exception:
+            # The wait installs the tracker itself after the page loaded
+            pass
+
+    def _recycle_tab(self):
+        driver = self._driver
+        old_handles = list(driver.window_handles)
+        driver.switch_to.new_window("tab")
+        fresh = driver.current_window_handle
+        for handle in old_handles:
+            if handle != fresh:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(fresh)
+        # Registered per tab, so the fresh one needs it again
+        self._track_network()
+        self._tab_pages = 0
+        self.stats["tabs_recycled"] += 1
+
+    def _before_load(self):
+        if self._driver is not None and self._driver_pages >= self.pages_per_driver:
+            self.restart()
+        driver = self.driver
+        if self._tab_pages >= self.pages_per_tab or len(driver.window_handles) > 1:
+            self._recycle_tab()
+
+    def get(self, url: str):
+        """Load ``url`` in the working tab and return the driver, restarting a dead browser once."""
+        for attempt in range(2):
+            try:
+                self._before_load()
+                self._driver.get(url)
+                self._tab_pages += 1
+                self._driver_pages += 1
+                self.stats["pages"] += 1
+                return self._driver
+            except Exception as e:
+                if attempt or not is_dead_browser_error(e):
+                    raise
+                print(f"[{self.name}] browser died ({str(e)[:120]}); restarting")
+                self.stats["crash_restarts"] += 1
+                self.restart()
+
+    def recover(self, error: Exception) -> bool:
+        """Restart the browser if ``error`` killed it; returns True when it did."""
+        if is_dead_browser_error(error):
+            self.stats["crash_restarts"] += 1
+            self.restart()
+            return True
+        return False
+
+
+class DriverPool:
+    """
+    Fixed-size pool of ``BrowserSession`` objects shared by all scrapes in a process.
+
+    ``with pool.session() as browser:`` checks one out (blocking while all are
+    busy) and returns it afterwards, still running, for the next task.
+    """
+
+    def __init__(self, size: int = 1, **session_kwargs):
+        self.size = max(1, size)
+        self._sessions = [BrowserSession(name=f"browser-{i}", **session_kwargs) for i in range(self.size)]
+        self._idle = queue.Queue()
+        for session in self._sessions:
+            self._idle.put(session)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, timeout: float | None = None):
+        try:
+            browser = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No browser available within {timeout}s") from None
+        try:
+            yield browser
+        finally:
+            self._idle.put(browser)
+
+    @property
+    def stats(self) -> dict:
+        totals: dict = {}
+        for browser in self._sessions:
+            for key, value in browser.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def close(self):
+        with self._lock:
+            for browser in self._sessions:
+                browser.quit()
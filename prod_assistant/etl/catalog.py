@@ -0,0 +1,146 @@
+import re
+import os
+import csv
+from datetime import date
+from typing import Iterator, List, Optional, Sequence
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+# Columns in the order FlipkartScraper.scrape_flipkart_products returns them
+CATALOG_COLUMNS = ["product_id", "product_title", "rating", "total_reviews", "price", "top_reviews"]
+
+# Typed on-disk schema; scrape_date is the hive partition key (scrape_date=YYYY-MM-DD/)
+CATALOG_SCHEMA = pa.schema([
+    ("product_id", pa.string()),
+    ("product_title", pa.string()),
+    ("rating", pa.float64()),
+    ("total_reviews", pa.int64()),
+    ("price", pa.float64()),
+    ("top_reviews", pa.large_string()),
+    ("scrape_date", pa.date32()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("scrape_date", pa.date32())]), flavor="hive")
+
+_NUMBER = re.compile(r"[\d.]+")
+
+
+def parse_number(value, cast=float):
+    """'₹1,23,999' -> 123999.0, '4.5' -> 4.5, '1,139' -> 1139; None when there is no number ('N/A')."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    match = _NUMBER.search(str(value).replace(",", ""))
+    if not match:
+        return None
+    try:
+        return cast(float(match.group(0)))
+    except ValueError:
+        return None
+
+
+def rows_to_table(rows: Sequence[Sequence], scrape_date: Optional[date] = None) -> pa.Table:
+    """Convert scraper rows ([product_id, title, rating, total_reviews, price, top_reviews]) to a typed table."""
+    scrape_date = scrape_date or date.today()
+    columns = list(zip(*rows)) if rows else [[] for _ in CATALOG_COLUMNS]
+    product_id, title, rating, total_reviews, price, top_reviews = columns
+    return pa.table({
+        "product_id": pa.array([str(v) for v in product_id], pa.string()),
+        "product_title": pa.array([str(v) for v in title], pa.string()),
+        "rating": pa.array([parse_number(v) for v in rating], pa.float64()),
+        "total_reviews": pa.array([parse_number(v, int) for v in total_reviews], pa.int64()),
+        "price": pa.array([parse_number(v) for v in price], pa.float64()),
+        "top_reviews": pa.array([str(v) for v in top_reviews], pa.large_string()),
+        "scrape_date": pa.array([scrape_date] * len(product_id), pa.date32()),
+    }, schema=CATALOG_SCHEMA)
+
+
+def write_catalog(rows: Sequence[Sequence], root_path: str, scrape_date: Optional[date] = None) -> str:
+    """Write scraped rows as a zstd Parquet dataset partitioned by scrape date.
+
+    Re-scraping on the same day replaces that day's partition (as the CSV output
+    is overwritten); earlier days are kept.
+    """
+    table = rows_to_table(rows, scrape_date)
+    os.makedirs(root_path, exist_ok=True)
+    ds.write_dataset(
+        table,
+        root_path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+    return root_path
+
+
+def csv_to_catalog(csv_path: str, root_path: str, scrape_date: Optional[date] = None) -> str:
+    """Convert an existing scraper CSV into the Parquet catalog."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        rows = [row for row in reader if row]
+    return write_catalog(rows, root_path, scrape_date)
+
+
+def open_catalog(root_path: str) -> ds.Dataset:
+    """Dataset over all partitions; files are memory-mapped rather than read into buffers."""
+    return ds.dataset(
+        root_path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        schema=CATALOG_SCHEMA,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _date_filter(since: Optional[str] = None, until: Optional[str] = None):
+    """Partition filter on scrape_date; only matching partitions are opened."""
+    expression = None
+    if since:
+        expression = ds.field("scrape_date") >= pa.scalar(date.fromisoformat(str(since)), pa.date32())
+    if until:
+        clause = ds.field("scrape_date") <= pa.scalar(date.fromisoformat(str(until)), pa.date32())
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def read_catalog(root_path: str, columns: Optional[List[str]] = None, since: Optional[str] = None,
+                 until: Optional[str] = None) -> pa.Table:
+    """Read (part of) the catalog into one memory-mapped Arrow table."""
+    return pq.read_table(
+        root_path,
+        columns=columns,
+        filters=_date_filter(since, until),
+        partitioning=PARTITIONING,
+        schema=CATALOG_SCHEMA,
+        memory_map=True,
+    )
+
+
+def iter_catalog_batches(root_path: str, batch_size: int = 1000, columns: Optional[List[str]] = None,
+                         since: Optional[str] = None, until: Optional[str] = None,
+                         newest_first: bool = False) -> Iterator[pa.RecordBatch]:
+    """Stream record batches of at most ``batch_size`` rows, reading only ``columns``.
+
+    With ``newest_first`` the ``scrape_date`` partitions are read latest first,
+    so the first row seen for a product is its most recent scrape.
+    """
+    dataset = open_catalog(root_path)
+    expression = _date_filter(since, until)
+    if not newest_first:
+        yield from dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size)
+        return
+    fragments = sorted(
+        dataset.get_fragments(filter=expression),
+        key=lambda fragment: (ds.get_partition_keys(fragment.partition_expression).get("scrape_date") or date.min,
+                              fragment.path),
+        reverse=True,
+    )
+    for fragment in fragments:
+        yield from fragment.to_batches(schema=dataset.schema, columns=columns, filter=expression,
+                                       batch_size=batch_size)
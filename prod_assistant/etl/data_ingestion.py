@@ -1,11 +1,75 @@
 import os
+import argparse
 import pandas as pd
 from dotenv import load_dotenv
-from typing import List
+from typing import Iterable, Iterator, List
 from langchain_core.documents import Document
 from langchain_astradb import AstraDBVectorStore
 from prod_assistant.utils.model_loader import ModelLoader
 from prod_assistant.utils.config_loader import load_config
+from prod_assistant.etl.ingestion_pipeline import EmbeddingUpsertPipeline, PrecomputedEmbeddings
+from prod_assistant.etl.ingestion_manifest import IngestionManifest, product_document_id
+from prod_assistant.etl.review_chunking import ReviewChunker
+from prod_assistant.etl.near_duplicates import NearDuplicateCollapser
+from prod_assistant.etl.catalog import iter_catalog_batches, read_catalog
+from prod_assistant.etl.ingestion_checkpoint import IngestionCheckpoint
+from prod_assistant.etl.embedding_store import EmbeddingStore
+from prod_assistant.etl.streaming_ingestion import StreamingIngestion
+
+# Columns every product catalog must provide
+REQUIRED_COLUMNS = ['product_id', 'product_title', 'rating', 'total_reviews', 'price', 'top_reviews']
+# Columns copied into Document metadata (top_reviews becomes the page content)
+METADATA_COLUMNS = ['product_id', 'product_title', 'rating', 'total_reviews', 'price']
+
+
+def _validate_columns(df: pd.DataFrame):
+    """Raise if the catalog is missing any required column."""
+    if not set(REQUIRED_COLUMNS).issubset(set(df.columns)):
+        raise ValueError(f"CSV file is missing required columns. Expected columns: {set(REQUIRED_COLUMNS)}")
+
+
+def documents_from_frame(df: pd.DataFrame) -> List[Document]:
+    """Build Documents column-wise (no iterrows): metadata records + review text in one pass.
+
+    Document ids are derived from product_id, so re-ingesting a product overwrites it
+    instead of adding a duplicate.
+    """
+    metadata_records = df[METADATA_COLUMNS].to_dict("records")
+    contents = df["top_reviews"].fillna("").astype(str).tolist()
+    ids = [product_document_id(pid, title) for pid, title in zip(df["product_id"].tolist(), df["product_title"].tolist())]
+    return [
+        Document(id=doc_id, page_content=content, metadata=metadata)
+        for doc_id, content, metadata in zip(ids, contents, metadata_records)
+    ]
+
+
+def iter_product_documents(csv_path: str, batch_size: int = 1000) -> Iterator[List[Document]]:
+    """Stream the catalog CSV in chunks, yielding lists of at most ``batch_size`` Documents.
+
+    Peak memory is bounded by ``batch_size`` rows instead of the size of the file.
+    """
+    reader = pd.read_csv(csv_path, chunksize=batch_size, usecols=lambda column: column in REQUIRED_COLUMNS)
+    for chunk in reader:
+        _validate_columns(chunk)
+        yield documents_from_frame(chunk)
+
+
+def iter_catalog_documents(catalog_path: str, batch_size: int = 1000, since: str | None = None) -> Iterator[List[Document]]:
+    """Stream the Parquet catalog, reading only the ingested columns of the selected scrape dates.
+
+    A product scraped on several dates is in several partitions; they are read
+    newest first and only the first (latest) row of each product is kept.
+    """
+    seen = set()
+    for record_batch in iter_catalog_batches(catalog_path, batch_size, columns=REQUIRED_COLUMNS, since=since,
+                                             newest_first=True):
+        documents = []
+        for doc in documents_from_frame(record_batch.to_pandas()):
+            if doc.id not in seen:
+                seen.add(doc.id)
+                documents.append(doc)
+        if documents:
+            yield documents
 
 
 class DataIngestion:
@@ -16,13 +80,32 @@ class DataIngestion:
         self.model_loader = ModelLoader()
         # Load environment variables from .env file
         self._load_env_variables()
-        # csv path from config
-        self.csv_path = self._get_csv_path()
-        # Load product data from CSV
-        self.product_data = self._load_csv()
         # Load configuration
         self.config = load_config()
-        
+        # Rows per streamed Document batch
+        self.ingestion_config = self.config.get("ingestion", {})
+        self.batch_size = self.ingestion_config.get("batch_size", 1000)
+        # Catalog source: the scraper CSV or the partitioned Parquet catalog
+        self.catalog_format = self.ingestion_config.get("catalog_format", "csv")
+        if self.catalog_format == "parquet":
+            self.catalog_path = self._get_catalog_path()
+        else:
+            # csv path from config
+            self.csv_path = self._get_csv_path()
+        # Product data is loaded lazily (see `product_data`) so the streaming path never holds the whole CSV
+        self._product_data = None
+        # Vector store and the embeddings it is built on, created on first use
+        self.embeddings = None
+        self.vstore = None
+        # Local copy of every computed embedding, reusable by any backend
+        self.embedding_store = self._get_embedding_store()
+
+    @property
+    def product_data(self):
+        """Full catalog as a DataFrame, loaded on first access."""
+        if self._product_data is None:
+            self._product_data = self._load_catalog() if self.catalog_format == "parquet" else self._load_csv()
+        return self._product_data
 
 
     def _load_env_variables(self):
@@ -67,15 +150,28 @@ class DataIngestion:
         
         return csv_path
     
+    def _get_catalog_path(self):
+        """Get the Parquet catalog directory from configuration."""
+        catalog_path = os.path.join(os.getcwd(), self.ingestion_config.get("catalog_path", os.path.join("data", "catalog")))
+        if not os.path.isdir(catalog_path):
+            raise FileNotFoundError(f"Parquet catalog not found at the path: {catalog_path}")
+        return catalog_path
+
+    def _load_catalog(self):
+        """Load product data from the Parquet catalog (memory-mapped, ingested columns only)."""
+        table = read_catalog(self.catalog_path, columns=REQUIRED_COLUMNS + ["scrape_date"],
+                             since=self.ingestion_config.get("catalog_since"))
+        df = table.to_pandas().sort_values("scrape_date", ascending=False, kind="stable")
+        # Latest scrape of each product only, as in iter_catalog_documents
+        keys = pd.Series([product_document_id(pid, title) for pid, title in zip(df["product_id"], df["product_title"])],
+                         index=df.index)
+        return df[~keys.duplicated()].drop(columns="scrape_date").reset_index(drop=True)
+
     def _load_csv(self):
         """Load product data from CSV file."""
         df = pd.read_csv(self.csv_path)
         # Validate required columns
-        expected_columns = {'product_id', 'product_title', 'rating', 'total_reviews', 'price', 'top_reviews'}
-
-        # Check if all expected columns are present
-        if not expected_columns.issubset(set(df.columns)):
-            raise ValueError(f"CSV file is missing required columns. Expected columns: {expected_columns}")
+        _validate_columns(df)
 
         # Ensure there is a product_id column; if missing, generate one from the row index
         if 'product_id' not in df.columns:
@@ -87,66 +183,277 @@ class DataIngestion:
 
     def transform_data(self):
         """Transform product data form dataframe into list of Langchain Document objects."""
-        product_list = []
-
-        # Iterate through each row in the DataFrame and create product entries
-        for _, row in self.product_data.iterrows():
-            # Create a dictionary for each product entry with relevant details
-            product_entry = {
-                "product_id" : row["product_id"], 
-                "product_title" : row["product_title"],
-                "rating" : row["rating"],
-                "total_reviews" : row["total_reviews"],
-                "price" : row["price"],
-                "top_reviews" : row["top_reviews"]
-            }
-            product_list.append(product_entry)
-
-        
-        documents = []
-        # Convert each product entry into a Langchain Document
-        for entry in product_list:
-            # Create metadata dictionary
-            metadata = {
-                "product_id" : entry["product_id"], 
-                "product_title" : entry["product_title"],
-                "rating" : entry["rating"],
-                "total_reviews" : entry["total_reviews"],
-                "price" : entry["price"],
-            }
-            # Create Document with content and metadata
-            doc = Document(page_content=entry['top_reviews'], metadata=metadata)
-            documents.append(doc)
-
+        documents = documents_from_frame(self.product_data)
         print(f"Transformed {len(documents)} documents. ")
         return documents
 
+    def iter_documents(self, batch_size: int | None = None) -> Iterator[List[Document]]:
+        """Stream the catalog as batches of Documents without loading the whole CSV."""
+        if self.catalog_format == "parquet":
+            yield from iter_catalog_documents(self.catalog_path, batch_size or self.batch_size,
+                                              since=self.ingestion_config.get("catalog_since"))
+            return
+        yield from iter_product_documents(self.csv_path, batch_size or self.batch_size)
+
+    def iter_canonical_documents(self) -> Iterator[List[Document]]:
+        """Product batches with near-duplicate listings collapsed into one canonical product.
+
+        Controlled by `ingestion.near_duplicates`; the catalog is streamed twice
+        (signatures first, then documents), so memory holds signatures only.
+        """
+        dedup_config = self.ingestion_config.get("near_duplicates", {})
+        if not dedup_config.get("enabled", False):
+            yield from self.iter_documents()
+            return
+
+        collapser = NearDuplicateCollapser(
+            threshold=dedup_config.get("threshold", 0.8),
+            num_perm=dedup_config.get("num_perm", 128),
+            bands=dedup_config.get("bands", 16),
+            shingle_size=dedup_config.get("shingle_size", 3),
+            min_shingles=dedup_config.get("min_shingles", 3),
+        )
+        collapser.fit(self.iter_documents())
+        yield from collapser.transform(self.iter_documents())
+        print(f"Near-duplicate collapsing: {collapser.stats}")
+
+    def iter_index_documents(self) -> Iterator[List[Document]]:
+        """Batches of the Documents that actually go into the vector store.
+
+        With `ingestion.chunking: review` every product is split into its individual
+        reviews and each unique review text becomes one Document linked to all the
+        products that share it; otherwise one Document per product.
+        """
+        if self.ingestion_config.get("chunking", "review") != "review":
+            yield from self.iter_canonical_documents()
+            return
+
+        # Reviews are spooled to disk, so memory stays bounded by the batch size
+        chunker = ReviewChunker()
+        try:
+            for documents in self.iter_canonical_documents():
+                chunker.add(documents)
+            yield from chunker.iter_batches(self.batch_size)
+            print(f"Review chunking: {chunker.stats}")
+        finally:
+            chunker.close()
+
         
+    def _get_embedding_store(self):
+        """Persistent embedding store for the configured model, or None if disabled."""
+        store_config = self.ingestion_config.get("embedding_store", {})
+        if not store_config.get("enabled", True):
+            return None
+        model_config = self.config["embedding_model"]
+        return EmbeddingStore(
+            store_config.get("path", os.path.join("data", "embeddings")),
+            f"{model_config.get('provider', 'openai')}:{model_config.get('model_name')}",
+            shard_size=store_config.get("shard_size", 8192),
+        )
+
+    def _get_vector_store(self):
+        """Create (once) the AstraDB Vector Store on top of pipeline-aware embeddings."""
+        if self.vstore is None:
+            # Precomputed embeddings let the pipeline embed ahead of the upsert;
+            # vectors already in the embedding store are never requested again
+            self.embeddings = PrecomputedEmbeddings(self.model_loader.load_embeddings(), store=self.embedding_store)
+            # Initialize AstraDB Vector Store with configuration
+            collection_name = self.config["astra_db"]["collection_name"]
+            # Create AstraDBVectorStore instance
+            self.vstore = AstraDBVectorStore(
+                embedding = self.embeddings,
+                collection_name = collection_name,
+                api_endpoint = self.db_api_endpoint,
+                token = self.db_application_token,
+                namespace = self.db_keyspace
+            )
+        return self.vstore
+
     def store_in_vetcor_db(self, documents : List[Document]):
         """Store transformed documents in AstraDB Vector Store."""
-        # Initialize AstraDB Vector Store with configuration
-        collection_name = self.config["astra_db"]["collection_name"]
-        # Create AstraDBVectorStore instance
-        vstore = AstraDBVectorStore(
-            embedding = self.model_loader.load_embeddings(),
-            collection_name = collection_name,
-            api_endpoint = self.db_api_endpoint,
-            token = self.db_application_token,
-            namespace = self.db_keyspace
-        )
+        vstore = self._get_vector_store()
         # Add documents to the vector store
         inserted_ids = vstore.add_documents(documents)
         print(f"Successfully inserted {len(inserted_ids)} documents into Astra DB. ")
         # Return the vector store instance and inserted document IDs
         return vstore, inserted_ids
 
+    def build_pipeline(self, on_progress=None, on_batch_committed=None, on_batch_embedded=None) -> EmbeddingUpsertPipeline:
+        """Batched, concurrent embed + upsert pipeline configured from the `ingestion` block."""
+        vstore = self._get_vector_store()
+        return EmbeddingUpsertPipeline(
+            embeddings=self.embeddings,
+            vector_store=vstore,
+            batch_size=self.ingestion_config.get("embed_batch_size", 64),
+            embed_concurrency=self.ingestion_config.get("embed_concurrency", 4),
+            max_retries=self.ingestion_config.get("max_retries", 3),
+            backoff_base_s=self.ingestion_config.get("backoff_base_s", 1.0),
+            backoff_max_s=self.ingestion_config.get("backoff_max_s", 30.0),
+            on_progress=on_progress,
+            on_batch_committed=on_batch_committed,
+            on_batch_embedded=on_batch_embedded,
+        )
+
+
+    def _delete_removed(self, manifest: IngestionManifest):
+        """Delete documents that disappeared from the source since the last run."""
+        removed = manifest.removed_ids()
+        if not removed:
+            return
+        vstore = self._get_vector_store()
+        # Delete in modest chunks to keep each request small
+        for start in range(0, len(removed), 100):
+            vstore.delete(ids=removed[start:start + 100])
+        manifest.forget(removed)
+        print(f"Deleted {len(removed)} documents no longer present in the source. ")
+
+    def run_streaming(self, row_batches: Iterable[List[list]], on_progress=None, on_batch_committed=None):
+        """Embed and upsert scraped rows as they arrive (see `StreamingIngestion`).
+
+        Each micro-batch of rows is transformed, chunked and filtered through the
+        manifest on its own, then embedded and upserted without waiting for a
+        full `embed_batch_size` batch. Near-duplicate collapsing needs the whole
+        catalog and is left to the batch pipeline; interrupted streams are resumed
+        by re-running the scrape (`ScrapeSink`), not by the ingestion checkpoint.
+        """
+        embed_batch_size = self.ingestion_config.get("embed_batch_size", 64)
+        chunker = ReviewChunker() if self.ingestion_config.get("chunking", "review") == "review" else None
+        manifest = None
+        if self.ingestion_config.get("incremental", True):
+            manifest = IngestionManifest(
+                self.ingestion_config.get("manifest_path", os.path.join("data", "ingestion_manifest.json")),
+                self.config["astra_db"]["collection_name"],
+            )
+
+        def _document_batches():
+            for rows in row_batches:
+                documents = documents_from_frame(pd.DataFrame(rows, columns=REQUIRED_COLUMNS))
+                if chunker is not None:
+                    chunker.add(documents)
+                    # Reviews shared with earlier products are re-emitted with the full product list
+                    documents = chunker.drain()
+                # Micro-batches go to the pipeline as they are, split only if above the embed batch size
+                for start in range(0, len(documents), embed_batch_size):
+                    yield documents[start:start + embed_batch_size]
+
+        document_batches = _document_batches()
+        if manifest:
+            document_batches = manifest.filter_changed(document_batches, allow_updates=True)
+
+        def _on_batch_committed(documents):
+            if manifest:
+                manifest.mark_committed(documents)
+            if on_batch_committed:
+                on_batch_committed(documents)
 
-    def run_pipeline(self):
+        def _on_batch_embedded(texts, vectors):
+            if self.embedding_store is not None:
+                self.embedding_store.put_texts(texts, vectors)
+
+        pipeline = self.build_pipeline(
+            on_progress=on_progress,
+            on_batch_committed=_on_batch_committed,
+            on_batch_embedded=_on_batch_embedded,
+        )
+        try:
+            report = pipeline.run(document_batches, rebatch_input=False)
+        finally:
+            if chunker is not None:
+                chunker.close()
+        print(f"Streaming ingestion finished: {report.summary()}")
+        if chunker is not None:
+            print(f"Review chunking: {chunker.stats}")
+        if self.embedding_store is not None:
+            self.embedding_store.compact()
+        if manifest:
+            # Only products streamed in this run were seen, so nothing is deleted here
+            manifest.save()
+            print(f"Incremental ingestion: {manifest.stats}")
+        return report
+
+    def stream(self) -> StreamingIngestion:
+        """Bounded scrape -> embed -> upsert stream configured from `ingestion.streaming`."""
+        stream_config = self.ingestion_config.get("streaming", {})
+        return StreamingIngestion(
+            self,
+            queue_size=stream_config.get("queue_size", 64),
+            micro_batch_size=stream_config.get("micro_batch_size", 16),
+            max_latency_s=stream_config.get("max_latency_s", 2.0),
+        )
+
+    def run_pipeline(self, on_progress=None):
         """Run the complete data ingestion pipeline. tranform data and store into vector DB. """
-        # Transform data into Document objects
-        documents = self.transform_data()
-        # Store documents in AstraDB Vector Store (pass documents)
-        vstore, _ = self.store_in_vetcor_db(documents)
+        document_batches = self.iter_index_documents()
+        manifest = None
+        if self.ingestion_config.get("incremental", True):
+            # Only new or changed products are embedded and upserted
+            manifest = IngestionManifest(
+                self.ingestion_config.get("manifest_path", os.path.join("data", "ingestion_manifest.json")),
+                self.config["astra_db"]["collection_name"],
+            )
+            document_batches = manifest.filter_changed(document_batches)
+
+        checkpoint = None
+        if self.ingestion_config.get("checkpoint", True):
+            # Progress is persisted per batch, so a crashed run resumes instead of starting over
+            checkpoint = IngestionCheckpoint(
+                self.ingestion_config.get("checkpoint_path", os.path.join("data", "ingestion_checkpoint.json")),
+                self.catalog_path if self.catalog_format == "parquet" else self.csv_path,
+                self.config["astra_db"]["collection_name"],
+                # The embedding store already persists every vector
+                cache_embeddings=self.embedding_store is None,
+            )
+            checkpoint.start()
+            document_batches = checkpoint.skip_committed(
+                document_batches,
+                # Upserted before the crash, but the manifest was not saved yet
+                on_skipped=manifest.mark_committed if manifest else None,
+            )
+
+        def _on_batch_committed(documents):
+            if manifest:
+                manifest.mark_committed(documents)
+            if checkpoint:
+                checkpoint.mark_committed(documents)
+
+        def _on_progress(summary):
+            if checkpoint:
+                checkpoint.record_progress(summary)
+            if on_progress:
+                on_progress(summary)
+
+        def _on_batch_embedded(texts, vectors):
+            if self.embedding_store is not None:
+                self.embedding_store.put_texts(texts, vectors)
+            if checkpoint:
+                checkpoint.record_embeddings(texts, vectors)
+
+        pipeline = self.build_pipeline(
+            on_progress=_on_progress,
+            on_batch_committed=_on_batch_committed,
+            on_batch_embedded=_on_batch_embedded,
+        )
+        if checkpoint:
+            # Vectors computed before the crash for batches that never got upserted
+            self.embeddings.preload_hashed(checkpoint.cached_embeddings())
+        # Stream Document batches from the CSV; embed ahead and upsert batch by batch
+        report = pipeline.run(document_batches)
+        print(f"Ingestion finished: {report.summary()}")
+        if checkpoint:
+            checkpoint.finish(len(report.failed_batches))
+        if self.embedding_store is not None:
+            # Merge the per-batch shards of this run
+            self.embedding_store.compact()
+            print(f"Embedding store: {len(self.embedding_store)} vectors at {self.embedding_store.path}")
+
+        if manifest:
+            # Failed batches stay out of the manifest, so the next run retries them
+            self._delete_removed(manifest)
+            manifest.save()
+            print(f"Incremental ingestion: {manifest.stats}")
+        if report.failed_batches:
+            print(f"{len(report.failed_batches)} batches failed; re-run the pipeline to retry them.")
+        vstore = self._get_vector_store()
 
         # Optionally do a quick check 
         # Perform a sample similarity search to verify data insertion
@@ -162,8 +469,19 @@ class DataIngestion:
     
 # Run if this file is executed directy
 if __name__ == "__main__":
-    # Create DataIngestion instance and run the pipeline
-    ingestion = DataIngestion()
-    ingestion.run_pipeline()
+    parser = argparse.ArgumentParser(description="Ingest the product catalog into the vector store.")
+    parser.add_argument("--status", action="store_true", help="Show progress of the last (or current) run and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        # Reads only the checkpoint file; no credentials needed
+        ingestion_config = load_config().get("ingestion", {})
+        print(IngestionCheckpoint.format_status(
+            ingestion_config.get("checkpoint_path", os.path.join("data", "ingestion_checkpoint.json"))
+        ))
+    else:
+        # Create DataIngestion instance and run the pipeline (resumes an interrupted run)
+        ingestion = DataIngestion()
+        ingestion.run_pipeline()
 
         
\ No newline at end of file
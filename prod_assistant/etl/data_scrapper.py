@@ -1,85 +1,176 @@
 import csv
-import time
-import re
 import os
-from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+import threading
+from prod_assistant.etl.catalog import write_catalog
+from prod_assistant.etl.browser_pool import DriverPool
+from prod_assistant.etl.http_fetcher import HttpFetcher
+from prod_assistant.etl.parsers import parse_document, parse_reviews, parse_search_results
+from prod_assistant.etl.scrape_cache import ScrapeCache
+from prod_assistant.etl.scrape_sink import ScrapeSink
+from prod_assistant.etl.waits import (
+    WaitStats,
+    adaptive_scroll,
+    dismiss_popup,
+    wait_for_count_stable,
+    wait_for_document_ready,
+    wait_for_network_idle,
+    wait_for_presence,
+)
+
+# Review container classes seen on Flipkart product pages
+REVIEW_SELECTOR = "div._27M-vq, div.col.EPCmJX, div._6K-7Co"
+# Result tiles on the search page
+SEARCH_TILE_SELECTOR = "div[data-id]"
+
+
+def search_url(query):
+    return f"https://www.flipkart.com/search?q={query.replace(' ', '+')}"
 
 class FlipkartScraper:
-    def __init__(self, output_dir="data"):
+    def __init__(self, output_dir="data", pool_size=1, pages_per_tab=10, pages_per_driver=200,
+                 fetch_mode="http", http_timeout=10, cache_dir=None, cache_ttl_s=3600):
         """Create a scraper instance.
 
         Args:
             output_dir: directory where CSV files will be written. Created if missing.
+            pool_size: number of Chrome browsers kept open and reused across pages and queries.
+            pages_per_tab: page loads before the working tab is replaced by a fresh one.
+            pages_per_driver: page loads before a browser is restarted.
+            fetch_mode: "http" fetches pages without a browser and parses them with lxml,
+                falling back to Chrome when the expected elements are missing; "browser"
+                always uses Chrome.
+            http_timeout: per-request timeout in seconds for HTTP mode.
+            cache_dir: directory of the scrape cache; defaults to `<output_dir>/scrape_cache`.
+            cache_ttl_s: seconds a cached search or product page is served without
+                refreshing it; 0 or None disables the cache.
         """
         self.output_dir = output_dir
         # ensure the output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
+        # Browsers start lazily on first use and stay open until close()
+        self.pool = DriverPool(pool_size, pages_per_tab=pages_per_tab, pages_per_driver=pages_per_driver)
+        # Time spent in condition waits vs. the fixed sleeps they replaced
+        self.wait_stats = WaitStats()
+        # Browserless fetching for server-rendered pages
+        self.fetch_mode = fetch_mode
+        self.fetcher = HttpFetcher(timeout=http_timeout, pool_size=max(10, pool_size * 2)) if fetch_mode == "http" else None
+        self.fetch_stats = {"http_pages": 0, "browser_fallbacks": 0}
+        self._stats_lock = threading.Lock()
+        # Parsed results + raw HTML of visited pages, refreshed once older than the TTL
+        self.cache = ScrapeCache(cache_dir or os.path.join(output_dir, "scrape_cache"), cache_ttl_s) if cache_ttl_s else None
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.fetch_stats[key] += 1
+
+    def close(self):
+        """Quit every browser this scraper started."""
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    def get_top_reviews(self,product_url,count=2):
+    def _from_cache(self, entry, url, touch):
+        """Serve a cache entry if it is fresh or unchanged upstream.
+
+        Returns (value, page_html): value is None when the page must be scraped
+        again; page_html is the new page body when a conditional refresh found
+        it changed, so it is not downloaded twice.
+        """
+        if entry is None:
+            return None, None
+        if entry["fresh"]:
+            return entry["value"], None
+        # Stale: without validators (or a fetcher) the page has to be scraped again
+        if self.fetcher is None or not (entry["etag"] or entry["last_modified"]):
+            return None, None
+        not_modified, page_html = self.fetcher.revalidate(url, entry["etag"], entry["last_modified"])
+        if not_modified:
+            touch()
+            return entry["value"], None
+        return None, page_html
+
+    def get_top_reviews(self,product_url,count=2,browser=None):
         """Get the top reviews for a product.
 
-        This opens the product URL in a headful Chrome instance and scrolls
-        the page to allow reviews to load. It then parses the rendered HTML
-        with BeautifulSoup and extracts textual review blocks.
+        Fresh reviews are served from the scrape cache. Otherwise the page is
+        fetched over HTTP, or opened in a pooled Chrome session and scrolled
+        until `count` reviews have loaded (waiting on page state, not fixed
+        sleeps). One snapshot of the HTML is parsed with the lxml parsers and
+        cached together with the reviews.
 
         Args:
             product_url: full URL of the product page on Flipkart
             count: maximum number of top reviews to return
+            browser: BrowserSession to use; one is checked out of the pool if omitted
 
         Returns:
             A string with reviews joined by ' || ', or 'No reviews found'.
         """
-        options = uc.ChromeOptions()
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        driver = uc.Chrome(options=options,use_subprocess=True)
-
         # Validate URL early
         if not product_url.startswith("http"):
-            driver.quit()
             return "No reviews found"
 
-        try:
-            # Open product page and wait for initial content
-            driver.get(product_url)
-            time.sleep(4)
-
-            # Try to close any initial popup (the selector may not always match)
-            try:
-                driver.find_element(By.XPATH, "//button[contains(text(), '✕')]").click()
-                time.sleep(1)
-            except Exception as e:
-                # Popup not present or different selector
-                print(f"Error occurred while closing popup: {e}")
-
-            # Scroll down to load lazy content (reviews often load after scrolling)
-            for _ in range(4):
-                ActionChains(driver).send_keys(Keys.END).perform()
-                time.sleep(1.5)
-
-            # Parse rendered HTML and select common review container classes
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            review_blocks = soup.select("div._27M-vq, div.col.EPCmJX, div._6K-7Co")
-            seen = set()
-            reviews = []
-
-            # Deduplicate and collect up to `count` reviews
-            for block in review_blocks:
-                text = block.get_text(separator=" ", strip=True)
-                if text and text not in seen:
-                    reviews.append(text)
-                    seen.add(text)
-                if len(reviews) >= count:
-                    break
-        except Exception:
-            reviews = []
-
-        driver.quit()
+        page_html = None
+        if self.cache is not None:
+            entry = self.cache.get_reviews(product_url, count)
+            reviews, page_html = self._from_cache(entry, product_url, lambda: self.cache.touch_reviews(product_url))
+            if reviews is not None:
+                return " || ".join(reviews)
+
+        reviews = self._fetch_reviews(product_url, count, browser, page_html)
         return " || ".join(reviews) if reviews else "No reviews found"
+
+    def _fetch_reviews(self, product_url, count, browser=None, page_html=None):
+        """Scrape up to `count` reviews of a product page and cache them."""
+        if self.fetcher is not None:
+            # Server-rendered reviews need no browser at all
+            page_html = page_html or self.fetcher.fetch(product_url)
+            reviews = parse_reviews(page_html, count) if page_html else []
+            if reviews:
+                self._count("http_pages")
+                if self.cache is not None:
+                    self.cache.put_reviews(product_url, count, reviews, page_html, *self.fetcher.last_validators())
+                return reviews
+            self._count("browser_fallbacks")
+        return self._fetch_reviews_with_browser(product_url, count, browser)
+
+    def _fetch_reviews_with_browser(self, product_url, count, browser=None):
+        """Open the product page in Chrome, scroll until `count` reviews loaded, and cache them."""
+        if browser is None:
+            with self.pool.session() as browser:
+                return self._fetch_reviews_with_browser(product_url, count, browser)
+
+        try:
+            # Open product page and wait for initial content (previously a fixed 4s sleep)
+            driver = browser.get(product_url)
+            with self.wait_stats.step("product_load", replaced_s=4):
+                wait_for_document_ready(driver, timeout=10)
+                wait_for_network_idle(driver, idle_s=0.5, timeout=4)
+
+            # Close the initial popup if it appears (previously a 1s sleep after clicking)
+            with self.wait_stats.step("product_popup", replaced_s=1):
+                dismiss_popup(driver, timeout=1)
+
+            # Scroll only until `count` reviews are present (previously 4 x END + 1.5s)
+            with self.wait_stats.step("review_scroll", replaced_s=6):
+                adaptive_scroll(driver, REVIEW_SELECTOR, target_count=count, max_scrolls=6, step_timeout=2)
+            self.wait_stats.page_done()
+
+            # One page_source snapshot, parsed once with lxml
+            page_html = driver.page_source
+            reviews = parse_reviews(parse_document(page_html), count)
+        except Exception as e:
+            # Restart the browser if the page crashed it; the next product gets a working session
+            browser.recover(e)
+            return []
+
+        if reviews and self.cache is not None:
+            self.cache.put_reviews(product_url, count, reviews, page_html)
+        return reviews
     
     def scrape_flipkart_products(self, query, max_products=1, review_count=2):
         """Scrape Flipkart products based on a search query.
@@ -96,67 +187,115 @@ class FlipkartScraper:
         Returns:
             A list of lists: [product_id, title, rating, total_reviews, price, top_reviews]
         """
-        options = uc.ChromeOptions()
-        driver = uc.Chrome(options=options,use_subprocess=True)
-        search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '+')}"
-        driver.get(search_url)
-        time.sleep(4)
-
-        # Try to dismiss initial popup on the search page
-        try:
-            driver.find_element(By.XPATH, "//button[contains(text(), '✕')]").click()
-        except Exception as e:
-            # It's fine if the popup is not present
-            print(f"Error occurred while closing popup: {e}")
-
-        time.sleep(2)
+        # A browser is only checked out (and started) when a page needs one
+        tiles = self.search_products(query, max_products)
+        # Product pages are visited after the search tiles are read: a browser tab
+        # is reused, which would invalidate the tile elements
         products = []
-
-        # Select result items; Flipkart uses `data-id` on product tiles
-        items = driver.find_elements(By.CSS_SELECTOR, "div[data-id]")[:max_products]
-        for item in items:
-            try:
-                # Extract visible fields from the search result tile
-                title = item.find_element(By.CSS_SELECTOR, "div.KzDlHZ").text.strip()
-                price = item.find_element(By.CSS_SELECTOR, "div.Nx9bqj").text.strip()
-                rating = item.find_element(By.CSS_SELECTOR, "div.XQDdHH").text.strip()
-                reviews_text = item.find_element(By.CSS_SELECTOR, "span.Wphh3N").text.strip()
-                match = re.search(r"\d+(,\d+)?(?=\s+Reviews)", reviews_text)
-                total_reviews = match.group(0) if match else "N/A"
-
-                link_el = item.find_element(By.CSS_SELECTOR, "a[href*='/p/']")
-                href = link_el.get_attribute("href")
-                product_link = href if href.startswith("http") else "https://www.flipkart.com" + href
-                match = re.findall(r"/p/(itm[0-9A-Za-z]+)", href)
-                product_id = match[0] if match else "N/A"
-            except Exception as e:
-                # If a single tile fails to parse, skip it and proceed
-                print(f"Error occurred while processing item: {e}")
-                continue
-
+        for product_id, title, rating, total_reviews, price, product_link in tiles:
             # Optionally visit the product page to grab top reviews
             top_reviews = self.get_top_reviews(product_link, count=review_count) if "flipkart.com" in product_link else "Invalid product URL"
             products.append([product_id, title, rating, total_reviews, price, top_reviews])
-
-        # Close the browser and return collected products
-        driver.quit()
         return products
+
+    def search_products(self, query, max_products=1, browser=None):
+        """Result tiles for `query`: [product_id, title, rating, total_reviews, price, product_link].
+
+        Fresh results come from the scrape cache. In HTTP mode the search page is
+        fetched and parsed without a browser; Chrome is used only when the response
+        has no product tiles (e.g. a client-rendered shell).
+        """
+        url = search_url(query)
+        page_html = None
+        if self.cache is not None:
+            entry = self.cache.get_search(query, max_products)
+            tiles, page_html = self._from_cache(entry, url, lambda: self.cache.touch_search(query))
+            if tiles is not None:
+                return tiles
+
+        if self.fetcher is not None:
+            page_html = page_html or self.fetcher.fetch(url)
+            tiles = parse_search_results(page_html, max_products) if page_html else []
+            if tiles:
+                self._count("http_pages")
+                if self.cache is not None:
+                    self.cache.put_search(query, max_products, tiles, url, page_html, *self.fetcher.last_validators())
+                return tiles
+            self._count("browser_fallbacks")
+
+        if browser is None:
+            with self.pool.session() as browser:
+                return self._scrape_search_results(browser, query, max_products)
+        return self._scrape_search_results(browser, query, max_products)
+
+    def _scrape_search_results(self, browser, query, max_products):
+        """Read up to `max_products` result tiles: [product_id, title, rating, total_reviews, price, product_link]."""
+        url = search_url(query)
+        driver = browser.get(url)
+        # Wait for the first result tile (previously a fixed 4s sleep)
+        with self.wait_stats.step("search_load", replaced_s=4):
+            wait_for_presence(driver, SEARCH_TILE_SELECTOR, timeout=10)
+
+        # Try to dismiss initial popup on the search page
+        with self.wait_stats.step("search_popup", replaced_s=0):
+            dismiss_popup(driver, timeout=1)
+
+        # Wait until enough tiles have rendered and the count settles (previously a fixed 2s sleep)
+        with self.wait_stats.step("search_tiles", replaced_s=2):
+            wait_for_count_stable(driver, SEARCH_TILE_SELECTOR, settle_s=0.3, timeout=5, min_count=max_products)
+        self.wait_stats.page_done()
+        # One page_source snapshot parsed in a single pass, instead of a WebDriver
+        # round trip per field per tile
+        page_html = driver.page_source
+        tiles = parse_search_results(parse_document(page_html), max_products)
+        if tiles and self.cache is not None:
+            self.cache.put_search(query, max_products, tiles, url, page_html)
+        return tiles
     
-    def save_to_csv(self, data, filename="product_reviews.csv"):
-        """Save the scraped product reviews to a CSV file."""
-        # Determine destination path. Support absolute paths and subfolders.
+    def _output_path(self, filename):
+        """Resolve an output file: absolute paths and subfolders as given, plain names under output_dir."""
         if os.path.isabs(filename):
-            path = filename
-        elif os.path.dirname(filename):  # filename includes subfolder like 'data/product_reviews.csv'
-            path = filename
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-        else:
-            # plain filename like 'output.csv'
-            path = os.path.join(self.output_dir, filename)
+            return filename
+        if os.path.dirname(filename):  # filename includes subfolder like 'data/product_reviews.csv'
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            return filename
+        # plain filename like 'output.csv'
+        return os.path.join(self.output_dir, filename)
 
+    def save_to_csv(self, data, filename="product_reviews.csv"):
+        """Save the scraped product reviews to a CSV file.
+
+        The file is written aside and renamed over the old one, so a crash never
+        leaves a half-written CSV. For long scrapes prefer `open_sink`.
+        """
+        path = self._output_path(filename)
+        tmp_path = f"{path}.tmp"
         # Write CSV with a header row matching the scraper's data structure
-        with open(path, "w", newline="", encoding="utf-8") as f:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(["product_id", "product_title", "rating", "total_reviews", "price", "top_reviews"])
             writer.writerows(data)
-        
\ No newline at end of file
+        os.replace(tmp_path, path)
+
+    def open_sink(self, filename="product_reviews.csv", jsonl_filename=None, parquet_dirname=None, resume=False, **kwargs):
+        """Append-only sink deduplicating rows on product_id as they are scraped.
+
+        Rows go to the CSV (and optionally a JSONL file and the Parquet catalog)
+        with periodic fsync'd flushes; `resume=True` continues an interrupted
+        scrape instead of replacing its output. See `ScrapeSink`.
+        """
+        return ScrapeSink(
+            csv_path=self._output_path(filename) if filename else None,
+            jsonl_path=self._output_path(jsonl_filename) if jsonl_filename else None,
+            parquet_dir=self._output_path(parquet_dirname) if parquet_dirname else None,
+            resume=resume,
+            **kwargs,
+        )
+
+    def save_to_parquet(self, data, dirname="catalog", scrape_date=None):
+        """Save the scraped product reviews to the typed Parquet catalog.
+
+        Rows land in `<dirname>/scrape_date=YYYY-MM-DD/`; price, rating and
+        total_reviews are stored as numbers instead of display strings.
+        """
+        return write_catalog(data, self._output_path(dirname), scrape_date)
@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from prod_assistant.etl.ingestion_pipeline import text_hash
+
+
+class EmbeddingStore:
+    """
+    Local, backend-independent copy of every embedding computed at ingestion.
+
+    Vectors live under ``<root>/<model>/`` (one directory per embedding model,
+    so vectors of different models never mix) as float32 ``.npy`` shards that
+    are opened memory-mapped, plus ``index.jsonl`` mapping each content hash
+    (``text_hash`` of the embedded text) to its shard and row.
+
+    Every ``put`` writes (and fsyncs) its vectors as a new shard before
+    indexing them, so a crash never leaves an index entry pointing at missing
+    data; ``compact`` merges the small shards a run leaves behind into
+    ``shard_size`` row shards and leaves full shards untouched.
+    """
+
+    def __init__(self, root: str, model_name: str, shard_size: int = 8192):
+        self.model_name = model_name
+        self.path = os.path.join(root, re.sub(r"[^A-Za-z0-9._-]+", "_", model_name))
+        self.index_path = os.path.join(self.path, "index.jsonl")
+        self.shard_size = shard_size
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[str, int]] = {}
+        self._shards: Dict[str, np.ndarray] = {}
+        # Lines in index.jsonl, including entries superseded by compaction
+        self._index_lines = 0
+        os.makedirs(self.path, exist_ok=True)
+        self._load_index()
+        existing = [int(n[6:-4]) for n in os.listdir(self.path) if re.fullmatch(r"shard-\d+\.npy", n)]
+        self._next_shard = max(existing, default=-1) + 1
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-append
+                    continue
+                self._index[entry["h"]] = (entry["s"], entry["r"])
+                self._index_lines += 1
+
+    def _shard(self, name: str) -> np.ndarray:
+        if name not in self._shards:
+            self._shards[name] = np.load(os.path.join(self.path, name), mmap_mode="r")
+        return self._shards[name]
+
+    def _next_shard_name(self) -> str:
+        while True:
+            name = f"shard-{self._next_shard:06d}.npy"
+            self._next_shard += 1
+            # Another process writing the same store may have taken this number
+            if not os.path.exists(os.path.join(self.path, name)):
+                return name
+
+    def _fsync_dir(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _save_atomic(self, path: str, array: np.ndarray):
+        """Write, fsync and rename into place, then fsync the directory so the rename is durable too."""
+        tmp_path = f"{path}.tmp.npy"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_dir()
+
+    def _append_index(self, entries: List[dict]):
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        self._index_lines += len(entries)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Vectors for content hashes (None where the store has none)."""
+        vectors = []
+        with self._lock:
+            for key in keys:
+                location = self._index.get(key)
+                if location is None:
+                    vectors.append(None)
+                    continue
+                shard, row = location
+                vectors.append(self._shard(shard)[row].tolist())
+        return vectors
+
+    def get_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return self.get_many([text_hash(t) for t in texts])
+
+    def put_texts(self, texts: List[str], vectors: List[List[float]]):
+        self.put_many([text_hash(t) for t in texts], vectors)
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]):
+        """Persist vectors (skipping ones already stored) as a new shard and index them."""
+        with self._lock:
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index:
+                    fresh[key] = vector
+            if not fresh:
+                return
+            name = self._next_shard_name()
+            self._save_atomic(os.path.join(self.path, name), np.asarray(list(fresh.values()), dtype=np.float32))
+            entries = [{"h": key, "s": name, "r": row} for row, key in enumerate(fresh)]
+            self._append_index(entries)
+            for entry in entries:
+                self._index[entry["h"]] = (entry["s"], entry["r"])
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """All ``(content hash, vector)`` pairs, shard by shard (vectors are mmap views)."""
+        by_shard: Dict[str, List[Tuple[str, int]]] = {}
+        with self._lock:
+            for key, (shard, row) in self._index.items():
+                by_shard.setdefault(shard, []).append((key, row))
+        for shard, rows in by_shard.items():
+            array = self._shard(shard)
+            for key, row in rows:
+                yield key, array[row]
+
+    def compact(self):
+        """
+        Merge under-filled shards (fewer than ``shard_size`` live rows) into full ones.
+
+        Full shards are left as they are, so the I/O is proportional to the
+        small shards a run wrote, not to the whole store. Moved rows are
+        appended to the index (the last entry for a hash wins) and the index
+        is only rewritten once superseded lines outnumber live ones.
+        """
+        with self._lock:
+            rows_by_shard: Dict[str, List[Tuple[str, int]]] = {}
+            for key, (shard, row) in self._index.items():
+                rows_by_shard.setdefault(shard, []).append((key, row))
+            small = sorted(shard for shard, rows in rows_by_shard.items() if len(rows) < self.shard_size)
+            if len(small) < 2:
+                return
+            moving = [(shard, key, row) for shard in small for key, row in rows_by_shard[shard]]
+            dimension = self._shard(small[0]).shape[1]
+            entries = []
+            for start in range(0, len(moving), self.shard_size):
+                chunk = moving[start:start + self.shard_size]
+                array = np.empty((len(chunk), dimension), dtype=np.float32)
+                for i, (shard, _, row) in enumerate(chunk):
+                    array[i] = self._shard(shard)[row]
+                name = self._next_shard_name()
+                self._save_atomic(os.path.join(self.path, name), array)
+                entries.extend({"h": key, "s": name, "r": i} for i, (_, key, _) in enumerate(chunk))
+
+            # New shards are durable before the index points at them, and the index before old shards go
+            self._append_index(entries)
+            for entry in entries:
+                self._index[entry["h"]] = (entry["s"], entry["r"])
+            if self._index_lines > 2 * len(self._index):
+                self._rewrite_index()
+            for shard in small:
+                self._shards.pop(shard, None)
+                os.remove(os.path.join(self.path, shard))
+
+    def _rewrite_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps({"h": k, "s": s, "r": r}) + "\n" for k, (s, r) in self._index.items())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._fsync_dir()
+        self._index_lines = len(self._index)
@@ -0,0 +1,111 @@
+import threading
+from typing import Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Plain desktop browser headers; Flipkart serves bot-looking clients an empty shell
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+
+
+class HttpFetcher:
+    """
+    Pooled, keep-alive HTTP client for server-rendered pages.
+
+    One ``requests.Session`` per thread (sessions are not thread-safe), each
+    with a connection pool of ``pool_size`` and retries on connection errors
+    and 429/5xx. ``fetch`` returns the page HTML, or None when the page could
+    not be fetched so the caller can fall back to the browser.
+
+    The ETag / Last-Modified of the last response on the calling thread are
+    kept for ``last_validators``, so a cached page can later be ``revalidate``-d
+    with a conditional GET instead of being downloaded and parsed again.
+    """
+
+    def __init__(self, timeout: float = 10.0, pool_size: int = 10, max_retries: int = 2, headers: Optional[dict] = None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self._local = threading.local()
+        # Scrape workers fetch concurrently
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "not_modified": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            retry = Retry(
+                total=self.max_retries,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    def _get(self, url: str, headers: Optional[dict] = None):
+        self._count("requests")
+        self._local.validators = (None, None)
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+        except requests.RequestException as e:
+            self._count("errors")
+            print(f"[http] fetch failed for {url}: {e}")
+            return None
+        if response.status_code not in (200, 304):
+            self._count("errors")
+            print(f"[http] {url} returned HTTP {response.status_code}")
+            return None
+        self._local.validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response
+
+    def fetch(self, url: str) -> Optional[str]:
+        response = self._get(url)
+        if response is None or response.status_code != 200:
+            return None
+        self._count("ok")
+        return response.text
+
+    def revalidate(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Conditional GET for a cached page.
+
+        Returns ``(True, None)`` when the server answers 304 Not Modified,
+        ``(False, html)`` when the page changed and ``(False, None)`` on errors.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = self._get(url, headers=headers)
+        if response is None:
+            return False, None
+        if response.status_code == 304:
+            self._count("not_modified")
+            return True, None
+        self._count("ok")
+        return False, response.text
+
+    def last_validators(self) -> Tuple[Optional[str], Optional[str]]:
+        """(ETag, Last-Modified) of the last response fetched on this thread."""
+        return getattr(self._local, "validators", (None, None))
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+from prod_assistant.etl.ingestion_pipeline import text_hash
+from prod_assistant.etl.ingestion_manifest import content_hash
+
+
+class IngestionCheckpoint:
+    """
+    Progress of an ingestion run, persisted after every committed batch so a
+    crashed run can resume where it stopped.
+
+    Three files share the checkpoint path:
+
+    - ``<path>``: small JSON state (run id, status, last committed batch,
+      counters, throughput), rewritten atomically.
+    - ``<path>.ids``: append-only log of document ids already upserted, each
+      with the content hash of the version that was upserted.
+    - ``<path>.embeddings.jsonl``: append-only cache of vectors computed in this
+      run, so batches that were embedded but not upserted are not paid for twice.
+
+    A run that finishes without failed batches is marked ``completed`` and its
+    sidecars are removed; the next run then starts fresh. With
+    ``cache_embeddings=False`` (a persistent ``EmbeddingStore`` already keeps
+    every vector) only the count of embedded texts is recorded.
+    """
+
+    def __init__(self, path: str, source: str, collection_name: str, cache_embeddings: bool = True):
+        self.path = path
+        self.ids_path = f"{path}.ids"
+        self.embeddings_path = f"{path}.embeddings.jsonl"
+        self.cache_embeddings = cache_embeddings
+        self.source = source
+        self.collection_name = collection_name
+        self.state = self.load_state(path) or {}
+        # {document id: content hash upserted}; None for logs written before hashes were kept
+        self.committed_ids: dict = {}
+        self.resumed = self._can_resume()
+        if self.resumed:
+            self.committed_ids = self._read_ids()
+        else:
+            self._reset()
+        self._run_started = time.perf_counter()
+        # record_embeddings is called from the embedding workers
+        self._lock = threading.Lock()
+        self._base_elapsed = self.state.get("elapsed_seconds", 0.0)
+
+    @staticmethod
+    def load_state(path: str) -> Optional[dict]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _can_resume(self) -> bool:
+        return (
+            self.state.get("status") in ("running", "failed")
+            and self.state.get("source") == self.source
+            and self.state.get("collection_name") == self.collection_name
+        )
+
+    def _reset(self):
+        for sidecar in (self.ids_path, self.embeddings_path):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+        now = datetime.now(timezone.utc).isoformat()
+        self.state = {
+            "run_id": uuid.uuid4().hex[:12],
+            "status": "running",
+            "source": self.source,
+            "collection_name": self.collection_name,
+            "started_at": now,
+            "updated_at": now,
+            "resumes": 0,
+            "last_committed_batch": 0,
+            "docs_upserted": 0,
+            "texts_embedded": 0,
+            "docs_skipped": 0,
+            "failed_batches": 0,
+            "elapsed_seconds": 0.0,
+        }
+        self._write_state()
+
+    def _read_ids(self) -> dict:
+        ids = {}
+        if not os.path.exists(self.ids_path):
+            return ids
+        with open(self.ids_path, "r", encoding="utf-8") as f:
+            for line in f:
+                doc_id, _, digest = line.rstrip("\n").partition("\t")
+                if doc_id:
+                    ids[doc_id] = digest or None
+        return ids
+
+    def _write_state(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _append(path: str, lines: List[str]):
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ---------- resume ----------
+    def start(self):
+        if self.resumed:
+            self.state["resumes"] = self.state.get("resumes", 0) + 1
+            self.state["status"] = "running"
+            self._write_state()
+            print(f"[ingestion] resuming run {self.state['run_id']} after batch "
+                  f"{self.state['last_committed_batch']} ({len(self.committed_ids)} documents already upserted)")
+
+    def skip_committed(self, document_batches: Iterable[List[Document]],
+                       on_skipped=None) -> Iterator[List[Document]]:
+        """
+        Drop documents this run already upserted before it was interrupted.
+
+        A document whose content changed since it was upserted is passed through
+        again. ``on_skipped(documents, hashes)`` receives the skipped documents
+        with the content hash each was upserted with.
+        """
+        for batch in document_batches:
+            pending, skipped, hashes = [], [], {}
+            for doc in batch:
+                if doc.id not in self.committed_ids:
+                    pending.append(doc)
+                    continue
+                upserted = self.committed_ids[doc.id]
+                if upserted is not None and upserted != content_hash(doc):
+                    pending.append(doc)
+                    continue
+                skipped.append(doc)
+                hashes[doc.id] = upserted
+            if skipped:
+                with self._lock:
+                    self.state["docs_skipped"] += len(skipped)
+                if on_skipped:
+                    on_skipped(skipped, hashes)
+            if pending:
+                yield pending
+
+    def cached_embeddings(self) -> dict:
+        """``{text hash: vector}`` computed earlier in this run."""
+        vectors = {}
+        if self.resumed and os.path.exists(self.embeddings_path):
+            with open(self.embeddings_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves at most one torn line
+                        continue
+                    vectors[record["h"]] = record["v"]
+        return vectors
+
+    # ---------- progress ----------
+    def record_embeddings(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock:
+            if self.cache_embeddings:
+                self._append(self.embeddings_path, [json.dumps({"h": text_hash(t), "v": v}) for t, v in zip(texts, vectors)])
+            self.state["texts_embedded"] += len(texts)
+            self._touch()
+
+    def mark_committed(self, documents: List[Document]):
+        hashes = {doc.id: content_hash(doc) for doc in documents if doc.id}
+        with self._lock:
+            self._append(self.ids_path, [f"{doc_id}\t{digest}" for doc_id, digest in hashes.items()])
+            self.committed_ids.update(hashes)
+            self.state["last_committed_batch"] += 1
+            self.state["docs_upserted"] += len(documents)
+            self._touch()
+
+    def record_progress(self, summary: dict):
+        with self._lock:
+            self.state["failed_batches"] = summary.get("batches_failed", 0)
+            self._touch()
+
+    def _touch(self):
+        self.state["elapsed_seconds"] = round(self._base_elapsed + time.perf_counter() - self._run_started, 2)
+        elapsed = self.state["elapsed_seconds"]
+        self.state["docs_per_sec"] = round(self.state["docs_upserted"] / elapsed, 2) if elapsed else 0.0
+        self.state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        self._write_state()
+
+    def finish(self, failed_batches: int):
+        self.state["failed_batches"] = failed_batches
+        self.state["status"] = "failed" if failed_batches else "completed"
+        with self._lock:
+            self._touch()
+        if not failed_batches:
+            for sidecar in (self.ids_path, self.embeddings_path):
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
+
+    @classmethod
+    def format_status(cls, path: str) -> str:
+        """Human-readable progress for ``data_ingestion --status``."""
+        state = cls.load_state(path)
+        if state is None:
+            return f"No ingestion checkpoint at {path}"
+        lines = [f"{key:>22}: {state[key]}" for key in (
+            "run_id", "status", "source", "collection_name", "started_at", "updated_at", "resumes",
+            "last_committed_batch", "docs_upserted", "docs_skipped", "texts_embedded", "failed_batches",
+            "elapsed_seconds", "docs_per_sec",
+        ) if key in state]
+        return "\n".join(lines)
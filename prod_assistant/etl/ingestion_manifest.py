@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+
+
+def product_document_id(product_id, product_title: str = "") -> str:
+    """Deterministic vector store id for a product row.
+
+    The scraper writes "N/A" when it cannot read an id, so fall back to a hash of
+    the title rather than letting unrelated products collide on one id.
+    """
+    product_id = "" if product_id is None else str(product_id).strip()
+    if product_id and product_id.lower() not in ("n/a", "nan", "none"):
+        return product_id
+    return "title-" + hashlib.sha1(str(product_title).encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(doc: Document) -> str:
+    """Hash over the document text and metadata; any change means it must be re-embedded."""
+    payload = json.dumps({"content": doc.page_content, "metadata": doc.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    """
+    Local record of what is already in the vector store: ``{document id: content hash}``
+    per collection.
+
+    ``filter_changed`` passes through only new or modified documents, ``mark_committed``
+    records them once they are upserted, and ``removed_ids`` lists documents that
+    were ingested before but no longer exist in the source, so a re-run costs only
+    the delta.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = path
+        self.collection_name = collection_name
+        self._data = self._load()
+        collection = self._data["collections"].setdefault(collection_name, {"docs": {}})
+        self.entries: dict = collection["docs"]
+        self._seen: set = set()
+        self._pending: dict = {}
+        self.stats = {"new": 0, "changed": 0, "unchanged": 0, "duplicates": 0, "removed": 0}
+
+    def _load(self) -> dict:
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"collections": {}}
+
+    def filter_changed(self, document_batches: Iterable[List[Document]],
+                       allow_updates: bool = False) -> Iterator[List[Document]]:
+        """Yield each batch reduced to documents that are new or whose content hash changed.
+
+        With ``allow_updates`` (streaming sources) a document seen earlier in the
+        same run passes again when its content changed since then.
+        """
+        for batch in document_batches:
+            changed = []
+            for doc in batch:
+                if doc.id in self._seen and not allow_updates:
+                    # Same id twice in one source: keep the first occurrence
+                    self.stats["duplicates"] += 1
+                    continue
+                self._seen.add(doc.id)
+                digest = content_hash(doc)
+                pending = self._pending.get(doc.id)
+                previous = pending[0] if pending else self.entries.get(doc.id)
+                if previous == digest:
+                    self.stats["unchanged"] += 1
+                    continue
+                self.stats["new" if previous is None else "changed"] += 1
+                self._pending[doc.id] = (digest, doc)
+                changed.append(doc)
+            if changed:
+                yield changed
+
+    def mark_committed(self, documents: List[Document], hashes: Optional[dict] = None):
+        """Record documents as stored (called once their batch is upserted).
+
+        ``hashes`` overrides the recorded content hash per id, for documents
+        upserted by an earlier, interrupted run whose content may differ now.
+        """
+        for doc in documents:
+            pending = self._pending.get(doc.id)
+            # A streamed document may have a newer version pending; only this one is stored
+            if pending and pending[1] is doc:
+                del self._pending[doc.id]
+                digest = pending[0]
+            else:
+                digest = content_hash(doc)
+            self.entries[doc.id] = (hashes or {}).get(doc.id) or digest
+
+    def removed_ids(self) -> List[str]:
+        """Ids ingested previously but absent from the source seen by ``filter_changed``."""
+        return [doc_id for doc_id in self.entries if doc_id not in self._seen]
+
+    def forget(self, ids: List[str]):
+        for doc_id in ids:
+            self.entries.pop(doc_id, None)
+        self.stats["removed"] += len(ids)
+
+    def save(self):
+        """Write atomically so a crash never leaves a truncated manifest behind."""
+        self._data["collections"][self.collection_name]["updated_at"] = datetime.now(timezone.utc).isoformat()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,266 @@
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from prod_assistant.utils.rate_limiter import backoff_delay
+
+
+def text_hash(text: str) -> str:
+    """Stable key for an embedding input."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """
+    Embeddings that serve vectors computed ahead of time.
+
+    The vector store is built on top of this object, so when the pipeline
+    upserts a batch whose vectors were already computed by the embedding
+    workers, ``add_documents`` gets them from here instead of calling the
+    provider again. With a persistent ``store`` (see ``EmbeddingStore``)
+    vectors from earlier runs are served from disk as well. Unknown texts
+    fall through to the wrapped client.
+    """
+
+    def __init__(self, inner: Embeddings, store=None):
+        self.inner = inner
+        self.store = store
+        self._vectors: dict = {}
+        self._lock = threading.Lock()
+
+    def preload(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                self._vectors[text_hash(text)] = vector
+
+    def preload_hashed(self, vectors_by_hash: dict):
+        """Preload vectors already keyed by ``text_hash`` (e.g. from a checkpoint)."""
+        with self._lock:
+            self._vectors.update(vectors_by_hash)
+
+    def lookup(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Vectors already held for ``texts`` in memory or in the store (None where there is none)."""
+        keys = [text_hash(t) for t in texts]
+        with self._lock:
+            vectors = [self._vectors.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing and self.store is not None:
+            for i, vector in zip(missing, self.store.get_many([keys[i] for i in missing])):
+                vectors[i] = vector
+        return vectors
+
+    def discard(self, texts: List[str]):
+        with self._lock:
+            for text in texts:
+                self._vectors.pop(text_hash(text), None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found = self.lookup(texts)
+        missing = [i for i, vector in enumerate(found) if vector is None]
+        if missing:
+            computed = self.inner.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                found[i] = vector
+            if self.store is not None:
+                self.store.put_texts([texts[i] for i in missing], computed)
+        return found
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
+
+
+@dataclass
+class PipelineReport:
+    """Outcome and throughput of one embed + upsert run."""
+    batches_total: int = 0
+    batches_committed: int = 0
+    docs_upserted: int = 0
+    texts_embedded: int = 0
+    embed_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    failed_batches: List[dict] = field(default_factory=list)
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs_upserted / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def embeddings_per_sec(self) -> float:
+        # Embedding runs on several workers, so this is relative to wall time, not summed worker time
+        return self.texts_embedded / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "batches_total": self.batches_total,
+            "batches_committed": self.batches_committed,
+            "batches_failed": len(self.failed_batches),
+            "docs_upserted": self.docs_upserted,
+            "texts_embedded": self.texts_embedded,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "docs_per_sec": round(self.docs_per_sec, 2),
+            "embeddings_per_sec": round(self.embeddings_per_sec, 2),
+        }
+
+
+def rebatch(document_batches: Iterable[List[Document]], batch_size: int) -> Iterable[List[Document]]:
+    """Re-chunk an iterable of Document lists into lists of exactly ``batch_size`` (last one may be short)."""
+    buffer: List[Document] = []
+    for batch in document_batches:
+        buffer.extend(batch)
+        while len(buffer) >= batch_size:
+            yield buffer[:batch_size]
+            buffer = buffer[batch_size:]
+    if buffer:
+        yield buffer
+
+
+class EmbeddingUpsertPipeline:
+    """
+    Embed and upsert documents in batches with bounded concurrency.
+
+    Up to ``embed_concurrency`` batches are embedded ahead on a thread pool
+    while the current batch is being upserted, so embedding of batch N+1
+    overlaps the upsert of batch N. The source is read on its own thread, so a
+    source that blocks waiting for data (a live scrape) never holds up the
+    upsert of batches that are already embedded. Each batch is retried on its
+    own with jittered exponential backoff; a batch that still fails is
+    recorded in the report and the run carries on with the next one.
+    """
+
+    def __init__(self, embeddings: PrecomputedEmbeddings, vector_store, batch_size: int = 64,
+                 embed_concurrency: int = 4, max_retries: int = 3, backoff_base_s: float = 1.0,
+                 backoff_max_s: float = 30.0, on_progress: Optional[Callable[[dict], None]] = None,
+                 on_batch_committed: Optional[Callable[[List[Document]], None]] = None,
+                 on_batch_embedded: Optional[Callable[[List[str], List[List[float]]], None]] = None):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.on_progress = on_progress
+        self.on_batch_committed = on_batch_committed
+        self.on_batch_embedded = on_batch_embedded
+
+    def _with_retries(self, what: str, batch_no: int, fn):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base_s, self.backoff_max_s)
+                print(f"[ingestion] {what} failed for batch {batch_no} (attempt {attempt + 1}): {e}; "
+                      f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _embed(self, batch_no: int, documents: List[Document]):
+        texts = [doc.page_content for doc in documents]
+        start = time.perf_counter()
+        # Vectors preloaded from an earlier, interrupted run are reused
+        vectors = self.embeddings.lookup(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        computed = []
+        if missing:
+            computed = self._with_retries(
+                "embedding", batch_no, lambda: self.embeddings.inner.embed_documents([texts[i] for i in missing])
+            )
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            if self.on_batch_embedded:
+                # Runs on the embedding worker, so vectors are persisted even if the upsert never happens
+                self.on_batch_embedded([texts[i] for i in missing], computed)
+        return texts, vectors, len(missing), time.perf_counter() - start
+
+    def _upsert(self, batch_no: int, documents: List[Document]) -> List[str]:
+        ids = [doc.id for doc in documents]
+        kwargs = {"ids": ids} if all(ids) else {}
+        return self._with_retries("upsert", batch_no, lambda: self.vector_store.add_documents(documents, **kwargs))
+
+    def _report_progress(self, report: PipelineReport, start: float):
+        report.elapsed_seconds = time.perf_counter() - start
+        summary = report.summary()
+        print(f"[ingestion] batch {report.batches_total}: {summary['docs_upserted']} docs upserted, "
+              f"{summary['docs_per_sec']} docs/s, {summary['embeddings_per_sec']} embeddings/s")
+        if self.on_progress:
+            self.on_progress(summary)
+
+    def run(self, document_batches: Iterable[List[Document]], rebatch_input: bool = True) -> PipelineReport:
+        """Embed and upsert every batch; ``rebatch_input=False`` keeps the source's (already small) batches as they are."""
+        report = PipelineReport()
+        start = time.perf_counter()
+        if rebatch_input:
+            document_batches = rebatch(document_batches, self.batch_size)
+        window: queue.Queue = queue.Queue()
+        # One slot per batch embedding ahead of the upsert
+        slots = threading.Semaphore(self.embed_concurrency)
+        stop = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.embed_concurrency, thread_name_prefix="embed") as pool:
+            def _feed():
+                try:
+                    batch_no = 0
+                    for documents in document_batches:
+                        if not documents:
+                            continue
+                        slots.acquire()
+                        if stop.is_set():
+                            return
+                        batch_no += 1
+                        window.put((batch_no, documents, pool.submit(self._embed, batch_no, documents)))
+                except Exception as e:
+                    # Raised in the caller's thread, like an error from the source itself
+                    window.put(e)
+                finally:
+                    window.put(None)
+
+            threading.Thread(target=_feed, name="embed-feed", daemon=True).start()
+            try:
+                while True:
+                    item = window.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    batch_no, documents, future = item
+                    # The next batch starts embedding while this one is upserted
+                    slots.release()
+                    report.batches_total += 1
+                    try:
+                        texts, vectors, embedded, embed_seconds = future.result()
+                        report.texts_embedded += embedded
+                        report.embed_seconds += embed_seconds
+                        self.embeddings.preload(texts, vectors)
+                        try:
+                            inserted = self._upsert(batch_no, documents)
+                        finally:
+                            self.embeddings.discard(texts)
+                    except Exception as e:
+                        print(f"[ingestion] batch {batch_no} failed after {self.max_retries} retries: {e}")
+                        report.failed_batches.append({
+                            "batch": batch_no,
+                            "ids": [doc.id for doc in documents],
+                            "size": len(documents),
+                            "error": str(e),
+                        })
+                        self._report_progress(report, start)
+                        continue
+
+                    report.batches_committed += 1
+                    report.docs_upserted += len(inserted)
+                    if self.on_batch_committed:
+                        self.on_batch_committed(documents)
+                    self._report_progress(report, start)
+            finally:
+                # Unblock the feeder if the run ends early
+                stop.set()
+                slots.release()
+
+        report.elapsed_seconds = time.perf_counter() - start
+        return report
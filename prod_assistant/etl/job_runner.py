@@ -0,0 +1,402 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+# queued -> running -> succeeded | failed | cancelled; "interrupted" when the server died mid-run
+ACTIVE_STATUSES = ("queued", "running")
+RESUMABLE_STATUSES = ("failed", "cancelled", "interrupted")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user asked for it to stop."""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    SQLite job table shared by the UI process and the job worker processes.
+
+    Workers write their own status and progress; the UI reads them and sets
+    ``cancel_requested``. WAL mode lets readers and the writing workers proceed
+    concurrently.
+    """
+
+    def __init__(self, path: str = os.path.join("data", "jobs.sqlite3")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner_pid INTEGER,
+                    worker_pid INTEGER,
+                    created_at REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    updated_at REAL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        return job
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, params, status, owner_pid, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(params), os.getpid(), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as db:
+            return self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit: int = 20) -> List[dict]:
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def requeue(self, job_id: str, params: dict):
+        self._update(job_id, status="queued", params=json.dumps(params), error=None, cancel_requested=0,
+                     owner_pid=os.getpid(), worker_pid=None, started_at=None, finished_at=None)
+
+    def mark_running(self, job_id: str):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_pid = ?, "
+                       "started_at = ?, updated_at = ? WHERE id = ?", (os.getpid(), time.time(), time.time(), job_id))
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._update(job_id, status=status, error=error, finished_at=time.time())
+
+    def set_progress(self, job_id: str, progress: dict):
+        self._update(job_id, progress=json.dumps(progress, default=str))
+
+    def request_cancel(self, job_id: str):
+        self._update(job_id, cancel_requested=1)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as db:
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_orphans(self) -> int:
+        """Flag active jobs whose owning server (or worker) process is gone as interrupted."""
+        orphaned = []
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT id, status, owner_pid, worker_pid FROM jobs WHERE status IN {ACTIVE_STATUSES}"
+            ).fetchall()
+        for row in rows:
+            owner_gone = not _pid_alive(row["owner_pid"])
+            worker_gone = row["status"] == "running" and not _pid_alive(row["worker_pid"])
+            if owner_gone or worker_gone:
+                orphaned.append(row["id"])
+        for job_id in orphaned:
+            self.finish(job_id, "interrupted", "server or worker process exited while the job was active")
+        return len(orphaned)
+
+
+class JobContext:
+    """Handed to a job handler: progress reporting and cancellation checks, both throttled."""
+
+    def __init__(self, store: JobStore, job_id: str, min_interval_s: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.min_interval_s = min_interval_s
+        self.started = time.perf_counter()
+        self.progress: dict = {}
+        self._last_write = 0.0
+        self._last_cancel_check = 0.0
+        self._cancelled = False
+
+    def report(self, force: bool = False, **progress):
+        self.progress.update(progress)
+        self.progress["elapsed_seconds"] = round(time.perf_counter() - self.started, 1)
+        now = time.monotonic()
+        if force or now - self._last_write >= self.min_interval_s:
+            self._last_write = now
+            self.store.set_progress(self.job_id, self.progress)
+
+    def cancelled(self) -> bool:
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_cancel_check >= self.min_interval_s:
+            self._last_cancel_check = now
+            self._cancelled = self.store.cancel_requested(self.job_id)
+        return self._cancelled
+
+    def raise_if_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.job_id)
+
+
+def run_scrape_job(ctx: JobContext, params: dict):
+    """Scrape queries in parallel into the append-only sink; a resumed job skips saved products."""
+    from prod_assistant.etl.data_scrapper import FlipkartScraper
+    from prod_assistant.etl.scrape_engine import ParallelScraper
+    from prod_assistant.etl.scrape_sink import dedup_key
+
+    workers = int(params.get("workers", 1))
+    resume = params.get("resume", False)
+    # HTTP-mode workers only borrow a browser for fallbacks, so there can be more workers than browsers
+    with FlipkartScraper(pool_size=int(params.get("browsers", workers)), fetch_mode=params.get("fetch_mode", "http"),
+                         cache_ttl_s=params.get("cache_ttl_s", 3600)) as scraper:
+        sink = scraper.open_sink(params.get("csv_path", os.path.join("data", "product_reviews.csv")),
+                                 params.get("jsonl_path"), params.get("catalog_path"), resume=resume)
+        stream = None
+        if params.get("stream_to_db"):
+            from prod_assistant.etl.data_ingestion import DataIngestion
+            stream = DataIngestion().stream().start()
+        report = None
+        try:
+            engine = ParallelScraper(scraper, workers=workers, max_pending_results=workers * 2 if stream else 0)
+            with sink:
+                for _, row in engine.iter_results(params["queries"], max_products=params.get("max_products", 1),
+                                                  review_count=params.get("review_count", 2),
+                                                  skip=lambda tile: dedup_key(tile) in sink):
+                    if sink.write(row) and stream:
+                        stream.put(row)
+                    scrape_stats = engine.stats.summary()
+                    ctx.report(products_scraped=sink.stats["written"], skipped=scrape_stats["skipped"],
+                               already_saved=sink.stats["resumed_from"], pages_per_min=scrape_stats["pages_per_min"],
+                               docs_searchable=stream.stats["searchable"] if stream else None)
+                    if ctx.cancelled():
+                        # Leaving the loop stops the scrape workers; the sink flushes what was saved
+                        break
+        finally:
+            # Also when scraping failed: the consumer thread waits for the end of the stream
+            if stream:
+                report = stream.close()
+        if stream:
+            ctx.report(docs_searchable=stream.stats["searchable"], docs_upserted=report.docs_upserted if report else 0)
+        ctx.report(force=True, products_scraped=sink.stats["written"], fetch=scraper.fetch_stats,
+                   cache=scraper.cache.summary() if scraper.cache else None,
+                   waits=scraper.wait_stats.summary())
+    ctx.raise_if_cancelled()
+
+
+def run_ingest_job(ctx: JobContext, params: dict):
+    """Batch ingestion; an interrupted or cancelled run resumes from the ingestion checkpoint."""
+    from prod_assistant.etl.data_ingestion import DataIngestion
+
+    def _on_progress(summary):
+        ctx.report(docs_upserted=summary["docs_upserted"], docs_embedded=summary["texts_embedded"],
+                   docs_per_sec=summary["docs_per_sec"], embeddings_per_sec=summary["embeddings_per_sec"],
+                   batches_failed=summary["batches_failed"])
+        # Stops after the batch just committed; the checkpoint records it
+        ctx.raise_if_cancelled()
+
+    DataIngestion().run_pipeline(on_progress=_on_progress)
+    ctx.report(force=True)
+
+
+JOB_HANDLERS: Dict[str, Callable[[JobContext, dict], None]] = {
+    "scrape": run_scrape_job,
+    "ingest": run_ingest_job,
+}
+
+
+def job_resources(kind: str, params: dict) -> set:
+    """
+    Shared outputs a job writes; jobs that share one never run at the same time.
+
+    Scrapes write the default CSV/JSONL/Parquet sink and its seen-set, ingestion
+    writes the manifest, checkpoint and embedding store. A scrape that streams
+    into the vector DB writes both.
+    """
+    resources = {kind}
+    if kind == "scrape" and params.get("stream_to_db"):
+        resources.add("ingest")
+    return resources
+
+
+def execute_job(db_path: str, job_id: str):
+    """Entry point in the worker process."""
+    store = JobStore(db_path)
+    job = store.get(job_id)
+    if job is None or job["status"] != "queued":
+        return
+    if job["cancel_requested"]:
+        store.finish(job_id, "cancelled")
+        return
+    store.mark_running(job_id)
+    ctx = JobContext(store, job_id)
+    try:
+        JOB_HANDLERS[job["kind"]](ctx, job["params"])
+    except JobCancelled:
+        ctx.report(force=True)
+        store.finish(job_id, "cancelled")
+    except Exception as e:
+        ctx.report(force=True)
+        store.finish(job_id, "failed", f"{e}\n{traceback.format_exc(limit=5)}")
+    else:
+        store.finish(job_id, "succeeded")
+
+
+class JobRunner:
+    """
+    Runs scrape and ingest jobs in a local process pool, off the UI thread.
+
+    Jobs outlive UI reruns and browser reloads (the runner lives in the server
+    process); their state is in a ``JobStore`` so any session can show progress,
+    cancel a job or resume a cancelled, failed or interrupted one. Resuming
+    re-runs the job with ``resume=True``: scrapes skip products already in the
+    sink and ingestion continues from its checkpoint.
+
+    Jobs that write the same outputs (see ``job_resources``) are serialized:
+    such a job stays ``queued`` in the runner, in submission order, until the
+    one before it finished, while unrelated jobs use the other pool workers.
+    """
+
+    def __init__(self, db_path: str = os.path.join("data", "jobs.sqlite3"), max_workers: int = 2):
+        self.store = JobStore(db_path)
+        # Jobs left active by a previous server process can only be resumed
+        self.store.mark_orphans()
+        self.max_workers = max_workers
+        self._pool = self._new_pool()
+        self._futures: dict = {}
+        # Done callbacks release resources from executor threads
+        self._lock = threading.RLock()
+        self._waiting: List[Tuple[str, set]] = []
+        self._held: Dict[str, set] = {}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: the UI server is multi-threaded, so forking it is unsafe
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _start(self, job_id: str):
+        try:
+            future = self._pool.submit(execute_job, self.store.path, job_id)
+        except BrokenProcessPool:
+            # A worker died hard (e.g. killed for memory); its jobs are marked interrupted in jobs()
+            self.jobs()
+            self._pool = self._new_pool()
+            future = self._pool.submit(execute_job, self.store.path, job_id)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _, job_id=job_id: self._release(job_id))
+
+    def _enqueue(self, job_id: str, kind: str, params: dict):
+        with self._lock:
+            self._waiting.append((job_id, job_resources(kind, params)))
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start waiting jobs whose outputs no running job writes, oldest first."""
+        with self._lock:
+            busy = set().union(*self._held.values())
+            ready, waiting = [], []
+            for job_id, resources in self._waiting:
+                (waiting if resources & busy else ready).append((job_id, resources))
+                # A job that has to wait also holds back later jobs on the same outputs
+                busy |= resources
+            self._waiting = waiting
+            for job_id, resources in ready:
+                self._held[job_id] = resources
+        # Outside the lock: a future that is already done runs its callback right away
+        for job_id, _ in ready:
+            try:
+                self._start(job_id)
+            except RuntimeError:
+                # The runner was shut down; the job is marked interrupted by the next runner
+                with self._lock:
+                    self._held.pop(job_id, None)
+
+    def _release(self, job_id: str):
+        with self._lock:
+            self._held.pop(job_id, None)
+        self._dispatch()
+
+    def submit(self, kind: str, params: dict) -> str:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = self.store.create(kind, params)
+        self._enqueue(job_id, kind, params)
+        return job_id
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            waiting = [entry for entry in self._waiting if entry[0] == job_id]
+            for entry in waiting:
+                self._waiting.remove(entry)
+        if waiting:
+            self.store.finish(job_id, "cancelled")
+            return
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Never started; a cancelled future has no result for jobs() to inspect
+            self._futures.pop(job_id, None)
+            self.store.finish(job_id, "cancelled")
+            return
+        self.store.request_cancel(job_id)
+
+    def resume(self, job_id: str) -> str:
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in RESUMABLE_STATUSES:
+            raise ValueError(f"Job {job_id} cannot be resumed")
+        params = {**job["params"], "resume": True}
+        self.store.requeue(job_id, params)
+        self._enqueue(job_id, job["kind"], params)
+        return job_id
+
+    def jobs(self, limit: int = 20) -> List[dict]:
+        # A worker process that crashed hard (e.g. OOM kill) never reports back
+        for job_id, future in list(self._futures.items()):
+            if future.done():
+                self._futures.pop(job_id)
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    job = self.store.get(job_id)
+                    if job and job["status"] in ACTIVE_STATUSES:
+                        self.store.finish(job_id, "interrupted", str(future.exception()))
+        return self.store.list(limit)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
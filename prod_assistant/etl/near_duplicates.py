@@ -0,0 +1,189 @@
+import re
+import hashlib
+from collections import defaultdict
+from typing import Iterable, Iterator, List
+import numpy as np
+from langchain_core.documents import Document
+from prod_assistant.etl.review_chunking import split_reviews
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word ``size``-grams of the normalized text (the whole token list if shorter)."""
+    tokens = _TOKEN.findall((text or "").lower())
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with ``num_perm`` universal hash permutations (vectorized with numpy)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 42):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        if not shingle_set:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingle_set),
+            dtype=np.uint64,
+            count=len(shingle_set),
+        )
+        # (a * h + b) mod p, truncated to 32 bits; uint64 overflow wraps, which is fine for hashing
+        permuted = (hashes[:, None] * self.a + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def _review_count(metadata: dict) -> int:
+    try:
+        return int(str(metadata.get("total_reviews", 0)).replace(",", ""))
+    except ValueError:
+        return 0
+
+
+class NearDuplicateCollapser:
+    """
+    Collapses near-identical listings (colour / part-number variants) into one
+    canonical product.
+
+    Works in two streaming passes so memory holds signatures, not documents:
+
+    - ``fit`` MinHashes title + reviews of every product and buckets the
+      signatures with LSH banding (``bands`` x ``num_perm / bands`` rows). Only
+      products sharing a bucket are compared, and each only against the
+      union-find roots already found in that bucket, so the cost stays
+      sub-quadratic. Candidates whose estimated Jaccard similarity is at least
+      ``threshold`` are clustered with union-find. Products with fewer than
+      ``min_shingles`` shingles (title only, placeholder reviews) carry too
+      little text to compare and are never collapsed.
+    - ``transform`` drops non-canonical members and attaches the variants to
+      the canonical record (the member with the most reviews).
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 3, min_shingles: int = 3, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = max(1, min_shingles)
+        self.hasher = MinHasher(num_perm, seed)
+        self._signatures = {}
+        self._info = {}
+        self._buckets = defaultdict(list)
+        self._canonical_of = {}
+        self._variants_of = defaultdict(list)
+        self.stats = {"products": 0, "too_short": 0, "candidate_pairs": 0, "clusters": 0, "collapsed": 0}
+
+    def _add(self, doc: Document):
+        if doc.id in self._signatures:
+            return
+        self.stats["products"] += 1
+        text = " ".join([str(doc.metadata.get("product_title", ""))] + split_reviews(doc.page_content))
+        shingle_set = shingles(text, self.shingle_size)
+        if len(shingle_set) < self.min_shingles:
+            # Near-empty texts would all share one signature (and every bucket) and merge with each other
+            self.stats["too_short"] += 1
+            return
+        signature = self.hasher.signature(shingle_set)
+        self._signatures[doc.id] = signature
+        self._info[doc.id] = {
+            "product_id": doc.metadata.get("product_id"),
+            "product_title": doc.metadata.get("product_title"),
+            "price": doc.metadata.get("price"),
+            "rating": doc.metadata.get("rating"),
+            "total_reviews": _review_count(doc.metadata),
+        }
+        for band in range(self.bands):
+            band_bytes = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            self._buckets[(band, hashlib.blake2b(band_bytes, digest_size=8).digest())].append(doc.id)
+
+    def fit(self, document_batches: Iterable[List[Document]]) -> "NearDuplicateCollapser":
+        for batch in document_batches:
+            for doc in batch:
+                self._add(doc)
+
+        union_find = _UnionFind()
+        for members in self._buckets.values():
+            if len(members) < 2:
+                continue
+            # Each member is compared with the clusters already present in the bucket, not every member
+            roots = []
+            for member in members:
+                member_root = union_find.find(member)
+                for i, root in enumerate(roots):
+                    root = roots[i] = union_find.find(root)
+                    if root == member_root:
+                        break
+                    self.stats["candidate_pairs"] += 1
+                    if float(np.mean(self._signatures[member] == self._signatures[root])) >= self.threshold:
+                        union_find.union(root, member_root)
+                        break
+                else:
+                    roots.append(member_root)
+        self._buckets.clear()
+
+        clusters = defaultdict(list)
+        for doc_id in self._signatures:
+            clusters[union_find.find(doc_id)].append(doc_id)
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            # Most reviewed listing wins; ties keep catalog order
+            canonical = max(members, key=lambda m: self._info[m]["total_reviews"])
+            for member in members:
+                self._canonical_of[member] = canonical
+                if member != canonical:
+                    self._variants_of[canonical].append(self._info[member])
+            self.stats["clusters"] += 1
+            self.stats["collapsed"] += len(members) - 1
+        self._signatures.clear()
+        return self
+
+    def transform(self, document_batches: Iterable[List[Document]]) -> Iterator[List[Document]]:
+        for batch in document_batches:
+            kept = []
+            for doc in batch:
+                canonical = self._canonical_of.get(doc.id, doc.id)
+                if canonical != doc.id:
+                    continue
+                variants = self._variants_of.get(doc.id)
+                if variants:
+                    doc = Document(
+                        id=doc.id,
+                        page_content=doc.page_content,
+                        metadata={
+                            **doc.metadata,
+                            "variant_ids": [v["product_id"] for v in variants],
+                            "variants": variants,
+                        },
+                    )
+                kept.append(doc)
+            if kept:
+                yield kept
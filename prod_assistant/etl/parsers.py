@@ -0,0 +1,112 @@
+import re
+from typing import List
+from lxml import etree, html as lxml_html
+
+FLIPKART_BASE_URL = "https://www.flipkart.com"
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one class token (what CSS `.name` means)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Selectors are compiled once at import; each call only evaluates them
+_TILES = etree.XPath("//div[@data-id]")
+_TILE_TITLE = etree.XPath(f".//div[{_has_class('KzDlHZ')}]")
+# (tag, class token) -> tile field, matched while walking a tile once
+_TILE_FIELDS = {
+    ("div", "KzDlHZ"): "title",
+    ("div", "Nx9bqj"): "price",
+    ("div", "XQDdHH"): "rating",
+    ("span", "Wphh3N"): "reviews_text",
+}
+# Same containers as REVIEW_SELECTOR: div._27M-vq, div.col.EPCmJX, div._6K-7Co (document order)
+_REVIEW_BLOCKS = etree.XPath(
+    f"//div[{_has_class('_27M-vq')} or ({_has_class('col')} and {_has_class('EPCmJX')}) or {_has_class('_6K-7Co')}]"
+)
+
+_TOTAL_REVIEWS = re.compile(r"\d+(,\d+)?(?=\s+Reviews)")
+_PRODUCT_ID = re.compile(r"/p/(itm[0-9A-Za-z]+)")
+
+
+def parse_document(page_html: str):
+    """Parse page HTML once with lxml; the tree can be handed to every extractor."""
+    return lxml_html.document_fromstring(page_html)
+
+
+def _tree(page):
+    return parse_document(page) if isinstance(page, (str, bytes)) else page
+
+
+def _text(element) -> str:
+    """Visible text of an element with every run of whitespace collapsed to one space."""
+    return " ".join(" ".join(element.itertext()).split())
+
+
+def _tile_fields(item) -> dict:
+    """Every field of one result tile from a single walk over its subtree."""
+    fields: dict = {}
+    for element in item.iter("div", "span", "a"):
+        if element.tag == "a":
+            href = element.get("href") or ""
+            if "href" not in fields and "/p/" in href:
+                fields["href"] = href
+            continue
+        classes = element.get("class")
+        if not classes:
+            continue
+        for token in classes.split():
+            name = _TILE_FIELDS.get((element.tag, token))
+            if name and name not in fields:
+                fields[name] = _text(element)
+    return fields
+
+
+def parse_search_results(page, max_products: int = 1) -> List[list]:
+    """
+    Product tiles of a search results page.
+
+    Returns ``[product_id, title, rating, total_reviews, price, product_link]``
+    per tile, like ``FlipkartScraper._scrape_search_results``. Tiles missing a
+    field are skipped. ``page`` is HTML or a tree from ``parse_document``.
+    """
+    tiles = []
+    for item in _TILES(_tree(page)):
+        if len(tiles) >= max_products:
+            break
+        fields = _tile_fields(item)
+        if not all(fields.get(name) for name in ("title", "price", "rating", "reviews_text", "href")):
+            continue
+        title, price, rating = fields["title"], fields["price"], fields["rating"]
+        match = _TOTAL_REVIEWS.search(fields["reviews_text"])
+        total_reviews = match.group(0) if match else "N/A"
+        href = fields["href"]
+        product_link = href if href.startswith("http") else FLIPKART_BASE_URL + href
+        match = _PRODUCT_ID.search(href)
+        product_id = match.group(1) if match else "N/A"
+        tiles.append([product_id, title, rating, total_reviews, price, product_link])
+    return tiles
+
+
+def parse_reviews(page, count: int = 2) -> List[str]:
+    """Up to ``count`` unique review texts of a product page, in page order."""
+    seen = set()
+    reviews = []
+    for block in _REVIEW_BLOCKS(_tree(page)):
+        text = _text(block)
+        if text and text not in seen:
+            reviews.append(text)
+            seen.add(text)
+        if len(reviews) >= count:
+            break
+    return reviews
+
+
+def has_search_tiles(page) -> bool:
+    """True when the page carries server-rendered result tiles with titles."""
+    tree = _tree(page)
+    return any(_TILE_TITLE(item) for item in _TILES(tree))
+
+
+def has_review_blocks(page) -> bool:
+    return bool(_REVIEW_BLOCKS(_tree(page)))
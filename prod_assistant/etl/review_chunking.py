@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+
+# FlipkartScraper.get_top_reviews joins individual reviews with this separator
+REVIEW_SEPARATOR = "||"
+# Placeholders the scraper writes instead of reviews
+NO_REVIEW_MARKERS = {"no reviews found", "invalid product url"}
+
+
+def split_reviews(top_reviews: str) -> List[str]:
+    """Split a product's joined review blob into individual review texts."""
+    reviews = []
+    for text in (top_reviews or "").split(REVIEW_SEPARATOR):
+        text = text.strip()
+        if text and text.lower() not in NO_REVIEW_MARKERS:
+            reviews.append(text)
+    return reviews
+
+
+def review_key(text: str) -> str:
+    """Identity of a review: whitespace/case-insensitive hash of its text."""
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:20]
+
+
+class ReviewChunker:
+    """
+    Turns product Documents into one Document per unique review.
+
+    Variant SKUs often carry byte-identical reviews; each unique review text is
+    emitted (and therefore embedded) once, with every product it belongs to
+    listed in its metadata (``product_ids`` and full ``products`` records) so
+    retrieval can group matches back by product. The top-level product fields
+    of the first product are kept for consumers that read them directly.
+
+    Deduplication is global, so reviews and their products are spooled to a
+    SQLite file (a temporary one unless ``path`` is given) rather than held in
+    memory: ``add`` costs memory for one batch only and ``iter_batches`` reads
+    the spool back in batches. For streaming ingestion ``drain`` instead emits
+    the reviews touched since the previous drain, each with every product seen
+    so far, so a review shared with a later product is re-upserted with the
+    longer product list rather than overwritten by a shorter one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._tmp_dir = None
+        if path is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="review-chunks-")
+            path = os.path.join(self._tmp_dir, "reviews.sqlite3")
+        # Streaming ingestion adds on the caller's thread and drains on the pipeline's feed thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS reviews (key TEXT PRIMARY KEY, text TEXT, touched INTEGER);
+            CREATE INDEX IF NOT EXISTS reviews_touched ON reviews (touched) WHERE touched = 1;
+            CREATE TABLE IF NOT EXISTS review_products (
+                key TEXT, product_id TEXT, product TEXT, PRIMARY KEY (key, product_id)
+            );
+            CREATE TABLE IF NOT EXISTS review_less (id TEXT, content TEXT, metadata TEXT);
+        """)
+        self._db.commit()
+        self.stats = {"products": 0, "reviews": 0, "unique_reviews": 0, "shared_reviews": 0}
+
+    def add(self, product_docs: Iterable[Document]):
+        reviews, review_products, review_less = [], [], []
+        for doc in product_docs:
+            self.stats["products"] += 1
+            product = dict(doc.metadata)
+            texts = split_reviews(doc.page_content)
+            if not texts:
+                # Keep products without reviews searchable by their title
+                metadata = {**product, "product_ids": [product.get("product_id")], "products": [product]}
+                review_less.append((doc.id, str(product.get("product_title", "")), json.dumps(metadata, default=str)))
+                continue
+            product_json = json.dumps(product, default=str)
+            for text in texts:
+                self.stats["reviews"] += 1
+                key = review_key(text)
+                reviews.append((key, text))
+                review_products.append((key, str(product.get("product_id")), product_json))
+        with self._db:
+            # The first text seen for a key is kept; any new product marks the review as touched
+            self._db.executemany("INSERT OR IGNORE INTO reviews VALUES (?, ?, 0)", reviews)
+            for row in review_products:
+                if self._db.execute("INSERT OR IGNORE INTO review_products VALUES (?, ?, ?)", row).rowcount:
+                    self._db.execute("UPDATE reviews SET touched = 1 WHERE key = ?", (row[0],))
+            self._db.executemany("INSERT INTO review_less VALUES (?, ?, ?)", review_less)
+
+    @staticmethod
+    def _review_document(key: str, text: str, products: List[dict]) -> Document:
+        return Document(
+            id=f"review-{key}",
+            page_content=text,
+            metadata={
+                **products[0],
+                "review_id": key,
+                "product_ids": [p.get("product_id") for p in products],
+                "products": products,
+            },
+        )
+
+    def _documents(self, rows: List[tuple]) -> List[Document]:
+        """Review Documents for ``(key, text)`` rows, products in the order they were added."""
+        products: dict = {}
+        keys = [key for key, _ in rows]
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for key, product in self._db.execute(
+                f"SELECT key, product FROM review_products WHERE key IN ({','.join('?' * len(chunk))}) ORDER BY rowid",
+                chunk,
+            ):
+                products.setdefault(key, []).append(json.loads(product))
+        return [self._review_document(key, text, products[key]) for key, text in rows]
+
+    def _iter_review_less(self, batch_size: int) -> Iterator[List[Document]]:
+        cursor = self._db.execute("SELECT id, content, metadata FROM review_less ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+                   for doc_id, content, metadata in rows]
+
+    def _update_stats(self):
+        self.stats["unique_reviews"] = self._db.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+        self.stats["shared_reviews"] = self._db.execute(
+            "SELECT COUNT(*) FROM (SELECT key FROM review_products GROUP BY key HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Document]]:
+        cursor = self._db.execute("SELECT key, text FROM reviews ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield self._documents(rows)
+        yield from self._iter_review_less(batch_size)
+        self._update_stats()
+
+    def drain(self) -> List[Document]:
+        """Documents for the reviews (and review-less products) added since the last drain."""
+        rows = self._db.execute("SELECT key, text FROM reviews WHERE touched = 1 ORDER BY rowid").fetchall()
+        documents = self._documents(rows) if rows else []
+        for batch in self._iter_review_less(1000):
+            documents.extend(batch)
+        with self._db:
+            self._db.execute("UPDATE reviews SET touched = 0 WHERE touched = 1")
+            self._db.execute("DELETE FROM review_less")
+        self._update_stats()
+        return documents
+
+    def close(self):
+        self._db.close()
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def group_reviews_by_product(docs: List[Document]) -> List[Document]:
+    """
+    Fold review-level hits back into one Document per product, in rank order.
+
+    Each product's Document carries its matched reviews joined like the original
+    product-level content. Documents without ``products`` metadata (product-level
+    ingestion) pass through unchanged.
+    """
+    groups: dict = {}
+    for doc in docs:
+        products = (doc.metadata or {}).get("products")
+        if not products:
+            groups.setdefault(("doc", doc.id or id(doc)), {"doc": doc})
+            continue
+        for product in products:
+            group = groups.setdefault(("product", str(product.get("product_id"))), {"meta": product, "reviews": []})
+            if doc.page_content not in group["reviews"]:
+                group["reviews"].append(doc.page_content)
+
+    grouped = []
+    for (kind, key), group in groups.items():
+        if kind == "doc":
+            grouped.append(group["doc"])
+        else:
+            grouped.append(Document(
+                id=key,
+                page_content=f" {REVIEW_SEPARATOR} ".join(group["reviews"]),
+                metadata=dict(group["meta"]),
+            ))
+    return grouped
@@ -0,0 +1,163 @@
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional
+
+_PRODUCT_ID = re.compile(r"/p/(itm[0-9A-Za-z]+)")
+
+
+def product_cache_key(product_url: str) -> str:
+    """Cache identity of a product page: its Flipkart product id, or the URL without query string."""
+    match = _PRODUCT_ID.search(product_url)
+    return match.group(1) if match else product_url.split("?", 1)[0]
+
+
+def search_cache_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ScrapeCache:
+    """
+    On-disk cache of scrape results with a TTL.
+
+    Parsed results (search tiles, review lists) live in a SQLite file together
+    with the HTTP validators (ETag / Last-Modified) of the page they came from;
+    the raw HTML is kept gzipped next to it, under the same key as its row (so
+    a product reached through different URLs has one file), so pages can be
+    re-parsed when the parsers change.
+
+    ``get_*`` return None on a miss, else an entry dict with the parsed
+    ``value``, its ``url``, validators and ``fresh``. Fresh entries can be
+    served directly; stale ones (older than ``ttl_s``) are refreshed with a
+    conditional request and ``touch``-ed when the page is unchanged.
+    """
+
+    def __init__(self, root: str = os.path.join("data", "scrape_cache"), ttl_s: float = 3600):
+        self.root = root
+        self.ttl_s = ttl_s
+        self.html_dir = os.path.join(root, "html")
+        os.makedirs(self.html_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "cache.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY, max_products INTEGER, tiles TEXT, url TEXT,
+                etag TEXT, last_modified TEXT, fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS products (
+                key TEXT PRIMARY KEY, review_count INTEGER, reviews TEXT, url TEXT,
+                etag TEXT, last_modified TEXT, fetched_at REAL
+            );
+        """)
+        self._db.commit()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _html_path(self, table: str, key: str) -> str:
+        return os.path.join(self.html_dir, f"{table}-{hashlib.sha1(key.encode('utf-8')).hexdigest()}.html.gz")
+
+    def _save_html(self, table: str, key: str, page_html: Optional[str]):
+        if not page_html:
+            return
+        path = self._html_path(table, key)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(page_html)
+        os.replace(tmp_path, path)
+
+    def _load_html(self, table: str, key: str) -> Optional[str]:
+        path = self._html_path(table, key)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def _get(self, table: str, size_column: str, key: str, size: int, count: bool = True):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {size_column}, {'tiles' if table == 'searches' else 'reviews'}, url, etag, last_modified, fetched_at "
+                f"FROM {table} WHERE key = ?", (key,)
+            ).fetchone()
+        # An entry scraped for fewer items than requested cannot answer the request
+        if row is None or row[0] < size:
+            if count:
+                self._count("misses")
+            return None
+        _, value, url, etag, last_modified, fetched_at = row
+        entry = {
+            "value": json.loads(value)[:size],
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at < self.ttl_s,
+        }
+        if count:
+            self._count("hits" if entry["fresh"] else "stale")
+        return entry
+
+    def _put(self, table: str, key: str, size: int, value, url: str, page_html: Optional[str],
+             etag: Optional[str], last_modified: Optional[str]):
+        self._save_html(table, key, page_html)
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, size, json.dumps(value), url, etag, last_modified, time.time()),
+            )
+            self._db.commit()
+
+    def _touch(self, table: str, key: str):
+        with self._lock:
+            self._db.execute(f"UPDATE {table} SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        self._count("revalidated")
+
+    # ---------- searches ----------
+    def get_search(self, query: str, max_products: int) -> Optional[dict]:
+        return self._get("searches", "max_products", search_cache_key(query), max_products)
+
+    def put_search(self, query: str, max_products: int, tiles: list, url: str, page_html: Optional[str] = None,
+                   etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self._put("searches", search_cache_key(query), max_products, tiles, url, page_html, etag, last_modified)
+
+    def has_fresh_search(self, query: str, max_products: int) -> bool:
+        """Lookup that is not counted in ``stats``, e.g. to skip rate limiting for cache hits."""
+        entry = self._get("searches", "max_products", search_cache_key(query), max_products, count=False)
+        return bool(entry and entry["fresh"])
+
+    def touch_search(self, query: str):
+        self._touch("searches", search_cache_key(query))
+
+    def load_search_html(self, query: str) -> Optional[str]:
+        return self._load_html("searches", search_cache_key(query))
+
+    # ---------- product pages ----------
+    def get_reviews(self, product_url: str, count: int) -> Optional[dict]:
+        return self._get("products", "review_count", product_cache_key(product_url), count)
+
+    def put_reviews(self, product_url: str, count: int, reviews: list, page_html: Optional[str] = None,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self._put("products", product_cache_key(product_url), count, reviews, product_url, page_html, etag, last_modified)
+
+    def has_fresh_reviews(self, product_url: str, count: int) -> bool:
+        entry = self._get("products", "review_count", product_cache_key(product_url), count, count=False)
+        return bool(entry and entry["fresh"])
+
+    def touch_reviews(self, product_url: str):
+        self._touch("products", product_cache_key(product_url))
+
+    def load_review_html(self, product_url: str) -> Optional[str]:
+        return self._load_html("products", product_cache_key(product_url))
+
+    def summary(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+            return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0}
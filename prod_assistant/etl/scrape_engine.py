@@ -0,0 +1,219 @@
+import time
+import queue
+import threading
+from dataclasses import dataclass, field
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class DomainLimiter:
+    """
+    Per-domain politeness: at most ``max_concurrent`` page loads in flight per
+    domain, and successive loads on one domain start at least
+    ``min_interval_s`` apart.
+    """
+
+    def __init__(self, max_concurrent: int = 4, min_interval_s: float = 0.5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval_s = min_interval_s
+        self._lock = threading.Lock()
+        self._slots: dict = {}
+        self._next_start: dict = {}
+
+    @contextmanager
+    def acquire(self, url: str):
+        domain = urlparse(url).netloc or url
+        with self._lock:
+            slots = self._slots.setdefault(domain, threading.BoundedSemaphore(self.max_concurrent))
+        with slots:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._next_start.get(domain, now))
+                self._next_start[domain] = start_at + self.min_interval_s
+            if start_at > now:
+                time.sleep(start_at - now)
+            yield
+
+
+@dataclass
+class ScrapeTask:
+    kind: str  # "search" or "product"
+    query: str
+    url: str = ""
+    tile: Optional[list] = None
+
+
+@dataclass
+class ScrapeStats:
+    searches: int = 0
+    product_pages: int = 0
+    skipped: int = 0
+    failures: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "searches": self.searches,
+            "product_pages": self.product_pages,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "elapsed_seconds": round(elapsed, 1),
+            "pages_per_min": round(60 * (self.searches + self.product_pages) / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+_DONE = object()
+
+
+class ParallelScraper:
+    """
+    Runs search and product-page scrapes of a ``FlipkartScraper`` on a pool of
+    browser workers.
+
+    Every query becomes a search task; each result tile it finds becomes a
+    product-page task on the same queue, so product pages of one query are
+    scraped in parallel with the searches of the others. In browser mode each
+    worker holds one pooled browser for its lifetime, so there are never more
+    workers than browsers. In HTTP mode workers hold no browser (the scraper
+    checks one out of the pool only for a Chrome fallback), so ``workers`` is
+    independent of the pool size. Page loads go through a ``DomainLimiter``,
+    and finished products are yielded as soon as they complete.
+    """
+
+    def __init__(self, scraper, workers: Optional[int] = None, max_per_domain: int = 4,
+                 min_interval_s: float = 0.5, max_pending_results: int = 0):
+        self.scraper = scraper
+        # Finished products not yet taken by the caller; when full, workers pause
+        # (0 = unbounded), so a slow consumer such as streaming ingestion throttles the scrape
+        self.max_pending_results = max_pending_results
+        self.holds_browser = getattr(scraper, "fetcher", None) is None
+        if self.holds_browser:
+            # One browser per worker; never more workers than the pool has browsers
+            self.workers = min(workers or scraper.pool.size, scraper.pool.size)
+        else:
+            self.workers = max(1, workers or scraper.pool.size)
+        self.limiter = DomainLimiter(max_per_domain, min_interval_s)
+        self.stats = ScrapeStats()
+
+    def _throttle(self, url: str, cached: bool):
+        """Domain limiter slot for a page load; cache hits never touch the site."""
+        return nullcontext() if cached else self.limiter.acquire(url)
+
+    def _run_task(self, browser, task: ScrapeTask, tasks: queue.Queue, max_products: int, review_count: int,
+                  skip: Optional[Callable[[list], bool]] = None) -> Optional[Tuple[str, list]]:
+        """Run one task; returns the finished ``(query, row)`` of a product task."""
+        cache = getattr(self.scraper, "cache", None)
+        if task.kind == "search":
+            search_url = f"https://www.flipkart.com/search?q={task.query.replace(' ', '+')}"
+            cached = cache is not None and cache.has_fresh_search(task.query, max_products)
+            with self._throttle(search_url, cached):
+                tiles = self.scraper.search_products(task.query, max_products, browser=browser)
+            self.stats.add("searches")
+            for tile in tiles:
+                # Products already saved (e.g. by an interrupted run) are not visited again
+                if skip is not None and skip(tile):
+                    self.stats.add("skipped")
+                    continue
+                tasks.put(ScrapeTask("product", task.query, url=tile[-1], tile=tile))
+            return None
+
+        product_id, title, rating, total_reviews, price, product_link = task.tile
+        if "flipkart.com" in product_link:
+            cached = cache is not None and cache.has_fresh_reviews(product_link, review_count)
+            with self._throttle(product_link, cached):
+                top_reviews = self.scraper.get_top_reviews(product_link, count=review_count, browser=browser)
+        else:
+            top_reviews = "Invalid product URL"
+        self.stats.add("product_pages")
+        return task.query, [product_id, title, rating, total_reviews, price, top_reviews]
+
+    @staticmethod
+    def _put_result(results: queue.Queue, item, stop: threading.Event):
+        # Wait for room in a bounded queue, but give up once the caller stopped iterating
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self, tasks: queue.Queue, results: queue.Queue, stop: threading.Event,
+                max_products: int, review_count: int, skip: Optional[Callable[[list], bool]] = None):
+        with self.scraper.pool.session() if self.holds_browser else nullcontext() as browser:
+            while not stop.is_set():
+                try:
+                    task = tasks.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                try:
+                    result = self._run_task(browser, task, tasks, max_products, review_count, skip)
+                    if result is not None:
+                        self._put_result(results, result, stop)
+                except Exception as e:
+                    self.stats.add("failures")
+                    print(f"[scrape] {task.kind} task failed for {task.url or task.query}: {e}")
+                    if browser is not None:
+                        browser.recover(e)
+                finally:
+                    # Children are queued before the parent is marked done, so join() sees them
+                    tasks.task_done()
+
+    def iter_results(self, queries: List[str], max_products: int = 1, review_count: int = 2,
+                     skip: Optional[Callable[[list], bool]] = None) -> Iterator[Tuple[str, list]]:
+        """
+        Yield ``(query, [product_id, title, rating, total_reviews, price, top_reviews])`` as products finish.
+
+        ``skip(tile)`` is asked for every search result tile; tiles it returns
+        True for get no product page visit and no result.
+        """
+        self.stats = ScrapeStats()
+        tasks: queue.Queue = queue.Queue()
+        results: queue.Queue = queue.Queue(maxsize=self.max_pending_results)
+        stop = threading.Event()
+        for query in queries:
+            tasks.put(ScrapeTask("search", query))
+
+        threads = [
+            threading.Thread(target=self._worker, args=(tasks, results, stop, max_products, review_count, skip),
+                             name=f"scrape-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        def _signal_done():
+            tasks.join()
+            self._put_result(results, _DONE, stop)
+        joiner = threading.Thread(target=_signal_done, name="scrape-join", daemon=True)
+        joiner.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Also reached when the caller stops iterating early
+            stop.set()
+            for thread in threads:
+                thread.join()
+            # Tasks the workers never took would keep the joiner in tasks.join() forever
+            while True:
+                try:
+                    tasks.get_nowait()
+                except queue.Empty:
+                    break
+                tasks.task_done()
+            joiner.join()
+        print(f"[scrape] finished: {self.stats.summary()}")
+
+    def scrape(self, queries: List[str], max_products: int = 1, review_count: int = 2) -> List[list]:
+        return [row for _, row in self.iter_results(queries, max_products, review_count)]
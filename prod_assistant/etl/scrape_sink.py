@@ -0,0 +1,259 @@
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import date
+from typing import Optional, Sequence
+import pyarrow.parquet as pq
+from prod_assistant.etl.catalog import CATALOG_COLUMNS, rows_to_table
+
+
+def dedup_key(row: Sequence) -> str:
+    """Identity of a scraped row: its product_id, or the title when the id could not be read."""
+    product_id = str(row[0])
+    return product_id if product_id and product_id != "N/A" else f"title:{row[1]}"
+
+
+class SeenSet:
+    """
+    On-disk set of product keys plus the committed size of every sink file.
+
+    Membership lives in SQLite, so memory stays constant however long the
+    scrape runs, and ids, byte offsets and Parquet parts are committed in one
+    transaction after the data itself is on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, committed_bytes INTEGER);
+            CREATE TABLE IF NOT EXISTS parquet_parts (path TEXT PRIMARY KEY);
+        """)
+        self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        return self._db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def committed_bytes(self, path: str) -> Optional[int]:
+        """Size of ``path`` at its last flush; None if this sink never wrote it."""
+        row = self._db.execute("SELECT committed_bytes FROM files WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def parquet_parts(self) -> set:
+        return {row[0] for row in self._db.execute("SELECT path FROM parquet_parts")}
+
+    def commit(self, keys, file_sizes: dict, parquet_parts: Sequence[str] = ()):
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(key,) for key in keys])
+            self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?)", list(file_sizes.items()))
+            self._db.executemany("INSERT OR IGNORE INTO parquet_parts VALUES (?)", [(part,) for part in parquet_parts])
+
+    def clear(self):
+        with self._db:
+            self._db.executescript("DELETE FROM seen; DELETE FROM files; DELETE FROM parquet_parts;")
+
+    def close(self):
+        self._db.close()
+
+
+class ScrapeSink:
+    """
+    Append-only, crash-safe output for scraped rows.
+
+    Rows are deduplicated on ``product_id`` against a ``SeenSet`` and appended
+    to any of a CSV file, a JSONL file and the Parquet catalog (one new part
+    per flush in today's ``scrape_date=`` partition). A flush writes the
+    pending rows, fsyncs them and only then commits their ids and the new file
+    sizes, so after a crash ``resume=True`` truncates torn writes back to the
+    last flush and skips every product that was already saved. Each output
+    remembers how many pending rows it already holds, so when one of them
+    fails the retry on the next flush only writes the rest. Without
+    ``resume`` the previous outputs are replaced, as ``save_to_csv`` did.
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, jsonl_path: Optional[str] = None,
+                 parquet_dir: Optional[str] = None, seen_path: Optional[str] = None, resume: bool = False,
+                 flush_rows: int = 20, flush_interval_s: float = 5.0, scrape_date: Optional[date] = None):
+        if not (csv_path or jsonl_path or parquet_dir):
+            raise ValueError("ScrapeSink needs at least one of csv_path, jsonl_path or parquet_dir")
+        self.csv_path = csv_path
+        self.jsonl_path = jsonl_path
+        self.parquet_dir = parquet_dir
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval_s = flush_interval_s
+        self.scrape_date = scrape_date or date.today()
+        self.partition_dir = os.path.join(parquet_dir, f"scrape_date={self.scrape_date.isoformat()}") if parquet_dir else None
+        # Next to the output, never inside the Parquet dataset directory
+        base = csv_path or jsonl_path or os.path.normpath(parquet_dir)
+        self.seen = SeenSet(seen_path or f"{base}.seen.sqlite3")
+        self._run_id = uuid.uuid4().hex[:8]
+        self._part = 0
+        self._pending: list = []
+        self._pending_keys: set = set()
+        # Output (file path or "parquet") -> leading rows of _pending it already holds
+        self._staged: dict = {}
+        self._staged_parts: list = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"written": 0, "duplicates": 0, "flushes": 0, "resumed_from": 0}
+
+        if resume:
+            self._repair()
+            self.stats["resumed_from"] = len(self.seen)
+        else:
+            self._reset()
+        self._files = {path: open(path, "ab") for path in (csv_path, jsonl_path) if path}
+        if csv_path and self._files[csv_path].tell() == 0:
+            # The header is committed like a row so a resumed file never gets a second one
+            self._files[csv_path].write(self._csv_line(CATALOG_COLUMNS))
+            self._sync({})
+
+    # ---------- setup ----------
+    def _reset(self):
+        """Start a new scrape: empty seen-set and outputs (today's partition for Parquet)."""
+        self.seen.clear()
+        for path in (self.csv_path, self.jsonl_path):
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                open(path, "wb").close()
+        if self.partition_dir and os.path.isdir(self.partition_dir):
+            for name in os.listdir(self.partition_dir):
+                os.remove(os.path.join(self.partition_dir, name))
+
+    def _repair(self):
+        """Drop whatever a crash left behind after the last committed flush."""
+        for path in (self.csv_path, self.jsonl_path):
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            committed = self.seen.committed_bytes(path)
+            if committed is not None and os.path.exists(path) and os.path.getsize(path) > committed:
+                with open(path, "r+b") as f:
+                    f.truncate(committed)
+        if self.partition_dir and os.path.isdir(self.partition_dir):
+            committed_parts = self.seen.parquet_parts()
+            for name in os.listdir(self.partition_dir):
+                path = os.path.join(self.partition_dir, name)
+                if name.startswith(("stream-", ".stream-")) and path not in committed_parts:
+                    os.remove(path)
+
+    # ---------- writing ----------
+    @staticmethod
+    def _csv_line(row) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row)
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _jsonl_line(row) -> bytes:
+        return (json.dumps(dict(zip(CATALOG_COLUMNS, row)), ensure_ascii=False) + "\n").encode("utf-8")
+
+    def __contains__(self, key: str) -> bool:
+        """True when the product with this ``dedup_key`` was already written (or is pending)."""
+        with self._lock:
+            return key in self._pending_keys or key in self.seen
+
+    def write(self, row: Sequence) -> bool:
+        """Queue one row; returns False if its product was already written."""
+        key = dedup_key(row)
+        with self._lock:
+            if key in self._pending_keys or key in self.seen:
+                self.stats["duplicates"] += 1
+                return False
+            self._pending.append(list(row))
+            self._pending_keys.add(key)
+            self.stats["written"] += 1
+            if len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self._flush()
+        return True
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        if self.csv_path:
+            self._append(self.csv_path, self._csv_line)
+        if self.jsonl_path:
+            self._append(self.jsonl_path, self._jsonl_line)
+        staged = self._staged.get("parquet", 0)
+        if self.parquet_dir and staged < len(self._pending):
+            self._staged_parts.append(self._write_parquet_part(self._pending[staged:]))
+            self._staged["parquet"] = len(self._pending)
+        self._sync(self._pending_keys, self._staged_parts)
+        self._pending = []
+        self._pending_keys = set()
+        self._staged = {}
+        self._staged_parts = []
+        self.stats["flushes"] += 1
+
+    def _append(self, path: str, encode):
+        """Append the pending rows ``path`` does not hold yet; a failed append is cut back off."""
+        staged = self._staged.get(path, 0)
+        if staged == len(self._pending):
+            return
+        f = self._files[path]
+        start = f.tell()
+        try:
+            f.write(b"".join(encode(row) for row in self._pending[staged:]))
+            f.flush()
+            os.fsync(f.fileno())
+        except Exception:
+            # Rows left in the buffer could land later, so reopen rather than truncate in place
+            try:
+                f.close()
+            except OSError:
+                pass
+            os.truncate(path, start)
+            self._files[path] = open(path, "ab")
+            raise
+        self._staged[path] = len(self._pending)
+
+    def _write_parquet_part(self, rows: list) -> str:
+        """New part file in today's partition, written aside and renamed into place."""
+        os.makedirs(self.partition_dir, exist_ok=True)
+        path = os.path.join(self.partition_dir, f"stream-{self._run_id}-{self._part:06d}.parquet")
+        self._part += 1
+        # scrape_date comes from the partition directory, like write_catalog's output
+        table = rows_to_table(rows, self.scrape_date).drop(["scrape_date"])
+        # Dot-prefixed, so a torn temp file is never picked up by dataset readers
+        tmp_path = os.path.join(self.partition_dir, f".{os.path.basename(path)}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return path
+
+    def _sync(self, keys, parquet_parts: Sequence[str] = ()):
+        """fsync the appended bytes, then commit ids and file sizes together."""
+        sizes = {}
+        for path, f in self._files.items():
+            f.flush()
+            os.fsync(f.fileno())
+            sizes[path] = f.tell()
+        self.seen.commit(keys, sizes, parquet_parts)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+            self.seen.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,123 @@
+import time
+import queue
+import threading
+from typing import Callable, Iterator, List, Optional
+
+_END = object()
+
+
+class StreamingIngestion:
+    """
+    Scrape -> embed -> upsert in one pass.
+
+    The scraper ``put``s rows (``[product_id, title, rating, total_reviews,
+    price, top_reviews]``) into a bounded queue as products complete; a
+    consumer thread groups them into micro-batches of up to
+    ``micro_batch_size`` rows, or whatever arrived within ``max_latency_s``,
+    and hands them to ``DataIngestion.run_streaming``. When embedding falls
+    behind the queue fills up and ``put`` blocks, which stalls the scraper
+    instead of buffering an unbounded backlog.
+
+    ``stats`` tracks rows queued and made searchable, the time producers spent
+    blocked on a full queue, and the scrape-to-searchable latency per product.
+    """
+
+    def __init__(self, ingestion, queue_size: int = 64, micro_batch_size: int = 16, max_latency_s: float = 2.0):
+        self.ingestion = ingestion
+        self.micro_batch_size = max(1, micro_batch_size)
+        self.max_latency_s = max_latency_s
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._queued_at: dict = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._ended = False
+        self.report = None
+        self.stats = {"queued": 0, "searchable": 0, "blocked_seconds": 0.0, "max_latency_s": 0.0, "avg_latency_s": 0.0}
+        self._latency_total = 0.0
+
+    def start(self, on_progress: Optional[Callable[[dict], None]] = None) -> "StreamingIngestion":
+        self._thread = threading.Thread(target=self._consume, args=(on_progress,), name="stream-ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def put(self, row: list):
+        """Queue one scraped row; blocks while the queue is full (backpressure on the scraper)."""
+        if self._error is not None:
+            raise RuntimeError("streaming ingestion stopped") from self._error
+        with self._lock:
+            self._queued_at[str(row[0])] = time.monotonic()
+            self.stats["queued"] += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            start = time.monotonic()
+            self._queue.put(row)
+            with self._lock:
+                self.stats["blocked_seconds"] = round(self.stats["blocked_seconds"] + time.monotonic() - start, 2)
+
+    def close(self):
+        """Flush the queued rows, wait for their upsert and return the pipeline report."""
+        if self._thread is not None:
+            self._queue.put(_END)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            raise self._error
+        return self.report
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _micro_batches(self) -> Iterator[List[list]]:
+        while True:
+            row = self._queue.get()
+            if row is _END:
+                self._ended = True
+                return
+            batch = [row]
+            deadline = time.monotonic() + self.max_latency_s
+            while len(batch) < self.micro_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is _END:
+                    self._ended = True
+                    yield batch
+                    return
+                batch.append(row)
+            yield batch
+
+    def _mark_searchable(self, documents):
+        """Record scrape-to-searchable latency of the products in an upserted batch."""
+        now = time.monotonic()
+        with self._lock:
+            for doc in documents:
+                metadata = doc.metadata or {}
+                for product_id in metadata.get("product_ids") or [metadata.get("product_id")]:
+                    queued_at = self._queued_at.pop(str(product_id), None)
+                    if queued_at is None:
+                        continue
+                    latency = now - queued_at
+                    self.stats["searchable"] += 1
+                    self._latency_total += latency
+                    self.stats["max_latency_s"] = round(max(self.stats["max_latency_s"], latency), 2)
+                    self.stats["avg_latency_s"] = round(self._latency_total / self.stats["searchable"], 2)
+
+    def _consume(self, on_progress):
+        try:
+            self.report = self.ingestion.run_streaming(
+                self._micro_batches(), on_progress=on_progress, on_batch_committed=self._mark_searchable
+            )
+        except BaseException as e:
+            self._error = e
+            # Keep draining so producers blocked in put() are released
+            while not self._ended and self._queue.get() is not _END:
+                pass
@@ -0,0 +1,214 @@
+import time
+import threading
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Resource Timing entries only appear once a request has finished, so in-flight
+# requests are counted by wrapping fetch and XHR. A PerformanceObserver adds the
+# images, scripts and stylesheets the shim cannot see to the activity counter.
+# Idempotent: BrowserSession runs it before page scripts, the wait installs it otherwise.
+NETWORK_TRACKER_JS = """
+if (!window.__scrapeNet) {
+  const net = window.__scrapeNet = {inflight: 0, activity: 0};
+  const started = () => { net.inflight++; net.activity++; };
+  const finished = () => { net.inflight = Math.max(0, net.inflight - 1); net.activity++; };
+  if (window.fetch) {
+    const fetch = window.fetch;
+    window.fetch = function (...args) {
+      started();
+      try {
+        return fetch.apply(this, args).finally(finished);
+      } catch (e) {
+        finished();
+        throw e;
+      }
+    };
+  }
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    started();
+    this.addEventListener('loadend', finished, {once: true});
+    try {
+      return send.apply(this, args);
+    } catch (e) {
+      this.removeEventListener('loadend', finished);
+      finished();
+      throw e;
+    }
+  };
+  if (window.PerformanceObserver) {
+    new PerformanceObserver(list => { net.activity += list.getEntries().length; }).observe({type: 'resource'});
+  }
+}
+"""
+
+_NETWORK_STATE_JS = NETWORK_TRACKER_JS + "return [window.__scrapeNet.activity, window.__scrapeNet.inflight];"
+
+
+def wait_for_document_ready(driver, timeout: float = 10.0) -> bool:
+    """Wait until ``document.readyState`` is complete."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_presence(driver, css: str, timeout: float = 10.0) -> bool:
+    """Wait until at least one element matches ``css``."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, css))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_network_idle(driver, idle_s: float = 0.5, timeout: float = 10.0) -> bool:
+    """
+    Wait until no fetch/XHR request is in flight and no request started or
+    finished for ``idle_s``.
+
+    Requests are tracked by ``NETWORK_TRACKER_JS``. A ``BrowserSession``
+    installs it before the page's own scripts run; on other drivers the first
+    call installs it, so requests already in flight by then are not counted.
+    """
+    deadline = time.monotonic() + timeout
+    last_state, idle_since = None, time.monotonic()
+    while time.monotonic() < deadline:
+        try:
+            activity, in_flight = driver.execute_script(_NETWORK_STATE_JS)
+        except Exception:
+            return False
+        if (activity, in_flight) != last_state or in_flight:
+            last_state, idle_since = (activity, in_flight), time.monotonic()
+        elif time.monotonic() - idle_since >= idle_s:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def wait_for_count_stable(driver, css: str, settle_s: float = 0.5, timeout: float = 10.0,
+                          min_count: int = 1) -> int:
+    """Wait until at least ``min_count`` elements match ``css`` and the count stops changing for ``settle_s``.
+
+    A page that has fewer than ``min_count`` matches is accepted once its count
+    has been stable for three times ``settle_s``.
+    """
+    deadline = time.monotonic() + timeout
+    last_count, stable_since = -1, time.monotonic()
+    count = 0
+    while time.monotonic() < deadline:
+        count = len(driver.find_elements(By.CSS_SELECTOR, css))
+        if count != last_count:
+            last_count, stable_since = count, time.monotonic()
+        else:
+            stable_for = time.monotonic() - stable_since
+            if (count >= min_count and stable_for >= settle_s) or (count and stable_for >= 3 * settle_s):
+                break
+        time.sleep(0.1)
+    return count
+
+
+def dismiss_popup(driver, xpath: str = "//button[contains(text(), '✕')]", timeout: float = 1.5) -> bool:
+    """Click the login/close popup if it shows up within ``timeout``; no fixed sleep either way."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.element_to_be_clickable((By.XPATH, xpath))
+        ).click()
+        return True
+    except Exception:
+        return False
+
+
+def adaptive_scroll(driver, css: str, target_count: int, max_scrolls: int = 6,
+                    step_timeout: float = 2.0, settle_s: float = 0.4) -> int:
+    """
+    Scroll with END until ``target_count`` elements match ``css``.
+
+    After each scroll, wait only until new elements appear (or ``step_timeout``
+    passes). Stop as soon as the target is met, or when a scroll loads nothing
+    new and the page height stops growing.
+    """
+    count = len(driver.find_elements(By.CSS_SELECTOR, css))
+    for _ in range(max_scrolls):
+        if count >= target_count:
+            break
+        height = driver.execute_script("return document.body.scrollHeight")
+        ActionChains(driver).send_keys(Keys.END).perform()
+        deadline = time.monotonic() + step_timeout
+        grew, new_count = False, count
+        while time.monotonic() < deadline:
+            new_count = len(driver.find_elements(By.CSS_SELECTOR, css))
+            if new_count >= target_count:
+                return new_count
+            if new_count > count or driver.execute_script("return document.body.scrollHeight") > height:
+                grew = True
+                # Give the batch that just started rendering a moment to finish
+                time.sleep(settle_s)
+                new_count = len(driver.find_elements(By.CSS_SELECTOR, css))
+                break
+            time.sleep(0.1)
+        count = max(count, new_count)
+        if not grew:
+            break
+    return count
+
+
+class WaitStats:
+    """
+    Wall time spent per wait step compared with the fixed sleep it replaced.
+
+    ``step(name, replaced_s)`` times a block; ``seconds_saved`` is the sum of
+    ``replaced_s - actual`` across steps, reported per page in ``summary``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.steps: dict = {}
+
+    @contextmanager
+    def step(self, name: str, replaced_s: float):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.steps.setdefault(name, {"count": 0, "seconds": 0.0, "replaced_seconds": 0.0})
+                entry["count"] += 1
+                entry["seconds"] += elapsed
+                entry["replaced_seconds"] += replaced_s
+
+    def page_done(self):
+        with self._lock:
+            self.pages += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            waited = sum(e["seconds"] for e in self.steps.values())
+            replaced = sum(e["replaced_seconds"] for e in self.steps.values())
+            return {
+                "pages": self.pages,
+                "wait_seconds": round(waited, 2),
+                "fixed_sleep_seconds": round(replaced, 2),
+                "seconds_saved": round(replaced - waited, 2),
+                "seconds_saved_per_page": round((replaced - waited) / self.pages, 2) if self.pages else 0.0,
+                "steps": {
+                    name: {
+                        "count": e["count"],
+                        "avg_s": round(e["seconds"] / e["count"], 2),
+                        "replaced_avg_s": round(e["replaced_seconds"] / e["count"], 2),
+                    }
+                    for name, e in self.steps.items()
+                },
+            }
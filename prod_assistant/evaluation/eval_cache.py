@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+
+
+def eval_cache_key(metric_name: str, judge_model: str, query: str, response: str, retrieved_contexts: List[str]) -> str:
+    """Identity of one judge call: the metric, the judge model and every input it sees."""
+    payload = json.dumps([metric_name, judge_model, query, response, list(retrieved_contexts)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvalCache:
+    """
+    On-disk cache of RAGAS scores.
+
+    A score is stored under a hash of (metric name, judge model, query,
+    response, retrieved contexts), so re-running an evaluation after a prompt
+    or retrieval change only calls the judge for samples whose inputs actually
+    changed. Failed and NaN scorings are not cached and are retried on the next run.
+    """
+
+    def __init__(self, path: str = os.path.join("data", "eval", "cache.sqlite3")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                key TEXT PRIMARY KEY, metric TEXT, judge_model TEXT, score REAL, scored_at REAL
+            )
+        """)
+        self._db.commit()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, metric_name: str, judge_model: str, query: str, response: str,
+            retrieved_contexts: List[str]) -> Optional[float]:
+        key = eval_cache_key(metric_name, judge_model, query, response, retrieved_contexts)
+        with self._lock:
+            row = self._db.execute("SELECT score FROM scores WHERE key = ?", (key,)).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def put(self, metric_name: str, judge_model: str, query: str, response: str,
+            retrieved_contexts: List[str], score: float):
+        key = eval_cache_key(metric_name, judge_model, query, response, retrieved_contexts)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                (key, metric_name, judge_model, float(score), time.time()),
+            )
+            self._db.commit()
+
+    async def ascore(self, metric_name: str, metric, sample, judge_model: str, timeout: Optional[float] = None) -> float:
+        """``metric.single_turn_ascore(sample)``, served from the cache when these inputs were scored before."""
+        inputs = (sample.user_input or "", sample.response or "", sample.retrieved_contexts or [])
+        score = self.get(metric_name, judge_model, *inputs)
+        if score is None:
+            score = float(await metric.single_turn_ascore(sample, timeout=timeout))
+            # NaN means RAGAS could not parse the judge's output; worth another try next run
+            if score == score:
+                self.put(metric_name, judge_model, *inputs, score)
+        return score
+
+    def summary(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,225 @@
+"""
+Dataset-level RAGAS evaluation.
+
+Scores many samples concurrently in one event loop with the metrics (and
+their judge LLM / embeddings clients) built once, writes one JSONL record per
+sample as soon as it is scored, and skips samples already scored when a run
+is resumed. With an ``EvalCache`` scores are also reused across runs and
+output files, so only samples whose inputs changed reach the judge.
+
+Usage (from prod_assistant/):
+    python -m evaluation.eval_runner --input data/eval/samples.jsonl --output data/eval/results.jsonl \
+        --parquet data/eval/results.parquet --concurrency 8
+"""
+import os
+import csv
+import json
+import math
+import time
+import asyncio
+import hashlib
+import argparse
+from typing import Dict, Iterable, List, Optional
+from ragas import SingleTurnSample
+
+
+def sample_id(query: str, response: str, retrieved_contexts: List[str]) -> str:
+    """Stable id of a sample from its content, used to resume runs."""
+    payload = json.dumps([query, response, list(retrieved_contexts)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_sample(raw: dict) -> dict:
+    """Accept ``query``/``user_input`` and contexts as a list or a JSON string; add an ``id`` if missing."""
+    query = raw.get("query", raw.get("user_input", ""))
+    contexts = raw.get("retrieved_contexts", raw.get("contexts", [])) or []
+    if isinstance(contexts, str):
+        contexts = json.loads(contexts) if contexts.strip().startswith("[") else [contexts]
+    sample = {"query": str(query), "response": str(raw.get("response", "")), "retrieved_contexts": [str(c) for c in contexts]}
+    sample["id"] = str(raw.get("id") or sample_id(sample["query"], sample["response"], sample["retrieved_contexts"]))
+    return sample
+
+
+def load_samples(path: str) -> List[dict]:
+    """Samples from JSONL, a JSON list or CSV (contexts as a JSON list column)."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        elif path.endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [normalize_sample(row) for row in rows]
+
+
+def read_results(path: str) -> Dict[str, dict]:
+    """Latest record per sample id; a torn last line from a crash is ignored."""
+    results: Dict[str, dict] = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record["id"]] = record
+    return results
+
+
+def export_parquet(results_path: str, parquet_path: str) -> str:
+    """Flatten the JSONL results (latest record per sample) into a Parquet file with one score column per metric."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = []
+    for record in read_results(results_path).values():
+        row = {key: value for key, value in record.items() if key not in ("scores", "errors", "retrieved_contexts")}
+        row.update(record.get("scores", {}))
+        row["errors"] = json.dumps(record.get("errors", {})) if record.get("errors") else None
+        rows.append(row)
+    os.makedirs(os.path.dirname(parquet_path) or ".", exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows), parquet_path, compression="zstd")
+    return parquet_path
+
+
+def summarize(results: Iterable[dict], metric_names: Iterable[str]) -> dict:
+    results = list(results)
+    summary = {"samples": len(results), "failed": sum(1 for r in results if r.get("errors"))}
+    for name in metric_names:
+        # NaN scores in files written by older runs count as missing
+        scores = [score for r in results
+                  if (score := r.get("scores", {}).get(name)) is not None and not math.isnan(score)]
+        summary[name] = round(sum(scores) / len(scores), 4) if scores else None
+    return summary
+
+
+class EvaluationRunner:
+    """
+    Score samples with several RAGAS metrics, ``concurrency`` samples at a time.
+
+    All metrics of a sample are scored concurrently inside one semaphore slot.
+    Records are appended to ``output_path`` (flushed per sample) as they
+    complete, so an interrupted run loses at most the samples in flight; with
+    ``resume`` samples whose every metric was scored by the same judge are
+    skipped and failed ones are retried.
+    """
+
+    def __init__(self, metrics: dict, output_path: str, concurrency: int = 8, timeout_s: Optional[float] = 180,
+                 judge_model: str = "", cache=None):
+        self.metrics = metrics
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.timeout_s = timeout_s
+        self.judge_model = judge_model
+        self.cache = cache
+
+    async def _score_metric(self, name: str, metric, sample: SingleTurnSample):
+        start = time.perf_counter()
+        if self.cache is not None:
+            score = await self.cache.ascore(name, metric, sample, self.judge_model, timeout=self.timeout_s)
+        else:
+            score = await metric.single_turn_ascore(sample, timeout=self.timeout_s)
+        return name, float(score), time.perf_counter() - start
+
+    async def _score(self, semaphore: asyncio.Semaphore, raw: dict) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            sample = SingleTurnSample(
+                user_input=raw["query"],
+                response=raw["response"],
+                retrieved_contexts=raw["retrieved_contexts"],
+            )
+            outcomes = await asyncio.gather(
+                *(self._score_metric(name, metric, sample) for name, metric in self.metrics.items()),
+                return_exceptions=True,
+            )
+        scores, errors = {}, {}
+        for name, outcome in zip(self.metrics, outcomes):
+            if isinstance(outcome, BaseException):
+                errors[name] = f"{type(outcome).__name__}: {outcome}"
+            elif math.isnan(outcome[1]):
+                # The judge's output could not be parsed; a failure, so resume retries it
+                errors[name] = "NaN score"
+            else:
+                scores[name] = outcome[1]
+        return {
+            "id": raw["id"],
+            "query": raw["query"],
+            "response": raw["response"],
+            "retrieved_contexts": raw["retrieved_contexts"],
+            "judge_model": self.judge_model,
+            "scores": scores,
+            "errors": errors,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    async def arun(self, samples: List[dict], resume: bool = True) -> dict:
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        previous = read_results(self.output_path) if resume else {}
+        if not resume and os.path.exists(self.output_path):
+            os.remove(self.output_path)
+        # Scores from another judge are not comparable; those samples are scored again
+        done = {
+            sample_id_ for sample_id_, record in previous.items()
+            if not record.get("errors") and set(self.metrics) <= set(record.get("scores", {}))
+            and record.get("judge_model") == self.judge_model
+        }
+        pending = [sample for sample in samples if sample["id"] not in done]
+        print(f"[eval] {len(samples)} samples: {len(done)} already scored, {len(pending)} to score "
+              f"with {list(self.metrics)} at concurrency {self.concurrency}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        scored = 0
+        with open(self.output_path, "a", encoding="utf-8") as f:
+            tasks = [asyncio.ensure_future(self._score(semaphore, sample)) for sample in pending]
+            for next_done in asyncio.as_completed(tasks):
+                record = await next_done
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                previous[record["id"]] = record
+                scored += 1
+                if scored % 10 == 0 or scored == len(pending):
+                    elapsed = time.perf_counter() - start
+                    print(f"[eval] {scored}/{len(pending)} scored, {60 * scored / elapsed:.1f} samples/min")
+
+        ids = {sample["id"] for sample in samples}
+        summary = summarize((r for i, r in previous.items() if i in ids), self.metrics)
+        summary["elapsed_seconds"] = round(time.perf_counter() - start, 1)
+        if self.cache is not None:
+            summary["cache"] = self.cache.summary()
+        return summary
+
+    def run(self, samples: List[dict], resume: bool = True) -> dict:
+        """One event loop for the whole dataset (clients are reused across samples)."""
+        return asyncio.run(self.arun(samples, resume=resume))
+
+
+if __name__ == "__main__":
+    from utils.config_loader import load_config
+    from evaluation.ragas_eval import METRIC_NAMES, build_metrics, judge_model_name, get_eval_cache
+
+    eval_config = load_config().get("evaluation", {})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Samples: .jsonl, .json or .csv with query, response, retrieved_contexts")
+    parser.add_argument("--output", default=eval_config.get("output_path", os.path.join("data", "eval", "results.jsonl")))
+    parser.add_argument("--parquet", default=None, help="Also export the results to this Parquet file")
+    parser.add_argument("--metrics", nargs="+", default=list(METRIC_NAMES), choices=METRIC_NAMES)
+    parser.add_argument("--concurrency", type=int, default=eval_config.get("concurrency", 8))
+    parser.add_argument("--timeout", type=float, default=eval_config.get("timeout_s", 180))
+    parser.add_argument("--no-cache", action="store_true", help="Call the judge even for inputs scored in earlier runs")
+    parser.add_argument("--no-resume", action="store_true", help="Discard earlier results instead of skipping scored samples")
+    args = parser.parse_args()
+
+    runner = EvaluationRunner(
+        build_metrics(args.metrics),
+        args.output,
+        concurrency=args.concurrency,
+        timeout_s=args.timeout,
+        judge_model=judge_model_name(),
+        cache=None if args.no_cache else get_eval_cache(),
+    )
+    print(f"[eval] summary: {runner.run(load_samples(args.input), resume=not args.no_resume)}")
+    if args.parquet:
+        print(f"[eval] results exported to {export_parquet(args.output, args.parquet)}")
@@ -0,0 +1,201 @@
+# evaluation/online_eval.py
+import time
+import queue
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+from logger import GLOBAL_LOGGER as log
+from utils.metrics import METRICS
+
+METRICS.describe("online_eval_requests_total", "Answers offered for online evaluation, by outcome (sampled, not_sampled, dropped, discarded)")
+METRICS.describe("online_eval_scored_total", "Online RAGAS scorings per metric, by outcome")
+METRICS.describe("online_eval_score", "RAGAS scores of sampled live answers")
+METRICS.describe("online_eval_score_rolling", "Mean RAGAS score over the last window of sampled answers")
+METRICS.describe("online_eval_below_threshold_ratio", "Share of the last window of sampled answers scoring below the threshold")
+METRICS.describe("online_eval_queue_depth", "Sampled answers waiting to be scored")
+METRICS.describe("online_eval_lag_seconds", "Time from answer to score")
+
+_STOP = object()
+
+
+class OnlineEvaluator:
+    """
+    Scores a sample of live answers with RAGAS metrics, off the request path.
+
+    ``submit`` is called after an answer has been produced; it keeps a
+    ``sample_rate`` share of them and puts (query, contexts, answer) on a
+    bounded queue without ever blocking; when the queue is full the sample is
+    dropped and counted. A single daemon worker thread builds the metrics once
+    and scores queued samples on its own event loop, so the judge calls add no
+    latency to the request that produced the answer.
+
+    Per metric, every score is observed in ``online_eval_score`` and the mean
+    and below-``threshold`` share of the last ``window`` scores are published
+    as gauges, all labelled with the (pinned, never routed) judge model.
+    """
+
+    def __init__(self, metric_names: Iterable[str], sample_rate: float = 0.05, queue_size: int = 100,
+                 window: int = 200, threshold: float = 0.75, timeout_s: Optional[float] = 180,
+                 metrics_factory: Optional[Callable[[List[str]], dict]] = None, cache=None,
+                 judge_model: str = ""):
+        self.metric_names = list(metric_names)
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.threshold = threshold
+        self.timeout_s = timeout_s
+        self.cache = cache
+        self.judge_model = judge_model
+        self._metrics_factory = metrics_factory
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._windows = {name: deque(maxlen=max(1, window)) for name in self.metric_names}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self.stats = {"sampled": 0, "not_sampled": 0, "dropped": 0, "scored": 0, "failed": 0}
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["OnlineEvaluator"]:
+        """Evaluator from the ``evaluation.online`` config block; None when it is disabled."""
+        eval_config = config.get("evaluation", {})
+        online_config = eval_config.get("online", {})
+        if not online_config.get("enabled", False):
+            return None
+        return cls(
+            online_config.get("metrics", ["context_precision", "response_relevancy"]),
+            sample_rate=online_config.get("sample_rate", 0.05),
+            queue_size=online_config.get("queue_size", 100),
+            window=online_config.get("window", 200),
+            threshold=online_config.get("threshold", 0.75),
+            timeout_s=eval_config.get("timeout_s", 180),
+        )
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+        METRICS.inc("online_eval_requests_total", outcome=outcome)
+
+    def submit(self, query: str, contexts: List[str], answer: str) -> bool:
+        """Offer one live answer; returns True if it was queued for scoring. Never blocks."""
+        if self._closing or self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            self._count("not_sampled")
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((query, list(contexts or []), answer, time.monotonic()))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("sampled")
+        METRICS.set_gauge("online_eval_queue_depth", self._queue.qsize())
+        return True
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="online-eval", daemon=True)
+                self._thread.start()
+
+    # ---------- worker ----------
+    def _build_metrics(self) -> dict:
+        if self._metrics_factory is not None:
+            return self._metrics_factory(self.metric_names)
+        # Imported here so the API starts without loading RAGAS unless online evaluation is on
+        from evaluation.ragas_eval import build_metrics, get_eval_cache, judge_model_name
+        if self.cache is None:
+            self.cache = get_eval_cache()
+        # Scores, cache keys and gauges all name the judge build_metrics pins
+        self.judge_model = judge_model_name()
+        return build_metrics(self.metric_names)
+
+    def _work(self):
+        loop = asyncio.new_event_loop()
+        try:
+            metrics = self._build_metrics()
+            while True:
+                item = self._queue.get()
+                METRICS.set_gauge("online_eval_queue_depth", self._queue.qsize())
+                if item is _STOP:
+                    return
+                try:
+                    loop.run_until_complete(self._score(metrics, *item))
+                except Exception as e:
+                    log.error("Online evaluation failed", error=str(e))
+        except Exception as e:
+            # Without metrics nothing can be scored; stop sampling instead of queueing forever
+            log.error("Online evaluation disabled, could not build metrics", error=str(e))
+            self.sample_rate = 0.0
+        finally:
+            loop.close()
+
+    async def _score(self, metrics: dict, query: str, contexts: List[str], answer: str, submitted_at: float):
+        from ragas import SingleTurnSample
+        from evaluation.ragas_eval import METRICS_NEEDING_CONTEXTS
+
+        sample = SingleTurnSample(user_input=query, response=answer, retrieved_contexts=contexts)
+        # An answer generated without context (e.g. a failed web search) can still be scored on relevancy
+        names = [name for name in metrics if contexts or name not in METRICS_NEEDING_CONTEXTS]
+        outcomes = await asyncio.gather(
+            *(self._score_metric(name, metrics[name], sample) for name in names), return_exceptions=True
+        )
+        failed = False
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException) or outcome != outcome:
+                failed = True
+                METRICS.inc("online_eval_scored_total", metric=name, judge=self.judge_model, outcome="error")
+                continue
+            METRICS.inc("online_eval_scored_total", metric=name, judge=self.judge_model, outcome="ok")
+            METRICS.observe("online_eval_score", outcome, metric=name, judge=self.judge_model)
+            self._publish(name, outcome)
+        METRICS.observe("online_eval_lag_seconds", time.monotonic() - submitted_at)
+        with self._lock:
+            self.stats["failed" if failed else "scored"] += 1
+
+    async def _score_metric(self, name: str, metric, sample) -> float:
+        if self.cache is not None:
+            return await self.cache.ascore(name, metric, sample, self.judge_model, timeout=self.timeout_s)
+        return float(await metric.single_turn_ascore(sample, timeout=self.timeout_s))
+
+    def _publish(self, name: str, score: float):
+        with self._lock:
+            window = self._windows[name]
+            window.append(score)
+            mean = sum(window) / len(window)
+            below = sum(1 for s in window if s < self.threshold) / len(window)
+        METRICS.set_gauge("online_eval_score_rolling", round(mean, 4), metric=name, judge=self.judge_model)
+        METRICS.set_gauge("online_eval_below_threshold_ratio", round(below, 4), metric=name, judge=self.judge_model)
+
+    def summary(self) -> dict:
+        """Counts plus rolling mean per metric."""
+        with self._lock:
+            rolling = {name: round(sum(w) / len(w), 4) if w else None for name, w in self._windows.items()}
+            return {**self.stats, "queue_depth": self._queue.qsize(), "rolling": rolling}
+
+    def close(self, timeout: float = 5.0, drain: bool = False):
+        """
+        Stop sampling and stop the worker, waiting at most ``timeout`` seconds.
+
+        Queued samples are discarded unless ``drain``, in which case the worker
+        scores them first (still bounded by ``timeout``).
+        """
+        self._closing = True
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        if not drain:
+            discarded = 0
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                discarded += 1
+            if discarded:
+                METRICS.inc("online_eval_requests_total", discarded, outcome="discarded")
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        METRICS.set_gauge("online_eval_queue_depth", self._queue.qsize())
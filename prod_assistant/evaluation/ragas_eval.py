@@ -1,5 +1,7 @@
 import asyncio
+import os
 from utils.model_loader import ModelLoader
+from evaluation.eval_cache import EvalCache
 from ragas import SingleTurnSample
 from ragas.llms import LangchainLLMWrapper
 from ragas.embeddings import LangchainEmbeddingsWrapper
@@ -9,6 +11,91 @@ grpc_aio.init_grpc_aio()
 model_loader=ModelLoader()
 
 
+# Metrics by the name used in evaluation results; each needs the judge LLM, some also embeddings
+METRIC_NAMES = ("context_precision", "response_relevancy")
+METRICS_NEEDING_EMBEDDINGS = {"response_relevancy"}
+# Metrics that judge the retrieved contexts and cannot score an answer given without any
+METRICS_NEEDING_CONTEXTS = {"context_precision"}
+
+
+def build_metric(name, evaluator_llm, evaluator_embeddings=None):
+    """Create one RAGAS metric on top of already wrapped judge LLM / embeddings."""
+    if name == "context_precision":
+        return LLMContextPrecisionWithoutReference(llm=evaluator_llm)
+    if name == "response_relevancy":
+        return ResponseRelevancy(llm=evaluator_llm, embeddings=evaluator_embeddings)
+    raise ValueError(f"Unknown metric: {name}. Expected one of {METRIC_NAMES}")
+
+
+def judge_provider(loader=None):
+    """
+    ``llm`` config block the judge runs on.
+
+    The judge is always one pinned provider, never the latency router, so each
+    score (and its cache key) belongs to exactly one model. Set with
+    ``evaluation.judge_provider``; defaults to ``LLM_PROVIDER``, or openai when
+    that is ``auto``.
+    """
+    loader = loader or model_loader
+    provider = loader.config.get("evaluation", {}).get("judge_provider")
+    if not provider:
+        provider = os.getenv("LLM_PROVIDER", "openai")
+        provider = "openai" if provider == "auto" else provider
+    return provider
+
+
+def judge_model_name(loader=None):
+    """``provider:model`` of the judge LLM, recorded with every score."""
+    loader = loader or model_loader
+    provider = judge_provider(loader)
+    llm_config = loader.config["llm"].get(provider, {})
+    return f"{llm_config.get('provider', provider)}:{llm_config.get('model_name', '')}"
+
+
+def load_judge_llm(loader=None):
+    """The judge LLM client, pinned to ``judge_provider`` (rate limited, not routed)."""
+    loader = loader or model_loader
+    return loader.load_llm(provider=judge_provider(loader))
+
+
+def build_metrics(names=METRIC_NAMES, loader=None):
+    """Metrics sharing one judge LLM wrapper (and one embeddings wrapper), built once per run."""
+    loader = loader or model_loader
+    evaluator_llm = LangchainLLMWrapper(load_judge_llm(loader))
+    evaluator_embeddings = None
+    if METRICS_NEEDING_EMBEDDINGS.intersection(names):
+        evaluator_embeddings = LangchainEmbeddingsWrapper(loader.load_embeddings())
+    return {name: build_metric(name, evaluator_llm, evaluator_embeddings) for name in names}
+
+
+# Default for "use the shared cache", so callers can still pass cache=None to skip it
+_SHARED = object()
+_eval_cache = _SHARED
+
+
+def get_eval_cache():
+    """Shared score cache from the ``evaluation.cache`` config block; None when it is disabled."""
+    global _eval_cache
+    if _eval_cache is _SHARED:
+        cache_config = model_loader.config.get("evaluation", {}).get("cache", {})
+        _eval_cache = None
+        if cache_config.get("enabled", True):
+            _eval_cache = EvalCache(cache_config.get("path", os.path.join("data", "eval", "cache.sqlite3")))
+    return _eval_cache
+
+
+async def score_sample(name, metric, sample, cache=_SHARED, timeout=None):
+    """Score one sample with one metric, reusing a cached score for identical inputs and judge.
+
+    ``cache=None`` always calls the judge.
+    """
+    if cache is _SHARED:
+        cache = get_eval_cache()
+    if cache is None:
+        return await metric.single_turn_ascore(sample, timeout=timeout)
+    return await cache.ascore(name, metric, sample, judge_model_name(), timeout=timeout)
+
+
 def evaluate_context_precision(query, response, retrieved_context):
     try:
         sample = SingleTurnSample(
@@ -18,10 +105,10 @@ def evaluate_context_precision(query, response, retrieved_context):
         )
 
         async def main():
-            llm = model_loader.load_llm()
+            llm = load_judge_llm()
             evaluator_llm = LangchainLLMWrapper(llm)
-            context_precision = LLMContextPrecisionWithoutReference(llm=evaluator_llm)
-            result = await context_precision.single_turn_ascore(sample)
+            context_precision = build_metric("context_precision", evaluator_llm)
+            result = await score_sample("context_precision", context_precision, sample)
             return result
 
         return asyncio.run(main())
@@ -37,12 +124,12 @@ def evaluate_response_relevancy(query, response, retrieved_context):
         )
 
         async def main():
-            llm = model_loader.load_llm()
+            llm = load_judge_llm()
             evaluator_llm = LangchainLLMWrapper(llm)
             embedding_model = model_loader.load_embeddings()
             evaluator_embeddings = LangchainEmbeddingsWrapper(embedding_model)
-            scorer = ResponseRelevancy(llm=evaluator_llm, embeddings=evaluator_embeddings)
-            result = await scorer.single_turn_ascore(sample)
+            scorer = build_metric("response_relevancy", evaluator_llm, evaluator_embeddings)
+            result = await score_sample("response_relevancy", scorer, sample)
             return result
 
         return asyncio.run(main())
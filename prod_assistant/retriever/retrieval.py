@@ -1,15 +1,37 @@
 import os
+from typing import List
 from langchain_astradb import AstraDBVectorStore
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from utils.config_loader import load_config
 from utils.model_loader import ModelLoader
 from dotenv import load_dotenv
 from langchain.retrievers.document_compressors import LLMChainFilter
 from langchain.retrievers import ContextualCompressionRetriever
 from evaluation.ragas_eval import evaluate_context_precision, evaluate_response_relevancy
+from utils.single_flight import SingleFlight, normalize_query
+from etl.review_chunking import group_reviews_by_product
 # Add the project root to the Python path for direct script execution
 # project_root = Path(__file__).resolve().parents[2]
 # sys.path.insert(0, str(project_root))
 
+# Shared across Retriever instances: identical concurrent queries run the
+# MMR search + LLM compression filter only once
+_RETRIEVAL_FLIGHT = SingleFlight("retriever")
+
+
+class ProductGroupingRetriever(BaseRetriever):
+    """Groups review-level hits from the base retriever back into at most `max_products` products."""
+
+    base_retriever: BaseRetriever
+    max_products: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return group_reviews_by_product(docs)[:self.max_products]
+
+
 class Retriever:
     def __init__(self):
         """_summary_
@@ -50,32 +72,48 @@ class Retriever:
                 )
         if not self.retriever_instance:
             top_k = self.config["retriever"]["top_k"] if "retriever" in self.config else 3
+            review_chunks = self.config.get("ingestion", {}).get("chunking", "review") == "review"
+            # Review-level chunks: fetch more hits, they are folded into top_k products below
+            k = top_k * self.config.get("retriever", {}).get("chunk_fanout", 3) if review_chunks else top_k
             
             mmr_retriever=self.vstore.as_retriever(
                 search_type="mmr",
-                search_kwargs={"k": top_k,
+                search_kwargs={"k": k,
                                 "fetch_k": 20,
                                 "lambda_mult": 0.7,
                                 "score_threshold": 0.6
                                })
             print("Retriever loaded successfully.")
             
-            llm = self.model_loader.load_llm()
+            base_retriever = mmr_retriever
+            if review_chunks:
+                # Group before the LLM filter so it still sees at most top_k (product) documents
+                base_retriever = ProductGroupingRetriever(base_retriever=mmr_retriever, max_products=top_k)
+            
+            # The compression filter makes one LLM call per candidate doc; hedge it like the grader
+            llm = self.model_loader.load_llm(hedged=True)
             
             compressor=LLMChainFilter.from_llm(llm)
             
             self.retriever_instance = ContextualCompressionRetriever(
                 base_compressor=compressor, 
-                base_retriever=mmr_retriever
+                base_retriever=base_retriever
             )
             
         return self.retriever_instance
             
     def call_retriever(self,query):
-        """_summary_
-        """
+        """Retrieve documents for a query, sharing the call with identical in-flight queries."""
         retriever=self.load_retriever()
-        output=retriever.invoke(query)
+        single_flight_config = self.config.get("single_flight", {})
+        if not single_flight_config.get("enabled", True):
+            return retriever.invoke(query)
+        output=_RETRIEVAL_FLIGHT.do(
+            normalize_query(query),
+            retriever.invoke,
+            query,
+            timeout=single_flight_config.get("timeout_s"),
+        )
         return output
     
 if __name__=='__main__':
@@ -1,14 +1,35 @@
-
+import os
+import hmac
+import asyncio
+import tracemalloc
 import uvicorn
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Form, Header, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from langchain_core.messages import HumanMessage
 from workflow.agentic_rag_workflow import AgenticRAG
+from utils.config_loader import load_config
+from utils.profiler import RequestProfiler, ProfilingMiddleware, memory_snapshot
+from utils.admission_control import AdmissionController, AdmissionRejected
+from utils.metrics import METRICS
+from utils.single_flight import AsyncSingleFlight, SingleFlightTimeout, normalize_query
+from evaluation.online_eval import OnlineEvaluator
+
+config = load_config()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if online_evaluator is not None:
+        # Stop the background scorer without blocking the loop on its in-flight judge call
+        await asyncio.to_thread(online_evaluator.close)
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 # ---------- Static Files ----------
 app.mount("/static", StaticFiles(directory="static"), name="static") # For serving static files
 templates = Jinja2Templates(directory="templates") # For serving HTML templates
@@ -22,6 +43,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------- Profiling (opt-in) ----------
+profiling_config = config.get("profiling", {})
+PROFILING_ENABLED = profiling_config.get("enabled", False) or os.getenv("ENABLE_PROFILING", "").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+# Object types whose live counts we watch in memory snapshots (per-request construction leaks)
+WATCHED_TYPES = ("AgenticRAG", "MemorySaver", "ModelLoader", "ChatOpenAI", "ChatGroq",
+                 "ChatGoogleGenerativeAI", "OpenAIEmbeddings", "AstraDBVectorStore")
+
+profiler = None
+if PROFILING_ENABLED:
+    profiler = RequestProfiler(
+        output_dir=profiling_config.get("output_dir", "profiles"),
+        interval=profiling_config.get("sample_interval_s", 0.005),
+        top_n=profiling_config.get("top_n", 30),
+    )
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        header=profiling_config.get("header", "X-Profile"),
+        token=PROFILING_TOKEN,
+    )
+
+
+# ---------- Admission Control ----------
+# Each /get can fan out into several LLM calls, so cap in-flight workflows and queue the rest
+admission_config = config.get("admission_control", {})
+chat_admission = AdmissionController(
+    name="chat",
+    max_concurrency=admission_config.get("max_concurrent_workflows", 8),
+    max_queue=admission_config.get("max_queue_size", 32),
+    queue_timeout_s=admission_config.get("queue_timeout_s", 10),
+    retry_after_s=admission_config.get("retry_after_s", 5),
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": "Server is busy, please retry shortly.", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+# ---------- Request Coalescing ----------
+# Identical concurrent questions share one workflow run (and one admission slot)
+single_flight_config = config.get("single_flight", {})
+chat_flight = AsyncSingleFlight("chat")
+
+
+@app.exception_handler(SingleFlightTimeout)
+async def single_flight_timeout_handler(request: Request, exc: SingleFlightTimeout):
+    return JSONResponse(status_code=504, content={"detail": "Timed out waiting for an identical in-flight request."})
+
+
+# ---------- Online Evaluation (opt-in) ----------
+# A sample of answers is scored with RAGAS in a background worker; results show up in /metrics.
+# The worker is stopped by the lifespan handler on shutdown
+online_evaluator = OnlineEvaluator.from_config(config)
+
+
+def _require_admin(token: str | None):
+    """Admin routes only exist when profiling is enabled and, if configured, need the token."""
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if PROFILING_TOKEN and not (token and hmac.compare_digest(token, PROFILING_TOKEN)):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 # ---------- FastAPI Endpoints ----------
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -30,6 +119,47 @@ async def index(request: Request):
 
 @app.post("/get")
 async def chat(msg: str = Form(...)):
-    rag_agent = AgenticRAG()
-    answer = await rag_agent.run(msg)
-    return answer
\ No newline at end of file
+    async def _answer():
+        async with chat_admission.slot():
+            rag_agent = AgenticRAG()
+            answer = await rag_agent.run(msg)
+        if online_evaluator is not None:
+            # Only queues the sample; scoring happens off the request path
+            online_evaluator.submit(msg, rag_agent.last_contexts, answer)
+        return answer
+
+    if not single_flight_config.get("enabled", True):
+        return await _answer()
+    return await chat_flight.do(normalize_query(msg), _answer, timeout=single_flight_config.get("timeout_s"))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return METRICS.render_prometheus()
+
+
+# ---------- Admin / Profiling Endpoints ----------
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: str | None = Header(default=None)):
+    _require_admin(x_admin_token)
+    return {"profiles": profiler.list_profiles()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: str | None = Header(default=None)):
+    _require_admin(x_admin_token)
+    report = profiler.load(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
+@app.get("/admin/memory")
+async def get_memory_snapshot(top_n: int = 30, start_tracing: bool = False,
+                              x_admin_token: str | None = Header(default=None)):
+    _require_admin(x_admin_token)
+    # Leave tracemalloc running so consecutive snapshots show where memory keeps growing
+    if start_tracing and not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+    # gc.get_objects() and tracemalloc snapshots walk the heap; don't stall other requests on it
+    return await asyncio.to_thread(memory_snapshot, top_n=top_n, type_names=WATCHED_TYPES)
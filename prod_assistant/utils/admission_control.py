@@ -0,0 +1,116 @@
+# utils/admission_control.py
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from logger import GLOBAL_LOGGER as log
+from utils.metrics import METRICS
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status and Retry-After hint."""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(f"Request rejected ({reason}), retry after {retry_after}s")
+
+
+class AdmissionController:
+    """
+    Bounded concurrency + bounded wait queue for expensive request handlers.
+
+    - at most ``max_concurrency`` requests run at once,
+    - at most ``max_queue`` requests wait for a slot; more are rejected with 429,
+    - a waiting request that does not get a slot within ``queue_timeout_s`` is
+      rejected with 503.
+
+    The Retry-After hint is derived from the observed service time (EWMA) and
+    the current queue depth, never lower than ``retry_after_s``.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 8, max_queue: int = 32,
+                 queue_timeout_s: float = 10.0, retry_after_s: int = 5):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self._ewma_service_s = None
+
+        METRICS.describe("admission_active", "Requests currently holding an admission slot")
+        METRICS.describe("admission_queue_depth", "Requests waiting for an admission slot")
+        METRICS.describe("admission_wait_seconds", "Time spent waiting for an admission slot")
+        METRICS.describe("admission_rejected_total", "Requests rejected by admission control")
+        self._publish()
+
+    def _publish(self):
+        METRICS.set_gauge("admission_active", self.active, controller=self.name)
+        METRICS.set_gauge("admission_queue_depth", self.waiting, controller=self.name)
+
+    def _retry_after(self) -> int:
+        if not self._ewma_service_s:
+            return self.retry_after_s
+        # Time for the queue ahead of a new arrival to drain through the available slots
+        drain = self._ewma_service_s * (self.waiting + 1) / self.max_concurrency
+        return max(self.retry_after_s, math.ceil(drain))
+
+    def _record_service_time(self, seconds: float, alpha: float = 0.2):
+        if self._ewma_service_s is None:
+            self._ewma_service_s = seconds
+        else:
+            self._ewma_service_s = alpha * seconds + (1 - alpha) * self._ewma_service_s
+
+    def _reject(self, reason: str, status_code: int):
+        retry_after = self._retry_after()
+        METRICS.inc("admission_rejected_total", controller=self.name, reason=reason)
+        log.warning("Request rejected by admission control", controller=self.name, reason=reason,
+                    active=self.active, waiting=self.waiting, retry_after=retry_after)
+        raise AdmissionRejected(reason, status_code, retry_after)
+
+    async def _acquire(self):
+        # Fast path: a free slot and nobody queued ahead of us
+        if self.waiting == 0 and not self._semaphore.locked():
+            await self._semaphore.acquire()
+            METRICS.observe("admission_wait_seconds", 0.0, controller=self.name)
+            return
+
+        if self.waiting >= self.max_queue:
+            self._reject("queue_full", 429)
+
+        self.waiting += 1
+        self._publish()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            self.waiting -= 1
+            self._publish()
+            METRICS.observe("admission_wait_seconds", time.perf_counter() - start, controller=self.name)
+            self._reject("queue_timeout", 503)
+        except BaseException:
+            # Client went away while queued
+            self.waiting -= 1
+            self._publish()
+            raise
+        self.waiting -= 1
+        METRICS.observe("admission_wait_seconds", time.perf_counter() - start, controller=self.name)
+
+    @asynccontextmanager
+    async def slot(self):
+        """``async with controller.slot():`` - hold an admission slot for the duration of the block."""
+        await self._acquire()
+        self.active += 1
+        self._publish()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_service_time(time.perf_counter() - start)
+            self.active -= 1
+            self._semaphore.release()
+            self._publish()
@@ -0,0 +1,281 @@
+# utils/llm_router.py
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ConfigDict
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from logger import GLOBAL_LOGGER as log
+from utils.metrics import METRICS
+from utils.rate_limiter import CircuitOpenError
+
+METRICS.describe("llm_route_latency_ewma_seconds", "EWMA latency per routed provider")
+METRICS.describe("llm_route_error_rate", "EWMA error rate per routed provider")
+METRICS.describe("llm_route_calls_total", "Routed calls per provider and outcome")
+METRICS.describe("llm_hedges_total", "Hedged backup requests fired, by which request won")
+
+# Hedged sync calls run the primary and the backup on this pool
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+class ProviderStats:
+    """
+    EWMA latency / error rate plus a window of recent latencies for one provider.
+
+    The error rate also halves every ``error_half_life_s`` without calls: a
+    demoted provider gets hardly any traffic, so it could otherwise never
+    earn its way back once it recovered.
+    """
+
+    def __init__(self, name: str, alpha: float = 0.2, window: int = 200, error_half_life_s: float = 60.0):
+        self.name = name
+        self.alpha = alpha
+        self.error_half_life_s = error_half_life_s
+        self.ewma_latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_at = time.monotonic()
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self) -> float:
+        if self.error_half_life_s <= 0:
+            return self._error_rate
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_at) / self.error_half_life_s)
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+            self._error_at = time.monotonic()
+            if ok:
+                self.latencies.append(latency)
+                if self.ewma_latency is None:
+                    self.ewma_latency = latency
+                else:
+                    self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+        METRICS.set_gauge("llm_route_error_rate", round(self.error_rate, 4), provider=self.name)
+        if self.ewma_latency is not None:
+            METRICS.set_gauge("llm_route_latency_ewma_seconds", round(self.ewma_latency, 4), provider=self.name)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_STATS_LOCK = threading.Lock()
+_STATS: Dict[str, ProviderStats] = {}
+
+
+def get_provider_stats(name: str, alpha: float = 0.2, error_half_life_s: float = 60.0) -> ProviderStats:
+    """Process-wide stats so every router instance learns from every call."""
+    with _STATS_LOCK:
+        if name not in _STATS:
+            _STATS[name] = ProviderStats(name, alpha=alpha, error_half_life_s=error_half_life_s)
+        return _STATS[name]
+
+
+class RoutingChatModel(BaseChatModel):
+    """
+    Chat model that spreads calls over several configured providers.
+
+    Each call goes to the healthy provider with the lowest EWMA latency
+    (providers with no data yet are tried first so they get measured) and
+    fails over to the next one on error. With ``hedge=True`` a backup request
+    is sent to the second-best provider if the first has not answered within
+    its observed p95 latency, and whichever answers first wins. The delay
+    counts from when the primary request starts running, not from when it was
+    queued on the hedge pool.
+    """
+
+    routes: List[Tuple[str, Any]]
+    hedge: bool = False
+    max_error_rate: float = 0.5
+    hedge_percentile: float = 0.95
+    min_samples_for_percentile: int = 20
+    hedge_min_delay_s: float = 1.0
+    ewma_alpha: float = 0.2
+    error_half_life_s: float = 60.0
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"providers": [name for name, _ in self.routes], "hedge": self.hedge}
+
+    def with_hedging(self) -> "RoutingChatModel":
+        return self.model_copy(update={"hedge": True})
+
+    # ---------- routing ----------
+    def _stats(self, name: str) -> ProviderStats:
+        return get_provider_stats(name, self.ewma_alpha, self.error_half_life_s)
+
+    @staticmethod
+    def _circuit_open(llm) -> bool:
+        guard = getattr(llm, "guard", None)
+        return bool(guard is not None and guard.breaker.is_open)
+
+    def _score(self, name: str) -> float:
+        """Expected latency, inflated by the error rate. Unmeasured providers score 0 until they fail."""
+        stats = self._stats(name)
+        if stats.ewma_latency is None:
+            return 0.0 if stats.error_rate == 0 else float("inf")
+        return stats.ewma_latency / max(1e-3, 1 - stats.error_rate)
+
+    def _ranked(self) -> List[Tuple[str, Any]]:
+        healthy, degraded = [], []
+        for name, llm in self.routes:
+            stats = self._stats(name)
+            if self._circuit_open(llm) or stats.error_rate > self.max_error_rate:
+                degraded.append((name, llm))
+            else:
+                healthy.append((name, llm))
+        healthy.sort(key=lambda route: self._score(route[0]))
+        # Degraded providers stay as a last resort, most recently healthy first
+        degraded.sort(key=lambda route: self._stats(route[0]).error_rate)
+        return healthy + degraded
+
+    def _hedge_delay(self, name: str) -> float:
+        stats = self._stats(name)
+        if len(stats.latencies) >= self.min_samples_for_percentile:
+            return max(self.hedge_min_delay_s, stats.percentile(self.hedge_percentile))
+        if stats.ewma_latency is not None:
+            return max(self.hedge_min_delay_s, 2 * stats.ewma_latency)
+        return self.hedge_min_delay_s
+
+    def _timed(self, name: str, llm, messages, stop, run_manager, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        try:
+            result = llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except CircuitOpenError:
+            METRICS.inc("llm_route_calls_total", provider=name, outcome="circuit_open")
+            raise
+        except Exception:
+            self._stats(name).record(time.perf_counter() - start, ok=False)
+            METRICS.inc("llm_route_calls_total", provider=name, outcome="error")
+            raise
+        self._stats(name).record(time.perf_counter() - start, ok=True)
+        METRICS.inc("llm_route_calls_total", provider=name, outcome="ok")
+        return result
+
+    async def _atimed(self, name: str, llm, messages, stop, run_manager, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        try:
+            result = await llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except CircuitOpenError:
+            METRICS.inc("llm_route_calls_total", provider=name, outcome="circuit_open")
+            raise
+        except Exception:
+            self._stats(name).record(time.perf_counter() - start, ok=False)
+            METRICS.inc("llm_route_calls_total", provider=name, outcome="error")
+            raise
+        self._stats(name).record(time.perf_counter() - start, ok=True)
+        METRICS.inc("llm_route_calls_total", provider=name, outcome="ok")
+        return result
+
+    # ---------- sync ----------
+    def _hedged(self, primary, backup, messages, stop, run_manager, **kwargs) -> ChatResult:
+        (p_name, p_llm), (b_name, b_llm) = primary, backup
+        started = threading.Event()
+
+        def _primary():
+            started.set()
+            return self._timed(p_name, p_llm, messages, stop, run_manager, **kwargs)
+
+        first = _HEDGE_POOL.submit(_primary)
+        # Time spent queued behind other hedged calls is not the provider's latency
+        started.wait()
+        done, _ = wait([first], timeout=self._hedge_delay(p_name))
+        if done and first.exception() is None:
+            return first.result()
+
+        log.info("Hedging LLM call", primary=p_name, backup=b_name)
+        second = _HEDGE_POOL.submit(self._timed, b_name, b_llm, messages, stop, run_manager, **kwargs)
+        pending = {first, second}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    METRICS.inc("llm_hedges_total", winner="primary" if future is first else "backup")
+                    # The slower request cannot be interrupted mid-flight; its result is discarded
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        ranked = self._ranked()
+        if self.hedge and len(ranked) >= 2:
+            try:
+                return self._hedged(ranked[0], ranked[1], messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                log.warning("Hedged call failed on both providers", error=str(e)[:200])
+                ranked = ranked[2:]
+                if not ranked:
+                    raise
+
+        last_error = None
+        for name, llm in ranked:
+            try:
+                return self._timed(name, llm, messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                log.warning("LLM provider failed, failing over", provider=name, error=str(e)[:200])
+                last_error = e
+        raise last_error
+
+    # ---------- async ----------
+    async def _ahedged(self, primary, backup, messages, stop, run_manager, **kwargs) -> ChatResult:
+        (p_name, p_llm), (b_name, b_llm) = primary, backup
+        first = asyncio.ensure_future(self._atimed(p_name, p_llm, messages, stop, run_manager, **kwargs))
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(p_name))
+        if done and first.exception() is None:
+            return first.result()
+
+        log.info("Hedging LLM call", primary=p_name, backup=b_name)
+        second = asyncio.ensure_future(self._atimed(b_name, b_llm, messages, stop, run_manager, **kwargs))
+        pending = {first, second}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        METRICS.inc("llm_hedges_total", winner="primary" if task is first else "backup")
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        ranked = self._ranked()
+        if self.hedge and len(ranked) >= 2:
+            try:
+                return await self._ahedged(ranked[0], ranked[1], messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                log.warning("Hedged call failed on both providers", error=str(e)[:200])
+                ranked = ranked[2:]
+                if not ranked:
+                    raise
+
+        last_error = None
+        for name, llm in ranked:
+            try:
+                return await self._atimed(name, llm, messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                log.warning("LLM provider failed, failing over", provider=name, error=str(e)[:200])
+                last_error = e
+        raise last_error
@@ -0,0 +1,105 @@
+# utils/metrics.py
+import threading
+from collections import defaultdict
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (counters, gauges and summaries).
+
+    Rendered in the Prometheus text exposition format by the ``/metrics``
+    route, so it can be scraped without pulling in ``prometheus_client``.
+    Labels are passed as keyword arguments.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        # name/labels -> [count, sum, max]
+        self._summaries = {}
+        self._help = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            self._gauges[key] = self._gauges.get(key, 0.0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            summary = self._summaries.setdefault(self._key(name, labels), [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    def snapshot(self) -> dict:
+        """Plain dict view, handy for JSON responses and debugging."""
+        def _fmt(key):
+            name, labels = key
+            if not labels:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+        with self._lock:
+            return {
+                "counters": {_fmt(k): v for k, v in self._counters.items()},
+                "gauges": {_fmt(k): v for k, v in self._gauges.items()},
+                "summaries": {
+                    _fmt(k): {"count": c, "sum": s, "max": m} for k, (c, s, m) in self._summaries.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        def _labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        seen_types = set()
+
+        def _header(name, kind):
+            if name in seen_types:
+                return
+            seen_types.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                _header(name, "counter")
+                lines.append(f"{name}{_labels(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                _header(name, "gauge")
+                lines.append(f"{name}{_labels(labels)} {value}")
+            for (name, labels), (count, total, _) in sorted(self._summaries.items()):
+                _header(name, "summary")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+            # Prometheus summaries have no max sample, expose it as a sibling gauge
+            for (name, labels), (_, _, maximum) in sorted(self._summaries.items()):
+                _header(f"{name}_max", "gauge")
+                lines.append(f"{name}_max{_labels(labels)} {maximum}")
+        return "\n".join(lines) + "\n"
+
+
+# Single shared registry, same idea as GLOBAL_LOGGER
+METRICS = MetricsRegistry()
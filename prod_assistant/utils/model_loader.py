@@ -8,16 +8,30 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_groq import ChatGroq
 from logger import GLOBAL_LOGGER as log
 from exception.custom_exception import ProductAssistantException
+from utils.single_flight import SingleFlight, CoalescedEmbeddings
+from utils.rate_limiter import RateLimitedChatModel, RateLimitedEmbeddings, build_guard
+from utils.llm_router import RoutingChatModel
 import asyncio
 
+# Shared by every embeddings client we hand out, so identical in-flight embedding
+# calls from concurrent requests are made only once
+_EMBEDDING_FLIGHT = SingleFlight("embeddings")
+
+# API key each LLM provider needs; providers without a key are left out of routing
+PROVIDER_API_KEYS = {
+    "openai": "OPENAI_API_KEY",
+    "google": "GOOGLE_API_KEY",
+    "groq": "GROQ_API_KEY",
+}
+
 
 class ApiKeyManager:
     def __init__(self):
         load_dotenv()
         self.api_keys = {
             "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
-            # "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY"),
-            # "GROQ_API_KEY": os.getenv("GROQ_API_KEY"),
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY"),
+            "GROQ_API_KEY": os.getenv("GROQ_API_KEY"),
             "ASTRA_DB_API_ENDPOINT": os.getenv("ASTRA_DB_API_ENDPOINT"),
             "ASTRA_DB_APPLICATION_TOKEN": os.getenv("ASTRA_DB_APPLICATION_TOKEN"),
             "ASTRA_DB_KEYSPACE": os.getenv("ASTRA_DB_KEYSPACE"),
@@ -45,6 +59,22 @@ class ModelLoader:
 
     
 
+    def _sdk_max_retries(self) -> int:
+        rate_limit_config = self.config.get("rate_limits", {})
+        # With our own coordinated backoff enabled, the SDKs' independent retries are turned down
+        return rate_limit_config.get("sdk_max_retries", 0) if rate_limit_config.get("enabled", True) else 2
+
+    @staticmethod
+    def _disable_google_embedding_retries(embeddings):
+        """The Google embeddings wrapper has no max_retries; drop the client's default retry of its embed calls."""
+        for client in (embeddings.client, getattr(embeddings, "async_client", None)):
+            transport = getattr(client, "transport", None)
+            wrapped_methods = getattr(transport, "_wrapped_methods", {})
+            for name in ("batch_embed_contents", "embed_content"):
+                method = wrapped_methods.get(getattr(transport, name, None))
+                if hasattr(method, "_retry"):
+                    method._retry = None
+
     def load_embeddings(self):
         """
         Load and return embedding model based on config provider (openai or google).
@@ -61,40 +91,120 @@ class ModelLoader:
             except RuntimeError:
                 asyncio.set_event_loop(asyncio.new_event_loop())
 
+            sdk_max_retries = self._sdk_max_retries()
             if provider == "openai":
-                return OpenAIEmbeddings(
+                embeddings = OpenAIEmbeddings(
                     model=model_name,
-                    api_key=self.api_key_mgr.get("OPENAI_API_KEY")
+                    api_key=self.api_key_mgr.get("OPENAI_API_KEY"),
+                    max_retries=sdk_max_retries,
                 )
             elif provider == "google":
-                return GoogleGenerativeAIEmbeddings(
+                embeddings = GoogleGenerativeAIEmbeddings(
                     model=model_name,
                     google_api_key=self.api_key_mgr.get("GOOGLE_API_KEY")
                 )
+                if sdk_max_retries == 0:
+                    self._disable_google_embedding_retries(embeddings)
             else:
                 raise ValueError(f"Unsupported embedding provider: {provider}")
 
+            rate_limit_config = self.config.get("rate_limits", {})
+            if rate_limit_config.get("enabled", True):
+                embeddings = RateLimitedEmbeddings(embeddings, build_guard(provider, model_name, rate_limit_config))
+
+            single_flight_config = self.config.get("single_flight", {})
+            if not single_flight_config.get("enabled", True):
+                return embeddings
+            return CoalescedEmbeddings(
+                embeddings,
+                _EMBEDDING_FLIGHT,
+                model_name=f"{provider}:{model_name}",
+                timeout=single_flight_config.get("timeout_s"),
+            )
+
         except Exception as e:
             log.error("Error loading embedding model", error=str(e))
             raise ProductAssistantException("Failed to load embedding model", sys)
 
 
-    def load_llm(self):
+    def load_llm(self, hedged: bool = False, provider: str | None = None):
         """
         Load and return the configured LLM model.
+
+        The client is wrapped in a RateLimitedChatModel so all LLM calls share the
+        per-model token buckets, retry/backoff policy and provider circuit breaker.
+        With ``LLM_PROVIDER=auto`` (or ``llm_routing.enabled``) a RoutingChatModel over
+        all configured providers is returned instead; ``hedged=True`` turns on hedged
+        requests for latency-critical callers and is ignored for a single provider.
+        An explicit ``provider`` pins that ``llm`` block and bypasses routing.
         """
         llm_block = self.config["llm"]
-        provider_key = os.getenv("LLM_PROVIDER", "openai")
+        provider_key = provider or os.getenv("LLM_PROVIDER", "openai")
+        routing_config = self.config.get("llm_routing", {})
+
+        if provider is None and (provider_key == "auto" or routing_config.get("enabled", False)):
+            return self._load_routing_llm(routing_config, hedged)
 
         if provider_key not in llm_block:
             log.error("LLM provider not found in config", provider=provider_key)
             raise ValueError(f"LLM provider '{provider_key}' not found in config")
 
-        llm_config = llm_block[provider_key]
+        return self._load_llm_from_config(llm_block[provider_key])
+
+    def _load_routing_llm(self, routing_config: dict, hedged: bool):
+        """Build a latency-aware router over every configured provider that has an API key."""
+        llm_block = self.config["llm"]
+        routes = []
+        for provider_key in routing_config.get("providers", list(llm_block.keys())):
+            llm_config = llm_block.get(provider_key)
+            if llm_config is None:
+                log.warning("Routing provider not found in config, skipping", provider=provider_key)
+                continue
+            if not self.api_key_mgr.get(PROVIDER_API_KEYS.get(llm_config.get("provider"), "")):
+                log.warning("No API key for routing provider, skipping", provider=provider_key)
+                continue
+            routes.append((provider_key, self._load_llm_from_config(llm_config)))
+
+        if not routes:
+            log.error("No usable LLM providers for routing")
+            raise ValueError("No usable LLM providers for routing; check API keys and llm_routing.providers")
+
+        log.info("Loading routing LLM", providers=[name for name, _ in routes], hedged=hedged)
+        return RoutingChatModel(
+            routes=routes,
+            hedge=hedged,
+            max_error_rate=routing_config.get("max_error_rate", 0.5),
+            hedge_percentile=routing_config.get("hedge_percentile", 0.95),
+            min_samples_for_percentile=routing_config.get("min_samples_for_percentile", 20),
+            hedge_min_delay_s=routing_config.get("hedge_min_delay_s", 1.0),
+            ewma_alpha=routing_config.get("ewma_alpha", 0.2),
+            error_half_life_s=routing_config.get("error_half_life_s", 60.0),
+        )
+
+    def _load_llm_from_config(self, llm_config: dict):
+        """Build the client for one ``llm`` config block, rate limited unless disabled."""
+        llm = self._create_llm(llm_config)
+        rate_limit_config = self.config.get("rate_limits", {})
+        if not rate_limit_config.get("enabled", True):
+            return llm
+
+        provider = llm_config.get("provider")
+        model_name = llm_config.get("model_name")
+        return RateLimitedChatModel(
+            inner=llm,
+            provider=provider,
+            model_name=model_name,
+            max_output_tokens=llm_config.get("max_output_tokens", 2048),
+            guard=build_guard(provider, model_name, rate_limit_config),
+        )
+
+    def _create_llm(self, llm_config: dict):
+        """Create the raw provider client for one ``llm`` config block."""
         provider = llm_config.get("provider")
         model_name = llm_config.get("model_name")
         temperature = llm_config.get("temperature", 0.2)
         max_tokens = llm_config.get("max_output_tokens", 2048)
+        sdk_max_retries = self._sdk_max_retries()
 
         log.info("Loading LLM", provider=provider, model=model_name)
 
@@ -103,7 +213,8 @@ class ModelLoader:
                 model=model_name,
                 google_api_key=self.api_key_mgr.get("GOOGLE_API_KEY"),
                 temperature=temperature,
-                max_output_tokens=max_tokens
+                max_output_tokens=max_tokens,
+                max_retries=sdk_max_retries,
             )
 
         elif provider == "groq":
@@ -111,13 +222,15 @@ class ModelLoader:
                 model=model_name,
                 api_key=self.api_key_mgr.get("GROQ_API_KEY"), #type: ignore
                 temperature=temperature,
+                max_retries=sdk_max_retries,
             )
 
         elif provider == "openai":
             return ChatOpenAI(
                 model=model_name,
                 api_key=self.api_key_mgr.get("OPENAI_API_KEY"),
-                temperature=temperature
+                temperature=temperature,
+                max_retries=sdk_max_retries,
             )
 
         else:
@@ -0,0 +1,331 @@
+# utils/profiler.py
+import os
+import sys
+import gc
+import asyncio
+import hmac
+import json
+import time
+import uuid
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from logger import GLOBAL_LOGGER as log
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock sampling profiler.
+
+    A daemon thread periodically snapshots the stacks of every thread via
+    ``sys._current_frames()``. Sampling all threads (instead of using cProfile,
+    which only sees the thread it is enabled on) means work pushed into the
+    FastAPI threadpool by a request is captured as well. The flip side is that
+    the stacks of any other request running at the same time (on the event
+    loop or in the threadpool) are counted too; ``RequestProfiler`` reports how
+    many there were so such profiles can be discarded or read with care.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self.stack_counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_key(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_key(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            self.self_counts[stack[0]] += 1
+            # Count each function once per sample for inclusive time (recursion safe)
+            for key in set(stack):
+                self.total_counts[key] += 1
+            self.stack_counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, top_n: int = 30) -> dict:
+        """Return the hottest functions (self and inclusive) and collapsed stacks."""
+        def _rows(counter):
+            return [
+                {"function": key, "samples": count, "seconds": round(count * self.interval, 4)}
+                for key, count in counter.most_common(top_n)
+            ]
+
+        return {
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "self": _rows(self.self_counts),
+            "inclusive": _rows(self.total_counts),
+            # "a;b;c count" lines, ready for flamegraph.pl / speedscope
+            "collapsed_stacks": [f"{stack} {count}" for stack, count in self.stack_counts.most_common(top_n)],
+        }
+
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+)
+
+
+def _top_allocations(snapshot, top_n: int, baseline=None) -> list:
+    """Format the biggest allocation sites of a tracemalloc snapshot (or its diff)."""
+    snapshot = snapshot.filter_traces(_TRACE_FILTERS)
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline.filter_traces(_TRACE_FILTERS), "lineno")
+        return [
+            {
+                "location": str(stat.traceback),
+                "size_diff_kb": round(stat.size_diff / 1024, 2),
+                "size_kb": round(stat.size / 1024, 2),
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:top_n]
+        ]
+    return [
+        {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 2), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 2)
+
+
+class RequestProfiler:
+    """
+    Opt-in, per-request CPU + allocation profiling.
+
+    Only one request is profiled at a time because tracemalloc is process
+    global. Reports are written as JSON under ``output_dir`` and can be fetched
+    back by id through the admin routes.
+
+    ``try_start`` and ``stop`` walk the traced heap, so async callers should
+    run them with ``asyncio.to_thread`` rather than on the event loop.
+    """
+
+    def __init__(self, output_dir: str = "profiles", interval: float = 0.005, top_n: int = 30):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.top_n = top_n
+        self._lock = threading.Lock()
+
+    def try_start(self, label: str) -> dict | None:
+        """Start profiling, or return None while another profile is running.
+
+        The returned state must be handed to ``stop``, which frees the profiler again.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(25)
+            sampler = SamplingProfiler(interval=self.interval)
+            state = {
+                "id": uuid.uuid4().hex[:12],
+                "label": label,
+                "started_tracing": started_tracing,
+                "baseline": tracemalloc.take_snapshot(),
+                "sampler": sampler,
+                "t0": time.perf_counter(),
+                # Raised by ProfilingMiddleware when other requests run during the profile
+                "other_requests_max": 0,
+            }
+            sampler.start()
+        except BaseException:
+            self._lock.release()
+            raise
+        return state
+
+    def stop(self, state: dict, status_code: int | None = None) -> dict:
+        """Stop profiling, persist the report and release the lock."""
+        try:
+            sampler = state["sampler"]
+            sampler.stop()
+            elapsed = time.perf_counter() - state["t0"]
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if state["started_tracing"]:
+                tracemalloc.stop()
+
+            report = {
+                "id": state["id"],
+                "label": state["label"],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "status_code": status_code,
+                "wall_time_s": round(elapsed, 4),
+                "cpu": sampler.report(self.top_n),
+                # CPU and allocation figures include these requests' work as well
+                "concurrent_requests_max": state["other_requests_max"],
+                "memory": {
+                    "traced_current_kb": round(current / 1024, 2),
+                    "traced_peak_kb": round(peak / 1024, 2),
+                    "peak_rss_mb": _peak_rss_mb(),
+                    "allocations": _top_allocations(snapshot, self.top_n, baseline=state["baseline"]),
+                },
+            }
+            path = self.output_dir / f"{state['id']}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            log.info("Request profile stored", profile_id=state["id"], label=state["label"],
+                     wall_time_s=report["wall_time_s"], path=str(path))
+            return report
+        finally:
+            self._lock.release()
+
+    def load(self, profile_id: str) -> dict | None:
+        # Profile ids are hex; reject anything that could escape the directory
+        if not profile_id.isalnum():
+            return None
+        path = self.output_dir / f"{profile_id}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_profiles(self) -> list:
+        paths = sorted(self.output_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
+        return [p.stem for p in paths]
+
+
+def memory_snapshot(top_n: int = 30, type_names: tuple = ()) -> dict:
+    """
+    Point-in-time view of process memory.
+
+    Includes live object counts for the most common types (and for any
+    ``type_names`` we explicitly watch, e.g. ``MemorySaver`` or ``ChatOpenAI``)
+    so leaks from objects being re-created per request show up as growing counts.
+    Walks every live object; call it from a worker thread in async code.
+    """
+    gc.collect()
+    type_counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    snapshot = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "peak_rss_mb": _peak_rss_mb(),
+        "gc_counts": gc.get_count(),
+        "top_types": dict(type_counts.most_common(top_n)),
+        "watched_types": {name: type_counts.get(name, 0) for name in type_names},
+        "tracemalloc": None,
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot["tracemalloc"] = {
+            "traced_current_kb": round(current / 1024, 2),
+            "traced_peak_kb": round(peak / 1024, 2),
+            "allocations": _top_allocations(tracemalloc.take_snapshot(), top_n),
+        }
+    return snapshot
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles a single request when it carries the
+    profiling header (``X-Profile: <token>``).
+
+    Being plain ASGI (not ``BaseHTTPMiddleware``) the profile spans the whole
+    response, including the body of streaming responses. The report id is
+    returned in the ``X-Profile-Id`` response header.
+
+    Snapshots are taken in a worker thread so other requests keep being served
+    meanwhile. Every request passes through here, so the number of requests
+    that overlapped the profiled one is recorded in its report
+    (``concurrent_requests_max``); the sampler cannot tell their stacks apart.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler, header: str = "x-profile", token: str | None = None):
+        self.app = app
+        self.profiler = profiler
+        self.header = header.lower().encode("latin-1")
+        self.token = token
+        self._in_flight = 0
+        self._active_state = None
+
+    def _wants_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                if self.token is None:
+                    return True
+                return hmac.compare_digest(value.decode("latin-1"), self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # All on the event loop thread, so plain counters are safe
+        self._in_flight += 1
+        try:
+            if self._active_state is not None:
+                state = self._active_state
+                state["other_requests_max"] = max(state["other_requests_max"], self._in_flight - 1)
+            await self._handle(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _handle(self, scope, receive, send):
+        if not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # tracemalloc snapshots walk the whole heap; keep them off the event loop
+        state = await asyncio.to_thread(self.profiler.try_start, f"{scope.get('method')} {scope.get('path')}")
+        if state is None:
+            log.warning("Profiling already in progress, serving request unprofiled", path=scope.get("path"))
+            await self.app(scope, receive, send)
+            return
+        state["other_requests_max"] = self._in_flight - 1
+        self._active_state = state
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", state["id"].encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._active_state = None
+            await asyncio.to_thread(self.profiler.stop, state, status_code=status["code"])
@@ -0,0 +1,387 @@
+# utils/rate_limiter.py
+import time
+import random
+import asyncio
+import threading
+from typing import Any, List, Optional
+from pydantic import ConfigDict
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from logger import GLOBAL_LOGGER as log
+from utils.metrics import METRICS
+
+METRICS.describe("llm_calls_total", "Provider calls made through rate limited clients, by outcome")
+METRICS.describe("llm_retries_total", "Provider calls retried after a transient failure")
+METRICS.describe("llm_rate_limit_wait_seconds", "Time spent waiting on the client side token buckets")
+METRICS.describe("llm_circuit_state", "Circuit breaker state per provider (0 closed, 1 half open, 2 open)")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that hands out reservations.
+
+    ``reserve(n)`` always succeeds immediately and returns how long the caller
+    must wait before using the tokens; the bucket may go into debt, which makes
+    concurrent callers queue up behind each other instead of all retrying at
+    the same instant.
+    """
+
+    def __init__(self, capacity: float, refill_per_s: float):
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_s)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            # A single request larger than the bucket would never fit; cap it
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_per_s
+
+    def adjust(self, delta: float):
+        """Give back (negative delta) or charge (positive delta) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+    def penalize(self, seconds: float):
+        """Drain the bucket so nobody sends for ``seconds`` (used on a provider 429)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.refill_per_s)
+
+
+class ModelRateLimiter:
+    """Requests/min and tokens/min buckets for one provider model."""
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def reserve(self, estimated_tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def penalize(self, seconds: float):
+        self.requests.penalize(seconds)
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker per provider.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and calls fail fast for ``reset_timeout_s``; then a single trial
+    call is let through and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            log.warning("Circuit breaker state change", provider=self.name, old=self.state, new=state)
+        self.state = state
+        METRICS.set_gauge("llm_circuit_state", state, provider=self.name)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self._set_state(self.HALF_OPEN)
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def record_neutral(self):
+        """Outcome that says nothing about provider health (e.g. a 400): just free the trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout_s
+
+
+_REGISTRY_LOCK = threading.Lock()
+_LIMITERS: dict = {}
+_BREAKERS: dict = {}
+
+
+def get_model_limiter(provider: str, model_name: str, limits: dict) -> ModelRateLimiter:
+    """Process-wide limiter for ``provider:model`` so every client shares one quota."""
+    key = f"{provider}:{model_name}"
+    with _REGISTRY_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = ModelRateLimiter(
+                key,
+                requests_per_minute=limits.get("requests_per_minute", 60),
+                tokens_per_minute=limits.get("tokens_per_minute", 60000),
+            )
+        return _LIMITERS[key]
+
+
+def get_circuit_breaker(provider: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0) -> CircuitBreaker:
+    with _REGISTRY_LOCK:
+        if provider not in _BREAKERS:
+            _BREAKERS[provider] = CircuitBreaker(provider, failure_threshold, reset_timeout_s)
+        return _BREAKERS[provider]
+
+
+# ---------- Error classification / backoff ----------
+_TRANSIENT_ERROR_NAMES = (
+    "RateLimit", "Timeout", "APIConnectionError", "ServiceUnavailable", "ResourceExhausted",
+    "InternalServerError", "DeadlineExceeded", "Overloaded",
+)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """429s, 5xx, timeouts and connection errors are worth retrying; bad requests are not."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in (408, 409, 425, 429) or status >= 500
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return any(name in type(exc).__name__ for name in _TRANSIENT_ERROR_NAMES)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return _status_code(exc) == 429 or "RateLimit" in type(exc).__name__ or "ResourceExhausted" in type(exc).__name__
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_s: float = 0.5, max_s: float = 20.0) -> float:
+    """Exponential backoff with full jitter (attempt starts at 0)."""
+    return random.uniform(0, min(max_s, base_s * (2 ** attempt)))
+
+
+def _estimate_tokens(messages: List[BaseMessage], max_output_tokens: int) -> int:
+    chars = sum(len(m.content) if isinstance(m.content, str) else len(str(m.content)) for m in messages)
+    # ~4 characters per token is a good enough estimate for budgeting
+    return chars // 4 + max_output_tokens
+
+
+def _actual_tokens(result: ChatResult) -> Optional[int]:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens") is not None:
+        return usage["total_tokens"]
+    for generation in result.generations:
+        metadata = getattr(generation.message, "usage_metadata", None)
+        if metadata and metadata.get("total_tokens") is not None:
+            return metadata["total_tokens"]
+    return None
+
+
+class _GuardedCall:
+    """Shared rate limit / retry / circuit breaker loop for the chat and embedding wrappers."""
+
+    def __init__(self, provider: str, limiter: ModelRateLimiter, breaker: CircuitBreaker,
+                 max_retries: int, backoff_base_s: float, backoff_max_s: float):
+        self.provider = provider
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+
+    def _before(self, estimated_tokens: int) -> float:
+        if not self.breaker.allow():
+            METRICS.inc("llm_calls_total", provider=self.provider, model=self.limiter.name, outcome="circuit_open")
+            raise CircuitOpenError(f"Circuit open for provider '{self.provider}'")
+        wait = self.limiter.reserve(estimated_tokens)
+        if wait > 0:
+            METRICS.observe("llm_rate_limit_wait_seconds", wait, provider=self.provider)
+        return wait
+
+    def _on_error(self, exc: BaseException, attempt: int) -> float:
+        """Record a failure; return the delay before the next attempt or re-raise."""
+        if not is_transient_error(exc):
+            # A bad request says nothing about provider health
+            self.breaker.record_neutral()
+            METRICS.inc("llm_calls_total", provider=self.provider, model=self.limiter.name, outcome="error")
+            raise exc
+        self.breaker.record_failure()
+        retry_after = retry_after_seconds(exc)
+        if is_rate_limit_error(exc):
+            # Make every concurrent caller back off, not just this one
+            self.limiter.penalize(retry_after or self.backoff_base_s)
+        if attempt >= self.max_retries or self.breaker.is_open:
+            METRICS.inc("llm_calls_total", provider=self.provider, model=self.limiter.name, outcome="failed")
+            raise exc
+        delay = max(retry_after or 0.0, backoff_delay(attempt, self.backoff_base_s, self.backoff_max_s))
+        METRICS.inc("llm_retries_total", provider=self.provider, model=self.limiter.name)
+        log.warning("Transient provider error, retrying", provider=self.provider, model=self.limiter.name,
+                    attempt=attempt + 1, delay_s=round(delay, 2), error=str(exc)[:200])
+        return delay
+
+    def _on_success(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        self.breaker.record_success()
+        self.limiter.settle(estimated_tokens, actual_tokens)
+        METRICS.inc("llm_calls_total", provider=self.provider, model=self.limiter.name, outcome="ok")
+
+    def call(self, fn, estimated_tokens: int, count_tokens=lambda result: None):
+        attempt = 0
+        while True:
+            wait = self._before(estimated_tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt))
+                attempt += 1
+                continue
+            self._on_success(estimated_tokens, count_tokens(result))
+            return result
+
+    async def acall(self, fn, estimated_tokens: int, count_tokens=lambda result: None):
+        attempt = 0
+        while True:
+            wait = self._before(estimated_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt))
+                attempt += 1
+                continue
+            self._on_success(estimated_tokens, count_tokens(result))
+            return result
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that routes every call of the wrapped client through the
+    shared per-model token buckets, retries transient failures with jittered
+    exponential backoff and fails fast while the provider's circuit is open.
+
+    Being a ``BaseChatModel`` it drops into LCEL chains, ``LLMChainFilter`` and
+    the RAGAS LangChain wrapper exactly like the client it wraps.
+    """
+
+    inner: BaseChatModel
+    provider: str
+    model_name: str
+    max_output_tokens: int = 2048
+    guard: Any = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate_limited_{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.provider, "model_name": self.model_name}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        return self.guard.call(
+            lambda: self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            _estimate_tokens(messages, self.max_output_tokens),
+            _actual_tokens,
+        )
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        return await self.guard.acall(
+            lambda: self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            _estimate_tokens(messages, self.max_output_tokens),
+            _actual_tokens,
+        )
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Same guard as :class:`RateLimitedChatModel`, for embedding clients."""
+
+    def __init__(self, inner: Embeddings, guard: _GuardedCall):
+        self.inner = inner
+        self.guard = guard
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.guard.call(lambda: self.inner.embed_query(text), len(text) // 4 + 1)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.guard.call(lambda: self.inner.embed_documents(texts), sum(len(t) for t in texts) // 4 + 1)
+
+    def __getattr__(self, name):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+def build_guard(provider: str, model_name: str, rate_limit_config: dict) -> _GuardedCall:
+    """Create the guard for ``provider:model`` from the ``rate_limits`` config block."""
+    limits = rate_limit_config.get("models", {}).get(f"{provider}:{model_name}") or rate_limit_config.get("default", {})
+    return _GuardedCall(
+        provider=provider,
+        limiter=get_model_limiter(provider, model_name, limits),
+        breaker=get_circuit_breaker(
+            provider,
+            failure_threshold=rate_limit_config.get("circuit_failure_threshold", 5),
+            reset_timeout_s=rate_limit_config.get("circuit_reset_s", 30),
+        ),
+        max_retries=rate_limit_config.get("max_retries", 4),
+        backoff_base_s=rate_limit_config.get("backoff_base_s", 0.5),
+        backoff_max_s=rate_limit_config.get("backoff_max_s", 20),
+    )
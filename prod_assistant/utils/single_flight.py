@@ -0,0 +1,123 @@
+# utils/single_flight.py
+import re
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List
+from langchain_core.embeddings import Embeddings
+from logger import GLOBAL_LOGGER as log
+from utils.metrics import METRICS
+
+METRICS.describe("single_flight_calls_total", "Calls through a single-flight group, by role (leader executes, follower shares)")
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A follower gave up waiting on the in-flight execution for its key."""
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a user query so trivially different spellings share one key."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!. ")
+
+
+class SingleFlight:
+    """
+    Thread-based request coalescing.
+
+    Concurrent ``do(key, fn)`` calls with the same key share one execution of
+    ``fn``: the first caller (leader) runs it, later callers (followers) block
+    until it finishes and receive the same result or exception. Nothing is
+    cached - once the execution completes the key is forgotten.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+
+    def do(self, key, fn: Callable, *args, timeout: float | None = None, **kwargs) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            METRICS.inc("single_flight_calls_total", group=self.name, role="follower")
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                log.warning("Single-flight follower timed out", group=self.name, timeout=timeout)
+                raise SingleFlightTimeout(f"{self.name}: timed out after {timeout}s waiting for in-flight call")
+
+        METRICS.inc("single_flight_calls_total", group=self.name, role="leader")
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio flavour of :class:`SingleFlight`.
+
+    The shared execution runs as its own task and callers await it through
+    ``asyncio.shield``, so a leader whose client disconnects does not cancel
+    the work the followers are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict = {}
+
+    async def do(self, key, coro_fn: Callable, *args, timeout: float | None = None, **kwargs) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            METRICS.inc("single_flight_calls_total", group=self.name, role="leader")
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            METRICS.inc("single_flight_calls_total", group=self.name, role="follower")
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            log.warning("Single-flight call timed out", group=self.name, timeout=timeout)
+            raise SingleFlightTimeout(f"{self.name}: timed out after {timeout}s waiting for in-flight call")
+
+
+class CoalescedEmbeddings(Embeddings):
+    """Embeddings wrapper that shares in-flight embedding calls for identical inputs."""
+
+    def __init__(self, inner: Embeddings, flight: SingleFlight, model_name: str = "", timeout: float | None = None):
+        self.inner = inner
+        self.flight = flight
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.flight.do(("query", self.model_name, text), self.inner.embed_query, text, timeout=self.timeout)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        digest = hashlib.sha256("\x1f".join(texts).encode("utf-8")).hexdigest()
+        return self.flight.do(("documents", self.model_name, digest), self.inner.embed_documents, texts,
+                              timeout=self.timeout)
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's attributes (model, dimensions, ...) unchanged
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
@@ -6,8 +6,10 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
 from prompt_library.prompts import PROMPT_REGISTRY, PromptType
-from retriever.archieved.retrieval import Retriever
+from retriever.retrieval import Retriever
 from utils.model_loader import ModelLoader
+from utils.config_loader import load_config
+from utils.single_flight import SingleFlight, normalize_query
 from langgraph.checkpoint.memory import MemorySaver
 import asyncio
 import uuid
@@ -20,6 +22,9 @@ except ImportError as e:
     print(f"[DEBUG] duckduckgo_search not available: {e}")
     ddg = None
 
+# Identical concurrent web searches (e.g. a launch-day question) hit DuckDuckGo once
+_WEB_SEARCH_FLIGHT = SingleFlight("web_search")
+
 
 class AgenticRAG:
     """Agentic RAG pipeline using langGraph"""
@@ -34,10 +39,15 @@ class AgenticRAG:
         self.retriever_obj = Retriever()
         self.model_loader = ModelLoader()
         self.llm = self.model_loader.load_llm()
+        # The grader sits on every path through the graph; hedge it when routing across providers
+        self.grader_llm = self.model_loader.load_llm(hedged=True)
+        self.config = load_config()
         # Counter to track rewrites across a single run (reset in run_workflow)
         self.rewrite_count = 0
         # Flag to indicate retriever has been exhausted and should fallback to web search
         self.skip_retriever = False
+        # Contexts the last answer was generated from (one per document / search result), for evaluation
+        self.last_contexts = []
         self.checkpointer = MemorySaver()
         self.thread_id = str(uuid.uuid4())
         self.workflow = self._build_workflow()
@@ -97,9 +107,9 @@ class AgenticRAG:
     def _vector_retriever(self, state: AgentState):
         print("---RETRIEVER---")
         query = state["messages"][-1].content
-        retriever = self.retriever_obj.load_retriever()
-        docs = retriever.invoke(query)
+        docs = self.retriever_obj.call_retriever(query)
         context = self._format_docs(docs)
+        self.last_contexts = [self._format_docs([d]) for d in docs]
 
         # debug: show how many docs were returned and snippet
         try:
@@ -124,7 +134,7 @@ class AgenticRAG:
             """,
             input_variables=["question", "docs"],
         )
-        chain = prompt | self.llm | StrOutputParser()
+        chain = prompt | self.grader_llm | StrOutputParser()
         score = chain.invoke({"question": question, "docs": docs})
         print(f"[DEBUG] grade score_raw: {score!r}")
         return "generator" if "yes" in score.lower() else "rewriter"
@@ -190,16 +200,24 @@ class AgenticRAG:
         try:
             from duckduckgo_search import DDGS
             print("[DEBUG] Initializing DDGS and searching...")
-            results = list(DDGS().text(original_question, max_results=5))
+            search = lambda: list(DDGS().text(original_question, max_results=5))
+            single_flight_config = self.config.get("single_flight", {})
+            if single_flight_config.get("enabled", True):
+                results = _WEB_SEARCH_FLIGHT.do(normalize_query(original_question), search,
+                                                timeout=single_flight_config.get("timeout_s"))
+            else:
+                results = search()
             print(f"[DEBUG] DDGS returned {len(results)} results")
         except Exception as e:
             print(f"[DEBUG] Web search error: {type(e).__name__}: {e}")
+            self.last_contexts = []
             # Return fallback message instead of failing
             fallback = f"Unable to retrieve web search results for: {original_question}. Please try a different query."
             print(f"[DEBUG] Using fallback message: {fallback}")
             return {"messages": [HumanMessage(content=fallback)]}
 
         if not results:
+            self.last_contexts = []
             # Return fallback message instead of failing
             fallback = f"No web search results found for: {original_question}. The query might be too specific or no online sources are available."
             print(f"[DEBUG] Using fallback message: {fallback}")
@@ -213,6 +231,7 @@ class AgenticRAG:
             formatted.append(f"Title: {title}\nURL: {href}\nSnippet: {snippet}")
 
         context = "\n\n--\n\n".join(formatted)
+        self.last_contexts = formatted
         print(f"[DEBUG] web search formatted {len(results)} results")
         return {"messages": [HumanMessage(content=context)]}
 
@@ -280,6 +299,7 @@ class AgenticRAG:
         # Reset per-run counters and flags
         self.rewrite_count = 0
         self.skip_retriever = False
+        self.last_contexts = []
         # Invoke the compiled app. Use recursion_limit as a safety net.
         result = self.app.invoke({"messages": [HumanMessage(content=query)]}, 
                                  config={'configurable': {'recursion_limit': 50, 
@@ -288,15 +308,15 @@ class AgenticRAG:
         # Extract and return the last message
         last_message = result["messages"][-1].content
         return last_message
-    
-        # Inorder to work with Evaluation metrics
-        # function call will be associated like we have done in retreival code
-        # we will get some score
-        # then we can put some condition
-        # if score > 0.75 
-        #     return last_message# then generate output
-        # else
-        #     continue the loop again
+
+    async def run(self, query: str, thread_id: str = 'default_thread') -> str:
+        """Async entry point for the API: runs the blocking workflow in a worker thread
+        so the event loop stays free to queue / reject other requests."""
+        return await asyncio.to_thread(self.run_workflow, query, thread_id)
+
+    # Answers are not scored inline (that would add several judge LLM calls to every chat):
+    # the API samples (query, last_contexts, answer) into evaluation.online_eval.OnlineEvaluator,
+    # which scores them in the background and publishes rolling quality metrics.
 
 
 # -----------Test the Workflow -----------
@@ -1,13 +1,28 @@
 
 import streamlit as st
-from prod_assistant.etl.data_scrapper import FlipkartScraper
-from prod_assistant.etl.data_ingestion import DataIngestion
+from prod_assistant.etl.job_runner import JobRunner, RESUMABLE_STATUSES
+from prod_assistant.etl.catalog import read_catalog
+from prod_assistant.utils.config_loader import load_config
+import pyarrow.parquet as pq
+import io
 import os
+from datetime import date
 
-# Initialize scraper
-flipkart_scraper = FlipkartScraper()
+# One job runner per server process: scrape and ingest jobs run in its worker
+# processes, so they keep going across Streamlit reruns and browser reloads
+@st.cache_resource
+def get_job_runner():
+    jobs_config = load_config().get("jobs", {})
+    return JobRunner(
+        db_path=jobs_config.get("db_path", os.path.join("data", "jobs.sqlite3")),
+        max_workers=jobs_config.get("max_workers", 2),
+    )
 # Define output CSV path
 output_path = "data/product_reviews.csv"
+# Define output JSONL path (one product per line)
+jsonl_path = "data/product_reviews.jsonl"
+# Define output Parquet catalog directory (partitioned by scrape date)
+catalog_path = "data/catalog"
 # Streamlit UI
 st.title("📦 Product Review Scraper")
 
@@ -45,6 +60,24 @@ st.button("➕ Add Another Product", on_click=add_product_input)
 # Input for number of products and reviews
 max_products = st.number_input("How many products per search?", min_value=1, max_value=10, value=1)
 review_count = st.number_input("How many reviews per product?", min_value=1, max_value=10, value=2)
+# Browsers scraping search and product pages concurrently
+parallel_browsers = st.number_input("Parallel browsers", min_value=1, max_value=8, value=3)
+
+# HTTP mode fetches server-rendered pages without Chrome and falls back to the browser when needed
+use_http = st.checkbox("Fetch pages over HTTP first (browser only as fallback)", value=True)
+# HTTP workers need no browser of their own, so they are sized separately
+parallel_fetches = st.number_input("Parallel HTTP fetches", min_value=1, max_value=32, value=8, disabled=not use_http)
+
+# Continue an interrupted scrape: keep what was saved and skip products already written
+resume_scrape = st.checkbox("Resume previous scrape (keep saved rows, skip products already scraped)", value=False)
+
+# Embed and upsert each product as soon as it is scraped instead of in a second step
+stream_to_db = st.checkbox("Stream into the vector DB while scraping (products become searchable within seconds)", value=False)
+
+# Pages scraped within the TTL are served from the local scrape cache (0 disables it)
+cache_ttl_hours = st.number_input("Scrape cache TTL (hours)", min_value=0.0, max_value=168.0, value=1.0, step=0.5)
+
+job_runner = get_job_runner()
 
 # Button to start scraping
 if st.button("🚀 Start Scraping"):
@@ -57,52 +90,81 @@ if st.button("🚀 Start Scraping"):
     # Validate at least one product input
     if not product_inputs:
         st.warning("⚠️ Please enter at least one product name or a product description.")
-    # Start scraping process
+    # Submit the scrape as a background job; progress shows up in the jobs panel below
     else:
-        final_data = []
-        # Iterate over each product input and scrape data
-        for query in product_inputs:
-            # Display current search query
-            st.write(f"🔍 Searching for: {query}")
-            # Scrape products and reviews
-            results = flipkart_scraper.scrape_flipkart_products(query, max_products=max_products, review_count=review_count)
-            final_data.extend(results)
-
-        unique_products = {}
-        # Remove duplicates based on product name (index 1)
-        for row in final_data:
-            # Keep the first occurrence of each unique product
-            if row[1] not in unique_products:
-                # Store the product using its name as the key
-                unique_products[row[1]] = row
-
-        # Convert back to list
-        final_data = list(unique_products.values())
-        # Store the final data in session state
-        st.session_state["scraped_data"] = final_data  # store in session
-        # Save data to CSV
-        flipkart_scraper.save_to_csv(final_data, output_path)
-        st.success("✅ Data saved to `data/product_reviews.csv`")
-        # Provide download link for the CSV
-        st.download_button("📥 Download CSV", data=open(output_path, "rb"), file_name="product_reviews.csv")
+        job_id = job_runner.submit("scrape", {
+            "queries": product_inputs,
+            "max_products": int(max_products),
+            "review_count": int(review_count),
+            "workers": int(parallel_fetches if use_http else parallel_browsers),
+            "browsers": int(parallel_browsers),
+            "fetch_mode": "http" if use_http else "browser",
+            "cache_ttl_s": int(cache_ttl_hours * 3600),
+            # Rows are appended to CSV, JSONL and the Parquet catalog as each product finishes,
+            # deduplicated on product_id through an on-disk seen-set
+            "csv_path": output_path,
+            "jsonl_path": jsonl_path,
+            "catalog_path": catalog_path,
+            "resume": resume_scrape,
+            # Saved rows are also embedded + upserted while the scrape continues
+            "stream_to_db": stream_to_db,
+        })
+        st.success(f"🔍 Scrape job `{job_id}` queued for: {', '.join(product_inputs)}")
 
 # This stays OUTSIDE "if st.button('Start Scraping')"
-# Button to start ingestion to Vector DB
-if "scraped_data" in st.session_state and st.button("🧠 Store in Vector DB (AstraDB)"):
-    # Initialize and run ingestion pipeline
-    with st.spinner("📡 Initializing ingestion pipeline..."):
-        try:
-            # Initialize ingestion
-            ingestion = DataIngestion()
-            # Run the ingestion pipeline
-            st.info("🚀 Running ingestion pipeline...")
-            # Execute the pipeline
-            ingestion.run_pipeline()
-            st.success("✅ Data successfully ingested to AstraDB!")
-        # Handle exceptions during ingestion
-        except Exception as e:
-            st.error("❌ Ingestion failed!")
-            st.exception(e)
+# Button to start ingestion to Vector DB (runs as a background job; resumes from its checkpoint)
+if os.path.exists(output_path) and st.button("🧠 Store in Vector DB (AstraDB)"):
+    job_id = job_runner.submit("ingest", {})
+    st.success(f"📡 Ingestion job `{job_id}` queued")
+
+
+# Job progress, refreshed every 2 seconds without rerunning the whole page
+@st.fragment(run_every=2)
+def show_jobs():
+    st.subheader("⚙️ Jobs")
+    jobs = job_runner.jobs(limit=10)
+    if not jobs:
+        st.caption("No jobs yet.")
+        return
+    for job in jobs:
+        progress = dict(job["progress"])
+        with st.container(border=True):
+            st.write(f"**{job['kind']}** `{job['id']}` — {job['status']}"
+                     + (f" (attempt {job['attempts']})" if job["attempts"] > 1 else ""))
+            if job["kind"] == "scrape":
+                st.caption(f"{progress.pop('products_scraped', 0)} products scraped, "
+                           f"{progress.pop('pages_per_min', 0)} pages/min, "
+                           f"{progress.pop('elapsed_seconds', 0)}s")
+            elif job["kind"] == "ingest":
+                st.caption(f"{progress.pop('docs_upserted', 0)} docs upserted, "
+                           f"{progress.pop('docs_per_sec', 0)} docs/s, "
+                           f"{progress.pop('embeddings_per_sec', 0)} embeddings/s, "
+                           f"{progress.pop('elapsed_seconds', 0)}s")
+            details = {key: value for key, value in progress.items() if value is not None}
+            if details:
+                st.caption(str(details))
+            if job["error"]:
+                st.error(job["error"].splitlines()[0])
+            if job["status"] in ("queued", "running"):
+                st.button("⏹️ Cancel", key=f"cancel_{job['id']}", on_click=job_runner.cancel, args=(job["id"],),
+                          disabled=bool(job["cancel_requested"]))
+            elif job["status"] in RESUMABLE_STATUSES:
+                st.button("▶️ Resume", key=f"resume_{job['id']}", on_click=job_runner.resume, args=(job["id"],))
+
+
+show_jobs()
+
+# Downloads of the latest scrape output (the files grow while a scrape job runs)
+if os.path.exists(output_path):
+    # Provide download link for the CSV
+    st.download_button("📥 Download CSV", data=open(output_path, "rb"), file_name="product_reviews.csv")
+today_partition = os.path.join(catalog_path, f"scrape_date={date.today().isoformat()}")
+if os.path.isdir(today_partition) and os.listdir(today_partition):
+    # Provide download link for today's Parquet partition (one part per sink flush, merged here)
+    today = date.today().isoformat()
+    parquet_buffer = io.BytesIO()
+    pq.write_table(read_catalog(catalog_path, since=today, until=today), parquet_buffer, compression="zstd")
+    st.download_button("📥 Download Parquet", data=parquet_buffer.getvalue(), file_name="product_reviews.parquet")
 
 
 # ------------------------------------------------------------------
@@ -111,11 +173,19 @@ if "scraped_data" in st.session_state and st.button("🧠 Store in Vector DB (As
 # Flow (user -> scraping -> CSV -> ingestion -> vector DB):
 # 1) UI: `scrapper_ui.py` (this file)
 #    - Collects product names and optional description from the user.
-#    - Buttons:
-#       * "Start Scraping" -> triggers scraping via FlipkartScraper.
-#       * "Store in Vector DB (AstraDB)" -> runs the ingestion pipeline.
-#    - Saves scraped rows to `data/product_reviews.csv` and stores them in
-#      `st.session_state['scraped_data']` for the ingestion step.
+#    - Buttons submit background jobs to `JobRunner` (`prod_assistant/etl/job_runner.py`):
+#      a process pool plus a SQLite job table (`data/jobs.sqlite3`) with live progress,
+#      cancel and resume, shown in the "Jobs" panel. Jobs writing the same outputs
+#      (two scrapes, two ingests) run one after another; the later one stays queued.
+#       * "Start Scraping" -> scrape job: FlipkartScraper, run in parallel
+#         by `ParallelScraper` (`prod_assistant/etl/scrape_engine.py`).
+#       * "Store in Vector DB (AstraDB)" -> ingest job running the ingestion pipeline.
+#    - With "Stream into the vector DB" checked, each scraped product is embedded and
+#      upserted while scraping continues (`prod_assistant/etl/streaming_ingestion.py`,
+#      `DataIngestion.run_streaming`).
+#    - Streams scraped rows through `ScrapeSink` (`prod_assistant/etl/scrape_sink.py`)
+#      into `data/product_reviews.csv`, `.jsonl` and the Parquet catalog, deduplicated
+#      on product_id.
 #
 # 2) Scraper: `prod_assistant/etl/data_scrapper.py`
 #    - Class: `FlipkartScraper`
@@ -123,9 +193,17 @@ if "scraped_data" in st.session_state and st.button("🧠 Store in Vector DB (As
 #          - Uses undetected_chromedriver to open Flipkart search results.
 #          - Extracts product tiles (product_id, product_title, rating, total_reviews, price).
 #          - Calls `get_top_reviews(product_url, count)` to visit product pages and
-#            collect top reviews (scroll + BeautifulSoup parsing).
+#            collect top reviews (adaptive scroll + lxml parsing, `prod_assistant/etl/parsers.py`).
+#          - Search results and reviews are cached with a TTL in `data/scrape_cache`
+#            (`prod_assistant/etl/scrape_cache.py`); stale pages are refreshed
+#            with conditional requests.
+#          - Browsers come from a `DriverPool` (`prod_assistant/etl/browser_pool.py`)
+#            and are reused across pages and queries, with tab recycling and
+#            restart on crash.
 #      * `save_to_csv(data, filename)` writes CSV with header: 
 #          ["product_id","product_title","rating","total_reviews","price","top_reviews"].
+#      * `save_to_parquet(data, dirname)` writes the same rows, typed, to the
+#          Parquet catalog partitioned by scrape date (`prod_assistant/etl/catalog.py`).
 #
 # 3) Ingestion: `prod_assistant/etl/data_ingestion.py`
 #    - Class: `DataIngestion`
@@ -0,0 +1,68 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from prod_assistant.etl import job_runner
+from prod_assistant.etl.job_runner import ACTIVE_STATUSES, JobRunner, job_resources
+
+
+@pytest.fixture
+def blocking_runner(tmp_path, monkeypatch):
+    """Runner with two worker threads (so handlers can be patched) running job kinds that wait on ``release``."""
+    release = threading.Event()
+    monkeypatch.setitem(job_runner.JOB_HANDLERS, "wait", lambda ctx, params: release.wait(10))
+    monkeypatch.setitem(job_runner.JOB_HANDLERS, "wait_other", lambda ctx, params: release.wait(10))
+    runner = JobRunner(str(tmp_path / "jobs.sqlite3"), max_workers=2)
+    runner._pool.shutdown()
+    runner._pool = ThreadPoolExecutor(max_workers=2)
+    yield runner, release
+    release.set()
+    runner._pool.shutdown(wait=True)
+
+
+def statuses_when(runner, done, timeout=10.0):
+    """Job statuses once ``done(statuses)`` holds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = {job["id"]: job["status"] for job in runner.jobs()}
+        if done(statuses) or time.monotonic() > deadline:
+            return statuses
+        time.sleep(0.02)
+
+
+def test_cancel_queued_job(blocking_runner):
+    runner, release = blocking_runner
+    running = runner.submit("wait", {})
+    queued = [runner.submit("wait", {}) for _ in range(2)]
+
+    runner.cancel(queued[-1])
+    statuses = {job["id"]: job["status"] for job in runner.jobs()}
+    assert statuses[queued[-1]] == "cancelled"
+    assert statuses[queued[0]] == "queued"
+
+    release.set()
+    statuses = statuses_when(runner, lambda s: not set(s.values()) & set(ACTIVE_STATUSES))
+    assert statuses[running] == statuses[queued[0]] == "succeeded"
+    assert statuses[queued[-1]] == "cancelled"
+
+
+def test_jobs_writing_the_same_outputs_run_one_at_a_time(blocking_runner):
+    runner, release = blocking_runner
+    first = runner.submit("wait", {})
+    second = runner.submit("wait", {})
+    other = runner.submit("wait_other", {})
+
+    # A free worker is left, but the second job writes what the first one does
+    statuses = statuses_when(runner, lambda s: s[first] == s[other] == "running")
+    assert statuses[first] == statuses[other] == "running"
+    assert statuses[second] == "queued"
+
+    release.set()
+    statuses = statuses_when(runner, lambda s: not set(s.values()) & set(ACTIVE_STATUSES))
+    assert statuses[first] == statuses[second] == statuses[other] == "succeeded"
+
+
+def test_streaming_scrape_also_holds_the_ingest_outputs():
+    assert job_resources("scrape", {}) == {"scrape"}
+    assert job_resources("scrape", {"stream_to_db": True}) == {"scrape", "ingest"}
+    assert job_resources("ingest", {}) == {"ingest"}
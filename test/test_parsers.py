@@ -0,0 +1,115 @@
+import os
+import pytest
+from prod_assistant.etl.parsers import (
+    has_review_blocks,
+    has_search_tiles,
+    parse_reviews,
+    parse_search_results,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def search_html():
+    return load_fixture("flipkart_search.html")
+
+
+@pytest.fixture
+def product_html():
+    return load_fixture("flipkart_product.html")
+
+
+@pytest.fixture
+def shell_html():
+    return load_fixture("flipkart_client_rendered.html")
+
+
+def test_search_tiles_have_all_fields(search_html):
+    tiles = parse_search_results(search_html, max_products=10)
+    assert tiles[0] == [
+        "itm6ac6485515ae4",
+        "Apple iPhone 15 (Black, 128 GB)",
+        "4.6",
+        "12,398",
+        "₹59,999",
+        "https://www.flipkart.com/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4"
+        "?pid=MOBGTAGPTB3VS24W&lid=LSTMOBGTAGPTB3VS24WVZNSC6&marketplace=FLIPKART",
+    ]
+
+
+def test_search_keeps_absolute_links(search_html):
+    tiles = parse_search_results(search_html, max_products=10)
+    assert tiles[1][0] == "itmbf14ef54f645d"
+    assert tiles[1][5].startswith("https://www.flipkart.com/apple-iphone-15-blue-128-gb/p/")
+
+
+def test_search_skips_incomplete_tiles(search_html):
+    titles = [tile[1] for tile in parse_search_results(search_html, max_products=10)]
+    assert titles == [
+        "Apple iPhone 15 (Black, 128 GB)",
+        "Apple iPhone 15 (Blue, 128 GB)",
+        "Apple iPhone 15 Plus (Black, 128 GB)",
+    ]
+
+
+def test_search_respects_max_products(search_html):
+    assert len(parse_search_results(search_html, max_products=1)) == 1
+
+
+def test_reviews_are_deduplicated_and_whitespace_normalized(product_html):
+    reviews = parse_reviews(product_html, count=10)
+    assert reviews == [
+        "5 Terrific purchase Camera quality is superb and the battery easily lasts a full day. READ MORE",
+        "4 Worth every penny Dynamic island is useful. Gets a little warm while charging.",
+        "Good display, but the charger is not included in the box.",
+    ]
+
+
+def test_reviews_respect_count(product_html):
+    assert len(parse_reviews(product_html, count=2)) == 2
+
+
+def test_client_rendered_shell_has_nothing_to_parse(shell_html):
+    assert parse_search_results(shell_html, max_products=5) == []
+    assert parse_reviews(shell_html, count=2) == []
+    assert not has_search_tiles(shell_html)
+    assert not has_review_blocks(shell_html)
+
+
+def test_presence_checks(search_html, product_html):
+    assert has_search_tiles(search_html)
+    assert has_review_blocks(product_html)
+    assert not has_review_blocks(search_html)
+
+
+def test_http_mode_falls_back_to_browser_when_selectors_are_missing(tmp_path, shell_html, product_html):
+    from prod_assistant.etl.data_scrapper import FlipkartScraper
+
+    scraper = FlipkartScraper(output_dir=str(tmp_path), fetch_mode="http")
+    browser_searches = []
+    scraper.fetcher.fetch = lambda url: shell_html if "/search" in url else product_html
+    scraper._scrape_search_results = lambda browser, query, max_products: browser_searches.append(query) or []
+
+    assert scraper.search_products("iphone 15", max_products=2) == []
+    assert browser_searches == ["iphone 15"]
+    assert scraper.get_top_reviews("https://www.flipkart.com/x/p/itm1", count=1).startswith("5 Terrific purchase")
+    assert scraper.fetch_stats == {"http_pages": 1, "browser_fallbacks": 1}
+
+
+def test_http_mode_falls_back_to_browser_for_product_pages(tmp_path, shell_html):
+    from prod_assistant.etl.data_scrapper import FlipkartScraper
+
+    scraper = FlipkartScraper(output_dir=str(tmp_path), fetch_mode="http")
+    fetched, browser_loads = [], []
+    scraper.fetcher.fetch = lambda url: fetched.append(url) or shell_html
+    scraper._fetch_reviews_with_browser = lambda url, count, browser=None: browser_loads.append(url) or ["From Chrome"]
+
+    assert scraper.get_top_reviews("https://www.flipkart.com/x/p/itm1", count=1) == "From Chrome"
+    assert fetched == browser_loads == ["https://www.flipkart.com/x/p/itm1"]
+    assert scraper.fetch_stats == {"http_pages": 0, "browser_fallbacks": 1}